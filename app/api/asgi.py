@@ -0,0 +1,149 @@
+"""ASGI variant of the REST API endpoint, serving many in-flight requests per process."""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from starlette.applications import Starlette
+from starlette.datastructures import Headers, UploadFile
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.endpoint import (
+    build_response,
+    get_calories_async,
+    inference_executor,
+    is_image_mimetype,
+    parse_plate_size,
+)
+from app.api.warmup import warmup
+from app.estimator.calories import close_async_client
+from app.estimator.constants import MAX_UPLOAD_BYTES, WARMUP
+from app.metrics import count_failure, render_metrics, time_stage
+from app.util import sniff_image_format
+
+log = logging.getLogger("API")
+
+
+class UploadLimitMiddleware:
+    """
+    Reject request bodies above a size limit: declared lengths are checked
+    before the body is read and chunked bodies while they are received.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int) -> None:
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_size:
+            count_failure("http_413")
+            response = PlainTextResponse("Request Entity Too Large", status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise HTTPException(413)
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+
+async def get_calorie_estimation(request: Request) -> JSONResponse:
+    """Endpoint to retrieve calorie information from image in POST request."""
+
+    with time_stage("request"):
+        try:
+            # check that a form upload was sent before reading the body
+            if not request.headers.get("content-type", "").startswith(
+                "multipart/form-data"
+            ):
+                raise HTTPException(400, "File not received.")
+
+            form = await request.form()
+
+            # check that file is in request
+            image = form.get("file")
+            if not isinstance(image, UploadFile):
+                raise HTTPException(400, "File not received.")
+            if not is_image_mimetype(image.content_type or ""):
+                raise HTTPException(415, "Uploaded file is not an image.")
+
+            # extract plate size from request if available otherwise set default
+            plate_size = parse_plate_size(form)
+
+            # ensure filename present
+            if not image.filename:
+                raise ValueError("Filename for uploaded image not present.")
+
+            # ensure the upload is an image format the model can decode
+            content = await image.read()
+            if sniff_image_format(content) is None:
+                raise HTTPException(415, "Unsupported image format.")
+
+            # generate calorie information from the image held in memory
+            results, model_code = await get_calories_async(content, plate_size)
+
+            # send response depending on whether or not food items are detected
+            return JSONResponse(build_response(results, model_code))
+
+        except HTTPException as e:
+            count_failure(f"http_{e.status_code}")
+            raise
+        except Exception as e:
+            count_failure("internal_error")
+            msg = f"Unable to return calorie information due to error: {e}"
+            log.error(msg)
+            raise HTTPException(500, msg)
+
+
+async def get_metrics(request: Request) -> Response:
+    """Endpoint exposing Prometheus metrics, aggregated over all workers."""
+    try:
+        data, content_type = render_metrics()
+    except ImportError as e:
+        raise HTTPException(501, str(e))
+    return Response(data, media_type=content_type)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    """
+    Warm up the process before it accepts requests if WARMUP is set, and
+    close the connections of the Edamam API client on shutdown.
+    """
+    if WARMUP:
+        await asyncio.get_running_loop().run_in_executor(inference_executor, warmup)
+    yield
+    await close_async_client()
+
+
+app = Starlette(
+    lifespan=lifespan,
+    routes=[
+        Route("/", get_calorie_estimation, methods=["POST"]),
+        Route("/metrics", get_metrics, methods=["GET"]),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"]),
+        Middleware(UploadLimitMiddleware, max_size=MAX_UPLOAD_BYTES),
+    ],
+)
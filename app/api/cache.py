@@ -0,0 +1,122 @@
+"""Cache of calorie results keyed by a perceptual hash of the uploaded image."""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+
+def perceptual_hash(image: NDArray, hash_size: int = 8) -> int:
+    """
+    Compute a DCT-based perceptual hash of an image. Re-compressed, resized
+    or slightly cropped copies of a photo produce hashes that differ in only
+    a few bits.
+    Args:
+        image (NDArray): (H, W, 3) BGR image.
+        hash_size (int): Hash has hash_size ** 2 bits.
+    Returns:
+        int: Perceptual hash.
+    """
+    # keep only the low frequencies of a small greyscale copy
+    size = hash_size * 4
+    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(grey, (size, size), interpolation=cv2.INTER_AREA)
+    low_freq = cv2.dct(small.astype(np.float32))[:hash_size, :hash_size].flatten()
+
+    # set bits for frequencies above the median (ignoring the DC term)
+    bits = low_freq > np.median(low_freq[1:])
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    Count the number of differing bits between two hashes.
+    Args:
+        a (int): First hash.
+        b (int): Second hash.
+    Returns:
+        int: Number of differing bits.
+    """
+    return bin(a ^ b).count("1")
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with time-based expiry, mapping an image hash and
+    plate diameter to a result. Lookups match any cached hash within
+    max_distance bits for the same plate diameter.
+    Attributes:
+        max_size (int): Maximum number of cached results (0 disables caching).
+        ttl (float): Time in seconds after which a result expires.
+        max_distance (int): Maximum Hamming distance for near-duplicate hits.
+    """
+
+    def __init__(
+        self, max_size: int = 1024, ttl: float = 3600.0, max_distance: int = 4
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[Tuple[int, float], Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, image_hash: int, plate_diameter: float) -> Optional[Any]:
+        """
+        Retrieve the result for an image, or a near-duplicate of it.
+        Args:
+            image_hash (int): Perceptual hash of image.
+            plate_diameter (float): Diameter of plate.
+        Returns:
+            Optional[Any]: Copy of the cached result, None if not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+
+            # exact match first, then the closest near-duplicate
+            key = (image_hash, plate_diameter)
+            if key not in self._entries:
+                candidates = [
+                    (hamming_distance(image_hash, cached[0]), cached)
+                    for cached in self._entries
+                    if cached[1] == plate_diameter
+                ]
+                if not candidates:
+                    return None
+                distance, key = min(candidates)
+                if distance > self.max_distance:
+                    return None
+
+            self._entries.move_to_end(key)
+            return copy.deepcopy(self._entries[key][1])
+
+    def put(self, image_hash: int, plate_diameter: float, result: Any) -> None:
+        """
+        Store the result for an image, evicting the least recently used
+        result if the cache is full.
+        Args:
+            image_hash (int): Perceptual hash of image.
+            plate_diameter (float): Diameter of plate.
+            result (Any): Result to cache.
+        """
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            key = (image_hash, plate_diameter)
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, (expiry, _) in self._entries.items() if expiry <= now]
+        for key in expired:
+            del self._entries[key]
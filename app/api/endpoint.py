@@ -1,30 +1,99 @@
 """REST API endpoint for computing calorie information from uploaded image."""
 
+import asyncio
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
 from enum import Enum
-from pathlib import Path
-from typing import Any, List, Tuple
+from io import BytesIO
+from typing import IO, Any, Dict, List, Mapping, Optional, Tuple
 
-from flask import Flask, abort, jsonify, request
+import numpy as np
+from flask import Flask, Request, Response, abort, jsonify, request
 from flask_cors import CORS
-
-from app.estimator.calories import get_food_details
-from app.estimator.vision import get_food_classification
-from app.estimator.weight import (
-    calculate_pixel_plate,
-    get_food_weights,
-    get_params_weight,
+from werkzeug.exceptions import HTTPException
+
+from app.api.cache import ResultCache, perceptual_hash
+from app.api.profiling import profiled
+from app.api.speculation import SpeculativeCall, VisionSpeculator
+from app.estimator.calories import (
+    FoodDetails,
+    get_food_details,
+    get_food_details_async,
+    get_food_nutrition,
+    scale_nutrition,
+)
+from app.estimator.constants import (
+    BATCH_MAX_IMAGES,
+    BATCH_MAX_UPLOAD_BYTES,
+    DECODE_MAX_SIZE,
+    MAX_UPLOAD_BYTES,
+    NUTRITION_LOOKUP_WORKERS,
+    RESULT_CACHE_MAX_DISTANCE,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_TTL,
+    SPECULATIVE_VISION,
+    SPECULATIVE_VISION_MISS_RATE,
+    YOLO_BATCH_MAX_SIZE,
 )
-from app.estimator.yolo import detect_food_items, get_num_plate_food
-from app.util import delete_file, save_image
+from app.estimator.labels import food_key
+from app.estimator.vision import (
+    get_food_classification,
+    get_food_classification_async,
+)
+from app.estimator.weight import get_food_weights_batch
+from app.estimator.yolo import detect_food_items_batch, detect_food_items_scheduled
+from app.metrics import RESPONSES, count_failure, render_metrics, time_stage
+from app.util import ImageSource, image_to_array, sniff_image_format
 
 log = logging.getLogger("API")
 
+
+class UploadRequest(Request):
+    """Request keeping uploaded files in memory instead of spooling them to disk."""
+
+    def _get_file_stream(
+        self,
+        total_content_length: Optional[int],
+        content_type: Optional[str],
+        filename: Optional[str] = None,
+        content_length: Optional[int] = None,
+    ) -> IO[bytes]:
+        # the size of the whole body is bounded by MAX_CONTENT_LENGTH
+        return BytesIO()
+
+    @property  # type: ignore[misc]
+    def max_content_length(self) -> Optional[int]:  # type: ignore[override]
+        """Largest accepted body, raised for the batch endpoint."""
+        if self.endpoint == "get_batch_calorie_estimation":
+            return BATCH_MAX_UPLOAD_BYTES
+        return super().max_content_length
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
+# bodies above this size are rejected with 413 before they are read
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
 cors = CORS(app)
 
-# directory to temporarily save images
-IMAGE_DIR = Path("tmp/")
+# results of recent requests, shared by repeated and near-duplicate photos
+result_cache = ResultCache(
+    RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_MAX_DISTANCE
+)
+
+# bounded pool running the nutrition lookups of all items on a plate concurrently
+lookup_executor = ThreadPoolExecutor(
+    max_workers=NUTRITION_LOOKUP_WORKERS, thread_name_prefix="nutrition"
+)
+
+# threads of the ASGI app decoding images and running the YOLO model - more
+# than one thread only helps when predictions are merged by micro-batching
+inference_executor = ThreadPoolExecutor(
+    max_workers=max(1, YOLO_BATCH_MAX_SIZE), thread_name_prefix="inference"
+)
+
+# starts the Vision API fallback alongside the YOLO model when configured
+vision_speculator = VisionSpeculator(SPECULATIVE_VISION, SPECULATIVE_VISION_MISS_RATE)
 
 
 # code for type of computation
@@ -33,16 +102,17 @@ class ModelCodeEnum(Enum):
     YOLO_USE_IMAGE_SIZE = "YOLO_USE_IMAGE_SIZE"
     VISION_DEFAULT = "VISION_DEFAULT"
     NO_FOOD_DETECTED = "NO_FOOD_DETECTED"
+    VISION_FAILED = "VISION_FAILED"
 
 
 def get_model_predictions(
-    image: Path, plate_diameter: float = 25.0
+    image: ImageSource, plate_diameter: float = 25.0
 ) -> Tuple[List, List, bool, bool]:
     """
     Obtain food classifications from YOLO model and compute weights
     based on the plate (if present) or image size.
     Args:
-        image (Path): Image location for calorie prediction.
+        image (ImageSource): Image for calorie prediction.
         plate_diameter (float): Diameter of plate.
     Returns:
         labels_list (List): List of food items.
@@ -51,160 +121,737 @@ def get_model_predictions(
             calculation.
         success (bool): Whether or not the prediction was a success.
     """
-    # initialise return values
-    success, use_plate = False, False
-    labels_list: List[str] = []
-    weights_list: List[float] = []
-
     # Step 1 - generate predictions from YOLO model
-    labels, areas, _ = detect_food_items(image)
-
-    # Step 2 - parse output from YOLO model and see if predictions available
-    if any(labels):
-        # count number of plates and food items identified
-        plate_counter, food_counter = get_num_plate_food(labels)
-
-        # generate weights if food is recognized by YOLO
-        if food_counter >= 1:
-            # Step 3 - get list of foods and pixels without plate
-            labels_list, pixels_food = get_params_weight(labels, areas)
-            log.info(f"[YOLO] {len(labels_list)} food items recognised.")
+    labels, areas, _ = detect_food_items_scheduled(image)
 
-            # Step 4a - calculate weight assuming a plate size
-            if plate_counter == 1:
-                # adds all the food and plate pixel up, assuming all foods are on the plate
-                pixel_plate = calculate_pixel_plate(areas)
+    return estimate_weights(labels, areas, plate_diameter)
 
-                # ensure supplied plate size is sensible otherwise set to default
-                if plate_diameter < 10.0 or plate_diameter > 40.0:
-                    plate_diameter = 25.0
 
-                # compute weight using plate
-                weights_list = get_food_weights(
-                    labels_list, pixels_food, pixel_plate, plate_diameter, plate=True
-                )
-                log.info(
-                    f"[YOLO] Using plate of size {plate_diameter}cm to estimate weight."
-                )
-                use_plate = True
+def estimate_weights(
+    labels: np.ndarray, areas: np.ndarray, plate_diameter: float = 25.0
+) -> Tuple[List, List, bool, bool]:
+    """
+    Compute weights of the food items detected by the YOLO model based on
+    the plate (if present) or image size.
+    Args:
+        labels (np.ndarray): (N) 1D array containing detected items.
+        areas (np.ndarray): (N) 1D array containing the relative area of
+            each detected item.
+        plate_diameter (float): Diameter of plate.
+    Returns:
+        Tuple[List, List, bool, bool]: labels, weights, use_plate and
+            success (see get_model_predictions).
+    """
+    return estimate_weights_batch([(labels, areas)], [plate_diameter])[0]
 
-            # Step 4b - calculate weight assuming image size (no plate)
-            else:
-                log.info("[YOLO] Using image size to estimate weight.")
-                weights_list = get_food_weights(labels_list, pixels_food)
 
-            # set model success
-            success = True
+@time_stage("weight_estimation")
+def estimate_weights_batch(
+    detections: List[Tuple[np.ndarray, np.ndarray]], plate_diameters: List[float]
+) -> List[Tuple[List, List, bool, bool]]:
+    """
+    Compute weights of the food items detected by the YOLO model in several
+    images with one vectorized calculation over all detections.
+    Args:
+        detections (List[Tuple[np.ndarray, np.ndarray]]): labels and areas
+            (see estimate_weights) of each image.
+        plate_diameters (List[float]): Diameter of plate for each image.
+    Returns:
+        List[Tuple[List, List, bool, bool]]: labels, weights, use_plate and
+            success (see get_model_predictions) for each image, in order.
+    """
+    if not detections:
+        return []
+
+    counts = np.array([len(labels) for labels, _ in detections], dtype=np.intp)
+    labels = np.concatenate([np.asarray(labels, dtype=str) for labels, _ in detections])
+    areas = np.concatenate([np.asarray(areas, dtype=float) for _, areas in detections])
+
+    # ensure supplied plate sizes are sensible otherwise set to default
+    diameters = np.array(plate_diameters, dtype=float)
+    diameters[(diameters < 10.0) | (diameters > 40.0)] = 25.0
+
+    is_food, weights, use_plates = get_food_weights_batch(
+        labels, areas, counts, diameters
+    )
+
+    results: List[Tuple[List, List, bool, bool]] = []
+    bounds = np.cumsum(counts)
+    for start, end, use_plate, diameter in zip(
+        bounds - counts, bounds, use_plates, diameters
+    ):
+        food = is_food[start:end]
+
+        # model is successful if food is recognised by YOLO
+        if not food.any():
+            results.append(([], [], False, False))
+            continue
+
+        log.info(f"[YOLO] {int(food.sum())} food items recognised.")
+        if use_plate:
+            log.info(f"[YOLO] Using plate of size {diameter}cm to estimate weight.")
+        else:
+            log.info("[YOLO] Using image size to estimate weight.")
+
+        results.append(
+            (
+                labels[start:end][food].tolist(),
+                weights[start:end][food].tolist(),
+                bool(use_plate),
+                True,
+            )
+        )
 
-    return labels_list, weights_list, use_plate, success
+    return results
 
 
 def get_calories(
-    image: Path, plate_diameter: float = 25.0
+    image: ImageSource, plate_diameter: float = 25.0
 ) -> Tuple[List, ModelCodeEnum]:
     """
-    Retrieve calorie information for image located at specified path.
+    Retrieve calorie information for an image. Encoded image bytes are
+    decoded once in memory and shared between the YOLO model and Vision API.
     Args:
-        image (Path): Image location for calorie prediction.
+        image (ImageSource): Encoded bytes, decoded array or location of
+            image for calorie prediction.
         plate_diameter (float): Diameter of plate.
     Returns:
         food_details (List): Food label and nutrition details.
         model_code (ModelCodeEnum): Model calculation mode used.
     """
-    # Step 1 - invoke YOLO model
+    # Step 0 - reuse the result of a recent identical or near-duplicate photo
+    decoded, image_hash, cached = prepare_image(image, plate_diameter)
+    if cached is not None:
+        return cached
+
+    # Step 1 - invoke YOLO model on the decoded image, starting the Vision API
+    # in parallel if it is likely to be needed
+    speculation = vision_speculator.start(decoded, get_vision_predictions, image)
     log.info("[Endpoint] Invoking YOLO model.")
-    items, weights, use_plate, success = get_model_predictions(image, plate_diameter)
-    if success:
-        if use_plate:
-            model_code = ModelCodeEnum.YOLO_USE_PLATE_SIZE
+    try:
+        items, weights, use_plate, success = get_model_predictions(
+            decoded, plate_diameter
+        )
+    except Exception:
+        abandon_speculation(speculation)
+        raise
+    model_code = select_model_code(use_plate, success, speculation)
+
+    # Step 2 - invoke Vision API as default if YOLO unsuccessful
+    if model_code == ModelCodeEnum.VISION_DEFAULT:
+        log.info("[Endpoint] Invoking Vision API.")
+        if speculation is not None:
+            items, weights = speculation.result()
         else:
-            model_code = ModelCodeEnum.YOLO_USE_IMAGE_SIZE
+            items, weights = get_vision_predictions(image)
+
+    # Step 3 - generate calorie information using Edamam API
+    food_details, failed = get_nutrition_details(items, weights)
+    store_calories(image_hash, plate_diameter, food_details, failed, model_code)
+
+    return food_details, model_code
+
+
+async def get_calories_async(
+    image: bytes, plate_diameter: float = 25.0
+) -> Tuple[List, ModelCodeEnum]:
+    """
+    Retrieve calorie information for an image without blocking the event
+    loop (see get_calories): decoding and the YOLO model run in the inference
+    executor while the Vision API and Edamam API calls are awaited.
+    Args:
+        image (bytes): Encoded image for calorie prediction.
+        plate_diameter (float): Diameter of plate.
+    Returns:
+        food_details (List): Food label and nutrition details.
+        model_code (ModelCodeEnum): Model calculation mode used.
+    """
+    loop = asyncio.get_running_loop()
+
+    # Step 0 - reuse the result of a recent identical or near-duplicate photo
+    decoded, image_hash, cached = await loop.run_in_executor(
+        inference_executor, prepare_image, image, plate_diameter
+    )
+    if cached is not None:
+        return cached
+
+    # Step 1 - invoke YOLO model on the decoded image, starting the Vision API
+    # in parallel if it is likely to be needed
+    speculation = vision_speculator.start_async(
+        decoded, get_vision_predictions_async, image
+    )
+    log.info("[Endpoint] Invoking YOLO model.")
+    try:
+        items, weights, use_plate, success = await loop.run_in_executor(
+            inference_executor, get_model_predictions, decoded, plate_diameter
+        )
+    except Exception:
+        abandon_speculation(speculation)
+        raise
+    model_code = select_model_code(use_plate, success, speculation)
 
     # Step 2 - invoke Vision API as default if YOLO unsuccessful
-    else:
+    if model_code == ModelCodeEnum.VISION_DEFAULT:
         log.info("[Endpoint] Invoking Vision API.")
-        items, weights = [], []
-        model_code = ModelCodeEnum.VISION_DEFAULT
-        item = get_food_classification(image)
-        # set default weight to 100g
-        if item:
-            items.append(item)
-            weights.append(100.0)
+        if speculation is not None:
+            items, weights = await asyncio.wrap_future(speculation.use())
+        else:
+            items, weights = await get_vision_predictions_async(image)
 
     # Step 3 - generate calorie information using Edamam API
-    food_details = []
-    if items and weights and len(items) == len(weights):
-        for i in range(len(items)):
-            data = get_food_details(items[i], weights[i])
-            food_details.append(
-                {
-                    "label": data.label,
-                    "nutrition": data.nutrition,
-                    "weight": data.weight,
-                }
-            )
+    food_details, failed = await get_nutrition_details_async(items, weights)
+    store_calories(image_hash, plate_diameter, food_details, failed, model_code)
 
     return food_details, model_code
 
 
+def prepare_image(
+    image: ImageSource, plate_diameter: float
+) -> Tuple[ImageSource, Optional[int], Optional[Tuple[List, ModelCodeEnum]]]:
+    """
+    Decode an image once in memory and look up the result of a similar photo.
+    Args:
+        image (ImageSource): Encoded bytes, decoded array or location of
+            image for calorie prediction.
+        plate_diameter (float): Diameter of plate.
+    Returns:
+        decoded (ImageSource): Decoded image.
+        image_hash (Optional[int]): Perceptual hash (see get_cached_calories).
+        cached (Optional[Tuple[List, ModelCodeEnum]]): Cached food details
+            and model code, None on a cache miss.
+    """
+    decoded = image_to_array(image, DECODE_MAX_SIZE)
+    image_hash, cached = get_cached_calories(decoded, plate_diameter)
+    return decoded, image_hash, cached
+
+
+def select_model_code(
+    use_plate: bool, success: bool, speculation: Optional[SpeculativeCall]
+) -> ModelCodeEnum:
+    """
+    Record whether the YOLO model found food, discard the speculative Vision
+    API call if it is not needed and pick the model code.
+    Args:
+        use_plate (bool): Whether the plate was used for weight calculation.
+        success (bool): Whether the YOLO model found food.
+        speculation (Optional[SpeculativeCall]): Speculative Vision API call.
+    Returns:
+        ModelCodeEnum: Model calculation mode used.
+    """
+    vision_speculator.tracker.update(missed=not success)
+    if not success:
+        return ModelCodeEnum.VISION_DEFAULT
+
+    if speculation is not None:
+        speculation.discard()
+    if use_plate:
+        return ModelCodeEnum.YOLO_USE_PLATE_SIZE
+    return ModelCodeEnum.YOLO_USE_IMAGE_SIZE
+
+
+def abandon_speculation(speculation: Optional[SpeculativeCall]) -> None:
+    """
+    Discard the speculative Vision API call of a request whose YOLO model
+    step failed.
+    Args:
+        speculation (Optional[SpeculativeCall]): Speculative Vision API call.
+    """
+    # the request fails without needing the Vision API
+    vision_speculator.tracker.update(missed=False)
+    if speculation is not None:
+        speculation.discard()
+
+
+def store_calories(
+    image_hash: Optional[int],
+    plate_diameter: float,
+    food_details: List[Dict[str, Any]],
+    failed: List[str],
+    model_code: ModelCodeEnum,
+) -> None:
+    """
+    Cache a complete result, so that failed lookups and Vision API calls are
+    retried by the next request instead.
+    Args:
+        image_hash (Optional[int]): Perceptual hash (see get_cached_calories).
+        plate_diameter (float): Diameter of plate.
+        food_details (List[Dict[str, Any]]): Food label and nutrition details.
+        failed (List[str]): Food items whose lookup failed.
+        model_code (ModelCodeEnum): Model calculation mode used.
+    """
+    if image_hash is None or failed or model_code == ModelCodeEnum.VISION_FAILED:
+        return
+    result_cache.put(image_hash, plate_diameter, (food_details, model_code))
+
+
+def get_calories_batch(
+    images: List[bytes], plate_diameters: List[float]
+) -> List[Tuple[List, ModelCodeEnum]]:
+    """
+    Retrieve calorie information for several images at once: all images run
+    through one batched YOLO call and every distinct food item is looked up
+    only once.
+    Args:
+        images (List[bytes]): Encoded images for calorie prediction.
+        plate_diameters (List[float]): Diameter of plate for each image.
+    Returns:
+        List[Tuple[List, ModelCodeEnum]]: Food details and model code
+            (see get_calories) for each image, in order, with VISION_FAILED
+            for images whose Vision API fallback failed.
+    """
+    outputs: List[Optional[Tuple[List, ModelCodeEnum]]] = [None] * len(images)
+    hashes: List[Optional[int]] = [None] * len(images)
+    decoded: Dict[int, ImageSource] = {}
+
+    # Step 0 - decode images and reuse results of recent similar photos
+    for i, image in enumerate(images):
+        try:
+            decoded[i] = image_to_array(image, DECODE_MAX_SIZE)
+        except ValueError as e:
+            log.error(f"[Endpoint] Unable to decode image {i}: {e}")
+            count_failure("decode")
+            outputs[i] = ([], ModelCodeEnum.NO_FOOD_DETECTED)
+            continue
+        hashes[i], outputs[i] = get_cached_calories(decoded[i], plate_diameters[i])
+    pending = [i for i, output in enumerate(outputs) if output is None]
+
+    # Step 1 - invoke YOLO model once on all remaining images
+    log.info(f"[Endpoint] Invoking YOLO model on {len(pending)} images.")
+    detections = (
+        detect_food_items_batch([decoded[i] for i in pending]) if pending else []
+    )
+
+    # Step 2 - compute the weights of the food items of all images at once
+    estimates = estimate_weights_batch(
+        [(labels, areas) for labels, areas, _ in detections],
+        [plate_diameters[i] for i in pending],
+    )
+
+    items_list, weights_list, model_codes = [], [], []
+    fallbacks: Dict[int, Future] = {}
+    for i, (items, weights, use_plate, success) in zip(pending, estimates):
+        vision_speculator.tracker.update(missed=not success)
+        if success and use_plate:
+            model_codes.append(ModelCodeEnum.YOLO_USE_PLATE_SIZE)
+        elif success:
+            model_codes.append(ModelCodeEnum.YOLO_USE_IMAGE_SIZE)
+        else:
+            # Step 3 - invoke Vision API concurrently for images YOLO missed
+            model_codes.append(ModelCodeEnum.VISION_DEFAULT)
+            fallbacks[i] = lookup_executor.submit(get_vision_predictions, images[i])
+        items_list.append(items)
+        weights_list.append(weights)
+
+    for n, i in enumerate(pending):
+        if i in fallbacks:
+            try:
+                items_list[n], weights_list[n] = fallbacks[i].result()
+            except Exception as e:
+                log.error(f"[Endpoint] Vision API failed for image {i}: {e}")
+                model_codes[n] = ModelCodeEnum.VISION_FAILED
+
+    # Step 4 - generate calorie information with one lookup per food item
+    food_details_list, failed_list = get_nutrition_details_batch(
+        items_list, weights_list
+    )
+
+    for i, food_details, failed, model_code in zip(
+        pending, food_details_list, failed_list, model_codes
+    ):
+        outputs[i] = (food_details, model_code)
+        store_calories(hashes[i], plate_diameters[i], food_details, failed, model_code)
+
+    return [output for output in outputs if output is not None]
+
+
+def get_cached_calories(
+    decoded: ImageSource, plate_diameter: float
+) -> Tuple[Optional[int], Optional[Tuple[List, ModelCodeEnum]]]:
+    """
+    Look up the result of a recent identical or near-duplicate photo.
+    Args:
+        decoded (ImageSource): Decoded image for calorie prediction.
+        plate_diameter (float): Diameter of plate.
+    Returns:
+        image_hash (Optional[int]): Perceptual hash to store the result
+            under, None if the result cache is not used for this image.
+        cached (Optional[Tuple[List, ModelCodeEnum]]): Cached food details
+            and model code, None on a cache miss.
+    """
+    if RESULT_CACHE_SIZE <= 0 or not isinstance(decoded, np.ndarray):
+        return None, None
+
+    image_hash = perceptual_hash(decoded)
+    cached = result_cache.get(image_hash, plate_diameter)
+    if cached is not None:
+        log.info("[Endpoint] Returning cached result for similar image.")
+
+    return image_hash, cached
+
+
+def get_vision_predictions(image: ImageSource) -> Tuple[List, List]:
+    """
+    Obtain food classification from Vision API, assuming a default weight.
+    Args:
+        image (ImageSource): Image for calorie prediction.
+    Returns:
+        items (List): Classified food item, empty if no food was found.
+        weights (List): Default weight of 100g for the food item.
+    """
+    return vision_predictions(get_food_classification(image))
+
+
+async def get_vision_predictions_async(image: ImageSource) -> Tuple[List, List]:
+    """
+    Await food classification from Vision API, assuming a default weight.
+    Args:
+        image (ImageSource): Image for calorie prediction.
+    Returns:
+        Tuple[List, List]: items and weights (see get_vision_predictions).
+    """
+    return vision_predictions(await get_food_classification_async(image))
+
+
+def vision_predictions(item: Optional[str]) -> Tuple[List, List]:
+    """
+    Assume a default weight for the food item classified by Vision API.
+    Args:
+        item (Optional[str]): Classified food item.
+    Returns:
+        Tuple[List, List]: items and weights (see get_vision_predictions).
+    """
+    if not item:
+        return [], []
+
+    # set default weight to 100g
+    return [item], [100.0]
+
+
+def get_nutrition_details(
+    items: List[str], weights: List[float]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Look up nutrition details for all food items concurrently. Items whose
+    lookup fails are left out without affecting the other items.
+    Args:
+        items (List[str]): Food items.
+        weights (List[float]): Weights corresponding to food items.
+    Returns:
+        food_details (List[Dict[str, Any]]): Food label, nutrition details and
+            weight for each successful lookup, in the order of items.
+        failed (List[str]): Food items whose lookup failed.
+    """
+    if len(items) != len(weights):
+        return [], []
+
+    futures = [
+        lookup_executor.submit(get_food_details, item, weight)
+        for item, weight in zip(items, weights)
+    ]
+    results: List[Any] = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+
+    return collect_nutrition_details(items, results)
+
+
+async def get_nutrition_details_async(
+    items: List[str], weights: List[float]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Await nutrition details for all food items concurrently (see
+    get_nutrition_details).
+    Args:
+        items (List[str]): Food items.
+        weights (List[float]): Weights corresponding to food items.
+    Returns:
+        Tuple[List[Dict[str, Any]], List[str]]: food_details and failed
+            (see get_nutrition_details).
+    """
+    if len(items) != len(weights):
+        return [], []
+
+    results = await asyncio.gather(
+        *[get_food_details_async(item, weight) for item, weight in zip(items, weights)],
+        return_exceptions=True,
+    )
+
+    return collect_nutrition_details(items, list(results))
+
+
+def collect_nutrition_details(
+    items: List[str], results: List[Any]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Convert the lookup results of food items, leaving out failed lookups.
+    Args:
+        items (List[str]): Food items.
+        results (List[Any]): Food details or exception of each lookup.
+    Returns:
+        Tuple[List[Dict[str, Any]], List[str]]: food_details and failed
+            (see get_nutrition_details).
+    """
+    food_details, failed = [], []
+    for item, data in zip(items, results):
+        if isinstance(data, BaseException):
+            log.error(f"[Endpoint] Unable to get nutrition for {item}: {data}")
+            count_failure("nutrition_lookup")
+            failed.append(item)
+            continue
+        food_details.append(food_details_to_dict(data))
+
+    return food_details, failed
+
+
+def get_nutrition_details_batch(
+    items_list: List[List[str]], weights_list: List[List[float]]
+) -> Tuple[List[List[Dict[str, Any]]], List[List[str]]]:
+    """
+    Look up nutrition details for the food items of several images, fetching
+    the nutrition of each distinct food item only once. Items whose lookup
+    fails are left out without affecting the other items.
+    Args:
+        items_list (List[List[str]]): Food items of each image.
+        weights_list (List[List[float]]): Weights corresponding to food items.
+    Returns:
+        food_details_list (List[List[Dict[str, Any]]]): Food details (see
+            get_nutrition_details) for each image, in order.
+        failed_list (List[List[str]]): Food items whose lookup failed for
+            each image, in order.
+    """
+    # look up every distinct food item concurrently
+    searches: Dict[str, str] = {}
+    for items, weights in zip(items_list, weights_list):
+        if len(items) == len(weights):
+            for item in items:
+                searches.setdefault(food_key(item) or item.lower(), item)
+    futures = {
+        key: lookup_executor.submit(get_food_nutrition, search)
+        for key, search in searches.items()
+    }
+
+    nutrition: Dict[str, FoodDetails] = {}
+    for key, future in futures.items():
+        try:
+            nutrition[key] = future.result()
+        except Exception as e:
+            log.error(f"[Endpoint] Unable to get nutrition for {searches[key]}: {e}")
+            count_failure("nutrition_lookup")
+
+    # scale the shared nutrition per 100g by the weight of each item
+    food_details_list, failed_list = [], []
+    for items, weights in zip(items_list, weights_list):
+        food_details, failed = [], []
+        if len(items) == len(weights):
+            for item, weight in zip(items, weights):
+                details = nutrition.get(food_key(item) or item.lower())
+                if details is None:
+                    failed.append(item)
+                    continue
+                scaled = scale_nutrition(replace(details), weight)
+                food_details.append(food_details_to_dict(scaled))
+        food_details_list.append(food_details)
+        failed_list.append(failed)
+
+    return food_details_list, failed_list
+
+
+def food_details_to_dict(data: FoodDetails) -> Dict[str, Any]:
+    """
+    Convert food details into the format returned by the endpoint.
+    Args:
+        data (FoodDetails): Food label and nutrition details.
+    Returns:
+        Dict[str, Any]: Label, nutrition and weight of food item.
+    """
+    return {
+        "label": data.label,
+        "nutrition": data.nutrition,
+        "weight": data.weight,
+    }
+
+
+def parse_plate_size(form: Mapping[str, Any]) -> float:
+    """
+    Extract plate size from request form if available otherwise use default.
+    Args:
+        form (Mapping[str, Any]): Form fields of request.
+    Returns:
+        float: Plate diameter in cm.
+    """
+    try:
+        return float(form["plateValue"])
+    except Exception as e:
+        log.info(f"[Endpoint] Using default plate size due to exception: {e}")
+        return 25.0
+
+
+def parse_plate_sizes(values: List[str], count: int) -> List[float]:
+    """
+    Extract the plate size of each image in a batch request, matched to the
+    images by position, using the default for missing values.
+    Args:
+        values (List[str]): plateValue form fields of request.
+        count (int): Number of images.
+    Returns:
+        List[float]: Plate diameter in cm for each image.
+    """
+    return [
+        parse_plate_size({"plateValue": values[i]} if i < len(values) else {})
+        for i in range(count)
+    ]
+
+
+def is_image_mimetype(mimetype: str) -> bool:
+    """
+    Check the content type declared for an uploaded file. Clients that do
+    not know the type may leave it empty or send a generic binary type.
+    Args:
+        mimetype (str): Declared content type of the uploaded file.
+    Returns:
+        bool: Whether or not the file may be an image.
+    """
+    return mimetype in ("", "application/octet-stream") or mimetype.startswith("image/")
+
+
+def build_response(results: List, model_code: ModelCodeEnum) -> Dict[str, Any]:
+    """
+    Build the endpoint response depending on whether or not food items
+    are detected.
+    Args:
+        results (List): Food label and nutrition details.
+        model_code (ModelCodeEnum): Model calculation mode used.
+    Returns:
+        Dict[str, Any]: Response containing status, model code and results.
+    """
+    response = {
+        "status": "failure",
+        "model_code": ModelCodeEnum.NO_FOOD_DETECTED.value,
+        "results": [],
+    }
+    if model_code == ModelCodeEnum.VISION_FAILED:
+        response = {"status": "error", "model_code": model_code.value, "results": []}
+    elif results:
+        response = {
+            "status": "success",
+            "model_code": model_code.value,
+            "results": results,
+        }
+        log.info(f"[Endpoint] Sending successful response: {response}")
+    RESPONSES.labels(model_code=response["model_code"]).inc()
+    return response
+
+
 @app.route("/", methods=["POST"])
+@time_stage("request")
+@profiled
 def get_calorie_estimation() -> Any:
     """Endpoint to retrieve calorie information from image in POST request."""
 
     try:
-        # check that file is in request
-        if "file" not in request.files.to_dict():
+        # check that a form upload was sent before reading the body
+        if request.mimetype != "multipart/form-data":
+            abort(400, "File not received.")
+
+        # check that file is in request, parsing the form once
+        files = request.files
+        if "file" not in files:
             abort(400, "File not received.")
 
         # extract image from request
-        image = request.files.to_dict()["file"]
+        image = files["file"]
+        if not is_image_mimetype(image.mimetype):
+            abort(415, "Uploaded file is not an image.")
 
         # extract plate size from request if available otherwise set default
-        try:
-            plate_size = float(request.form.to_dict()["plateValue"])
-        except Exception as e:
-            log.info(f"[Endpoint] Using default plate size due to exception: {e}")
-            plate_size = 25.0
+        plate_size = parse_plate_size(request.form)
 
         # ensure filename present
         if not image.filename:
             raise ValueError("Filename for uploaded image not present.")
 
-        # save image
-        IMAGE_DIR.mkdir(parents=True, exist_ok=True)
-        image_path = IMAGE_DIR / image.filename
-        save_image(image.read(), image_path)
+        # ensure the upload is an image format the model can decode
+        content = image.read()
+        if sniff_image_format(content) is None:
+            abort(415, "Unsupported image format.")
 
-        try:
-            # generate calorie information
-            results, model_code = get_calories(image_path, plate_size)
-        except Exception:
-            raise
-        finally:
-            # remove directory irrespective of failure
-            delete_file(image_path)
-            IMAGE_DIR.rmdir()
+        # generate calorie information from the image held in memory
+        results, model_code = get_calories(content, plate_size)
 
         # send response depending on whether or not food items are detected
-        response = {
-            "status": "failure",
-            "model_code": ModelCodeEnum.NO_FOOD_DETECTED.value,
-            "results": [],
-        }
-        if results:
-            response = {
-                "status": "success",
-                "model_code": model_code.value,
-                "results": results,
-            }
-            log.info(f"[Endpoint] Sending successful response: {response}")
-        return jsonify(response)
+        return jsonify(build_response(results, model_code))
 
+    except HTTPException as e:
+        count_failure(f"http_{e.code}")
+        raise
     except Exception as e:
+        count_failure("internal_error")
         msg = f"Unable to return calorie information due to error: {e}"
         log.error(msg)
         abort(500, msg)
 
 
+@app.route("/batch", methods=["POST"])
+@time_stage("request")
+@profiled
+def get_batch_calorie_estimation() -> Any:
+    """
+    Endpoint to retrieve calorie information for several images in one POST
+    request, sent as repeated file fields with optional repeated plateValue
+    fields in the same order. Returns one response (see /) per image.
+    """
+
+    try:
+        # check that a form upload was sent before reading the body
+        if request.mimetype != "multipart/form-data":
+            abort(400, "File not received.")
+
+        # check that files are in request, parsing the form once
+        images = request.files.getlist("file")
+        if not images:
+            abort(400, "File not received.")
+        if len(images) > BATCH_MAX_IMAGES:
+            abort(400, f"At most {BATCH_MAX_IMAGES} images can be sent at once.")
+
+        # ensure all uploads are images the model can decode
+        contents = []
+        for i, image in enumerate(images):
+            content = image.read()
+            if not is_image_mimetype(image.mimetype) or not sniff_image_format(content):
+                abort(415, f"Uploaded file {i} is not a supported image.")
+            contents.append(content)
+
+        # extract plate sizes from request if available otherwise set default
+        plate_sizes = parse_plate_sizes(request.form.getlist("plateValue"), len(images))
+
+        # generate calorie information for all images held in memory
+        outputs = get_calories_batch(contents, plate_sizes)
+
+        # send one response per image depending on whether food items are detected
+        return jsonify([build_response(results, code) for results, code in outputs])
+
+    except HTTPException as e:
+        count_failure(f"http_{e.code}")
+        raise
+    except Exception as e:
+        count_failure("internal_error")
+        msg = f"Unable to return calorie information due to error: {e}"
+        log.error(msg)
+        abort(500, msg)
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics() -> Any:
+    """Endpoint exposing Prometheus metrics, aggregated over all workers."""
+    try:
+        data, content_type = render_metrics()
+    except ImportError as e:
+        abort(501, str(e))
+    return Response(data, content_type=content_type)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0")
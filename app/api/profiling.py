@@ -0,0 +1,133 @@
+"""Opt-in profiling of a sample of requests, writing one profile per request."""
+
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from flask import request
+
+from app.estimator.constants import (
+    PROFILE_DIR,
+    PROFILE_HEADER,
+    PROFILE_INTERVAL,
+    PROFILE_SAMPLE_RATE,
+)
+
+log = logging.getLogger("profiling")
+
+# requests are profiled one at a time, so profiles do not overlap and the
+# overhead stays bounded under load
+_profile_lock = threading.Lock()
+
+
+def should_profile(
+    header: str = "",
+    sample_rate: float = PROFILE_SAMPLE_RATE,
+    allow_header: bool = PROFILE_HEADER,
+) -> bool:
+    """
+    Decide whether a request is profiled.
+    Args:
+        header (str): Value of the X-Profile header of the request.
+        sample_rate (float): Fraction of requests profiled at random.
+        allow_header (bool): Whether the X-Profile header forces profiling.
+    Returns:
+        bool: True if the request should be profiled.
+    """
+    if allow_header and header.lower() in ("1", "true"):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+@contextmanager
+def profile(name: str, directory: Path = PROFILE_DIR) -> Iterator[None]:
+    """
+    Profile a block and write the profile to a new file in the directory:
+    an HTML report of the statistical pyinstrument profiler if installed,
+    otherwise cProfile stats. Only the calling thread is profiled: work the
+    request hands to other threads (the YOLO model when micro-batching is
+    enabled, lookups on lookup_executor and speculative Vision API calls)
+    only shows up as time spent waiting. The block runs unprofiled while
+    another profile is being taken.
+    Args:
+        name (str): Name included in the file name, e.g. the endpoint.
+        directory (Path): Directory the profile is written to.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    # imported here, as profiling is off by default and the import is slow
+    try:
+        import pyinstrument
+    except ImportError:
+        pyinstrument = None  # type: ignore[assignment]
+
+    timestamp = time.strftime("%Y%m%dT%H%M%S")
+    stem = f"{timestamp}-{name}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    try:
+        if pyinstrument is not None:
+            profiler = pyinstrument.Profiler(interval=PROFILE_INTERVAL)
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                write_profile(directory / f"{stem}.html", profiler.output_html)
+        else:
+            stats = cProfile.Profile()
+            stats.enable()
+            try:
+                yield
+            finally:
+                stats.disable()
+                path = directory / f"{stem}.prof"
+                write_profile(path, lambda: stats.dump_stats(path))
+    finally:
+        _profile_lock.release()
+
+
+def write_profile(path: Path, render: Callable[[], Any]) -> None:
+    """
+    Write a profile without failing the profiled request.
+    Args:
+        path (Path): Location of the profile.
+        render (Callable[[], Any]): Returns the profile as text, or writes it
+            to path itself and returns None.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = render()
+        if content is not None:
+            path.write_text(content)
+        log.info(f"[Profiling] Wrote profile to {path}.")
+    except Exception as e:
+        log.error(f"[Profiling] Unable to write profile to {path}: {e}")
+
+
+def profiled(view: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Profile a sample of the requests handled by a Flask view (see should_profile).
+    Args:
+        view (Callable[..., Any]): View function.
+    Returns:
+        Callable[..., Any]: View function profiling sampled requests.
+    """
+
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        header = request.headers.get("X-Profile", "")
+        if not should_profile(header, PROFILE_SAMPLE_RATE, PROFILE_HEADER):
+            return view(*args, **kwargs)
+        with profile(view.__name__, PROFILE_DIR):
+            return view(*args, **kwargs)
+
+    return wrapper
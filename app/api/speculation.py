@@ -0,0 +1,240 @@
+"""Speculative Vision API calls started in parallel with the YOLO model."""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, Union
+
+import cv2
+import numpy as np
+
+from app.metrics import count_speculation
+from app.util import ImageSource
+
+log = logging.getLogger("API")
+
+
+class MissRateTracker:
+    """
+    Exponentially weighted moving average of how often the YOLO model finds
+    no food, used as a cheap predictor of whether the next request will
+    need the Vision API.
+    Attributes:
+        alpha (float): Weight of the most recent outcome.
+        rate (float): Current estimate of the miss rate.
+    """
+
+    def __init__(self, alpha: float = 0.1, initial_rate: float = 0.0) -> None:
+        self.alpha = alpha
+        self.rate = initial_rate
+        self._lock = threading.Lock()
+
+    def update(self, missed: bool) -> None:
+        """Record whether the YOLO model missed on a request."""
+        with self._lock:
+            self.rate = (1 - self.alpha) * self.rate + self.alpha * float(missed)
+
+
+def predict_miss(
+    image: ImageSource,
+    thumbnail_size: int = 64,
+    min_brightness: float = 40.0,
+    min_sharpness: float = 10.0,
+    min_food_fraction: float = 0.15,
+) -> bool:
+    """
+    Predict from a thumbnail whether the YOLO model will find no food in a
+    photo: photos that are too dark, too blurry or with few food-coloured
+    (saturated, not blue or violet) pixels. Only decoded arrays are checked.
+    Args:
+        image (ImageSource): Image, checked if it is a decoded BGR array.
+        thumbnail_size (int): Longest side of the thumbnail checked.
+        min_brightness (float): Mean grey level below which a photo is too dark.
+        min_sharpness (float): Variance of the Laplacian below which a photo
+            is too blurry.
+        min_food_fraction (float): Fraction of food-coloured pixels below
+            which a photo is unlikely to show food.
+    Returns:
+        bool: Whether the YOLO model is likely to miss.
+    """
+    if not isinstance(image, np.ndarray):
+        return False
+
+    scale = thumbnail_size / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(
+            image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if grey.mean() < min_brightness:
+        return True
+    if cv2.Laplacian(grey, cv2.CV_64F).var() < min_sharpness:
+        return True
+
+    hue, saturation, value = cv2.split(cv2.cvtColor(image, cv2.COLOR_BGR2HSV))
+    food = (saturation >= 60) & (value >= 50) & ((hue < 90) | (hue >= 150))
+    return bool(food.mean() < min_food_fraction)
+
+
+@dataclass
+class SpeculationStats:
+    """
+    Accounting of speculative Vision API calls, also exported as metrics.
+    Attributes:
+        started (int): Number of speculative calls started.
+        used (int): Number of calls whose result was used.
+        cancelled (int): Number of calls cancelled before they started.
+        wasted (int): Number of calls that ran but whose result was discarded.
+        wasted_seconds (float): Total time spent in discarded calls.
+    """
+
+    started: int = 0
+    used: int = 0
+    cancelled: int = 0
+    wasted: int = 0
+    wasted_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, outcome: str, wasted_seconds: Optional[float] = None) -> None:
+        """
+        Count a speculative call by outcome.
+        Args:
+            outcome (str): started, used, cancelled or wasted.
+            wasted_seconds (Optional[float]): Time spent in a wasted call.
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if wasted_seconds is not None:
+                self.wasted_seconds += wasted_seconds
+        count_speculation(outcome, wasted_seconds)
+
+
+class SpeculativeCall:
+    """
+    Vision API call running in the background while the YOLO model runs.
+    Attributes:
+        future (Union[Future, asyncio.Future]): Result of the call, a task
+            of the event loop for asynchronous calls.
+        stats (SpeculationStats): Accounting updated when the call is used
+            or discarded.
+    """
+
+    def __init__(
+        self, future: Union[Future, "asyncio.Future[Any]"], stats: SpeculationStats
+    ) -> None:
+        self.future = future
+        self.stats = stats
+        self.started = time.monotonic()
+
+    def use(self) -> Union[Future, "asyncio.Future[Any]"]:
+        """Mark the call as used and return its future."""
+        self.stats.record("used")
+        return self.future
+
+    def result(self) -> Any:
+        """Wait for and use the result of the call."""
+        return self.use().result()
+
+    def discard(self) -> None:
+        """
+        Cancel the call if it has not started, or is a task still awaiting
+        the Vision API, otherwise ignore its result.
+        """
+        if self.future.cancel():
+            log.info("[Endpoint] Cancelled speculative Vision API call.")
+            self.stats.record("cancelled")
+            return
+
+        # account for the time spent once the call completes
+        def record(future: Any) -> None:
+            elapsed = time.monotonic() - self.started
+            log.info(
+                f"[Endpoint] Discarded speculative Vision API call ({elapsed:.2f}s)."
+            )
+            self.stats.record("wasted", elapsed)
+
+        self.future.add_done_callback(record)
+
+
+class VisionSpeculator:
+    """
+    Decide when to start the Vision API fallback alongside the YOLO model
+    and run it in a background executor. Auto mode checks each photo (see
+    predict_miss), while miss_rate mode uses one miss rate shared by all
+    requests of the process, so while most recent photos had no food it
+    speculates for every request, including those the YOLO model handles.
+    Attributes:
+        mode (str): off, auto (speculate for photos the YOLO model is likely
+            to miss), miss_rate (speculate when the recent YOLO miss rate is
+            at least miss_rate) or always.
+        miss_rate (float): Miss rate above which miss_rate mode speculates.
+        tracker (MissRateTracker): Recent YOLO miss rate.
+        stats (SpeculationStats): Accounting of speculative calls.
+    """
+
+    def __init__(self, mode: str = "off", miss_rate: float = 0.5, workers: int = 4):
+        if mode not in ("off", "auto", "miss_rate", "always"):
+            raise ValueError(f"Unknown speculative Vision mode '{mode}'")
+        self.mode = mode
+        self.miss_rate = miss_rate
+        self.tracker = MissRateTracker()
+        self.stats = SpeculationStats()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="speculative-vision"
+        )
+
+    def should_speculate(self, image: ImageSource) -> bool:
+        """
+        Predict whether the Vision API will be needed for a request.
+        Args:
+            image (ImageSource): Decoded image of the request.
+        Returns:
+            bool: Whether to start a speculative call.
+        """
+        if self.mode == "always":
+            return True
+        if self.mode == "miss_rate":
+            return self.tracker.rate >= self.miss_rate
+        return self.mode == "auto" and predict_miss(image)
+
+    def start(
+        self, image: ImageSource, fn: Callable, *args: Any
+    ) -> Optional[SpeculativeCall]:
+        """
+        Start a speculative call if the fallback is likely to be needed.
+        Args:
+            image (ImageSource): Decoded image of the request.
+            fn (Callable): Function calling the Vision API.
+            args (Any): Arguments of fn.
+        Returns:
+            Optional[SpeculativeCall]: Running call, None if not speculating.
+        """
+        if not self.should_speculate(image):
+            return None
+        self.stats.record("started")
+        return SpeculativeCall(self._executor.submit(fn, *args), self.stats)
+
+    def start_async(
+        self,
+        image: ImageSource,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+    ) -> Optional[SpeculativeCall]:
+        """
+        Start a speculative call as a task of the running event loop if the
+        fallback is likely to be needed. Discarding the call cancels the task.
+        Args:
+            image (ImageSource): Decoded image of the request.
+            fn (Callable[..., Awaitable[Any]]): Coroutine function calling
+                the Vision API.
+            args (Any): Arguments of fn.
+        Returns:
+            Optional[SpeculativeCall]: Running call, None if not speculating.
+        """
+        if not self.should_speculate(image):
+            return None
+        self.stats.record("started")
+        return SpeculativeCall(asyncio.ensure_future(fn(*args)), self.stats)
@@ -0,0 +1,106 @@
+"""Warmup of a worker, moving the cost of the first request to its start-up."""
+
+import gc
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.estimator import calories, vision, yolo
+from app.estimator.backends import get_backend
+from app.estimator.constants import (
+    IMGSZ_FULL,
+    IMGSZ_LOW,
+    IMGSZ_POLICY,
+    TORCH_THREADS,
+)
+from app.estimator.nutrition_table import get_local_nutrition
+
+log = logging.getLogger("warmup")
+
+
+def warm_model() -> None:
+    """Load the shared YOLO model and run it once at each input resolution in use."""
+    model = yolo.get_model()
+    blank = np.zeros((IMGSZ_FULL, IMGSZ_FULL, 3), dtype=np.uint8)
+    sizes = [IMGSZ_FULL] if IMGSZ_POLICY == "fixed" else [IMGSZ_LOW, IMGSZ_FULL]
+    for imgsz in sizes:
+        yolo.predict(model, [blank], imgsz)
+
+
+def warm_nutrition_table() -> None:
+    """Load the bundled nutrition table."""
+    get_local_nutrition("")
+
+
+# steps in order, with whether a failure stops the worker from starting - the
+# Vision API is only a fallback, so missing credentials are logged instead
+WARMUP_STEPS: List[Tuple[str, Callable[[], object], bool]] = [
+    ("edamam_credentials", calories.get_credentials, True),
+    ("model", warm_model, True),
+    ("edamam_session", calories.get_session, True),
+    ("nutrition_table", warm_nutrition_table, True),
+    ("vision_client", vision.get_client, False),
+]
+
+
+def warmup() -> Dict[str, float]:
+    """
+    Load the model, clients and data used by requests, which are otherwise
+    loaded on first use.
+    Returns:
+        Dict[str, float]: Duration in seconds of each completed step.
+    """
+    timings = {}
+    for name, step, required in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            if required:
+                raise
+            log.warning(f"[Warmup] Skipped {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+
+    log.info(f"[Warmup] Completed in {sum(timings.values()):.2f}s: {timings}")
+    return timings
+
+
+def preload() -> None:
+    """
+    Load the model in the gunicorn master before the workers are forked, so
+    that all workers share the memory pages of its weights copy-on-write.
+    """
+    import torch
+
+    # the master must not start the OpenMP thread pool, whose threads would
+    # be missing in the forked workers
+    torch.set_num_threads(1)
+
+    model = yolo.get_model()
+    # each worker would otherwise fuse the layers on its first prediction,
+    # writing new private copies of the weights
+    if get_backend().export_format is None:
+        model.fuse()
+
+    # keep the garbage collector from writing to the objects of the master,
+    # which would copy their pages into every worker
+    gc.collect()
+    gc.freeze()
+    log.info(f"[Warmup] Preloaded model, {gc.get_freeze_count()} objects frozen.")
+
+
+def init_worker(workers: int) -> None:
+    """
+    Size the torch thread pool of a forked worker, dividing the CPU cores
+    among the workers unless TORCH_THREADS is set.
+    Args:
+        workers (int): Number of worker processes.
+    """
+    import torch
+
+    threads = TORCH_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(threads)
@@ -0,0 +1,109 @@
+"""Pooled, retrying asynchronous HTTP client for external APIs called by the ASGI app."""
+
+import asyncio
+import random
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.estimator.http_client import RETRY_STATUSES, ConnectionStats
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Keep-alive connection pool retrying GET requests on connection errors,
+    rate limiting (429) and transient server errors (5xx) with jittered
+    exponential backoff, like the retries of the synchronous session.
+    Attributes:
+        stats (ConnectionStats): Counters updated by the transport.
+        retries (int): Maximum number of retries per request.
+        backoff_factor (float): Base of the exponential backoff in seconds.
+        backoff_jitter (float): Maximum random delay added to each backoff.
+    """
+
+    def __init__(
+        self,
+        stats: ConnectionStats,
+        pool_size: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.25,
+        backoff_jitter: float = 0.1,
+    ) -> None:
+        self.stats = stats
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            )
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions = {**request.extensions, "trace": self._trace}
+        retries = self.retries if request.method == "GET" else 0
+
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError:
+                if attempt >= retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    self.stats.add_request()
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                await response.aclose()
+            await asyncio.sleep(self.get_backoff_time(attempt, retry_after))
+            attempt += 1
+
+    def get_backoff_time(self, attempt: int, retry_after: Optional[str]) -> float:
+        """
+        Delay before the next attempt, retrying immediately the first time.
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0.
+            retry_after (Optional[str]): Retry-After header of the response.
+        Returns:
+            float: Delay in seconds.
+        """
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        if attempt == 0:
+            return 0.0
+        backoff = self.backoff_factor * 2**attempt
+        return backoff + random.uniform(0, self.backoff_jitter)
+
+    async def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.stats.add_connection()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def create_async_client(
+    stats: ConnectionStats,
+    pool_size: int = 10,
+    retries: int = 3,
+    backoff_factor: float = 0.25,
+    backoff_jitter: float = 0.1,
+) -> httpx.AsyncClient:
+    """
+    Create an asynchronous client with the connection pool and retries of
+    create_session.
+    Args:
+        stats (ConnectionStats): Counters updated by the client.
+        pool_size (int): Maximum number of connections kept open.
+        retries (int): Maximum number of retries per request.
+        backoff_factor (float): Base of the exponential backoff in seconds.
+        backoff_jitter (float): Maximum random delay added to each backoff.
+    Returns:
+        httpx.AsyncClient: Configured client.
+    """
+    transport = RetryTransport(
+        stats, pool_size, retries, backoff_factor, backoff_jitter
+    )
+    return httpx.AsyncClient(transport=transport)
@@ -0,0 +1,129 @@
+"""Inference runtimes available for serving the YOLO segmentation model."""
+import argparse
+import importlib.util
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.estimator.constants import INFERENCE_BACKEND, MODEL_VERSION
+
+log = logging.getLogger("backends")
+
+
+@dataclass
+class InferenceBackend:
+    """
+    Runtime used to serve the segmentation model. All backends are loaded
+    through ultralytics, so predictions are post-processed identically and
+    return the same labels, areas and dims.
+    Attributes:
+        name (str): Name used to select the backend.
+        artifact (Path): Model file or directory loaded by this backend.
+        requirement (str): Module that must be installed to run the backend.
+        export_format (Optional[str]): Ultralytics export format used to create
+            the artifact from MODEL_VERSION (None if no export is needed).
+        export_args (dict[str, Any]): Extra arguments passed to the export.
+    """
+
+    name: str
+    artifact: Path
+    requirement: str
+    export_format: Optional[str] = None
+    export_args: Dict[str, Any] = field(default_factory=dict)
+
+
+BACKENDS = {
+    "torch": InferenceBackend("torch", MODEL_VERSION, "torch"),
+    "onnx": InferenceBackend(
+        "onnx",
+        MODEL_VERSION.with_suffix(".onnx"),
+        "onnxruntime",
+        export_format="onnx",
+        export_args={"dynamic": True},
+    ),
+    "openvino": InferenceBackend(
+        "openvino",
+        MODEL_VERSION.parent / f"{MODEL_VERSION.stem}_openvino_model",
+        "openvino",
+        export_format="openvino",
+        export_args={"dynamic": True},
+    ),
+    "onnx_int8": InferenceBackend(
+        "onnx_int8",
+        MODEL_VERSION.parent / f"{MODEL_VERSION.stem}_int8.onnx",
+        "onnxruntime",
+        export_format="onnx_int8",
+    ),
+}
+
+
+def get_backend(name: str = INFERENCE_BACKEND) -> InferenceBackend:
+    """
+    Look up an inference backend by name.
+    Args:
+        name (str): Name of backend (defaults to INFERENCE_BACKEND).
+    Returns:
+        InferenceBackend: Selected backend.
+    """
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown inference backend '{name}', expected one of: {', '.join(BACKENDS)}"
+        )
+
+
+def check_backend(backend: InferenceBackend) -> None:
+    """
+    Ensure that a backend can be loaded, i.e. that its runtime is installed
+    and its model artifact has been exported.
+    Args:
+        backend (InferenceBackend): Backend to check.
+    """
+    if importlib.util.find_spec(backend.requirement) is None:
+        raise ImportError(
+            f"Inference backend '{backend.name}' requires '{backend.requirement}' "
+            + "to be installed."
+        )
+    if not backend.artifact.exists():
+        raise FileNotFoundError(
+            f"Model artifact {backend.artifact} for backend '{backend.name}' not "
+            + f"found, create it with: python -m app.estimator.backends {backend.name}"
+        )
+
+
+def export_backend(backend: InferenceBackend, **kwargs: Any) -> Path:
+    """
+    Export MODEL_VERSION to the artifact used by a backend.
+    Args:
+        backend (InferenceBackend): Backend to export the model for.
+        kwargs (Any): Additional ultralytics export arguments.
+    Returns:
+        Path: Location of the exported artifact.
+    """
+    if backend.export_format is None:
+        return backend.artifact
+
+    # the quantized model is produced from the float ONNX export
+    if backend.export_format == "onnx_int8":
+        from app.estimator.quantize import quantize_model
+
+        return quantize_model(**kwargs)
+
+    from ultralytics import YOLO
+
+    model = YOLO(MODEL_VERSION)
+    path = model.export(
+        format=backend.export_format, **{**backend.export_args, **kwargs}
+    )
+    log.info(f"[Backends] Exported {MODEL_VERSION} for '{backend.name}' to {path}")
+
+    return Path(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export model for a backend.")
+    parser.add_argument("backend", choices=[n for n in BACKENDS if n != "torch"])
+    args = parser.parse_args()
+    export_backend(get_backend(args.backend))
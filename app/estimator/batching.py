@@ -0,0 +1,120 @@
+"""Micro-batching of concurrent calls into a single batched function call."""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import (
+    Callable,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+log = logging.getLogger("batching")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collect items submitted from concurrent callers and process them together.
+    A background thread waits for the first item, then keeps collecting items
+    until either max_batch_size items are queued or max_wait_ms has elapsed,
+    and passes the batch to process_batch. Each caller receives the result
+    at the same position in the returned list, and an exception returned at
+    that position is raised for that caller only.
+    Attributes:
+        process_batch (Callable): Function mapping a list of items to a list
+            of results or exceptions of the same length.
+        max_batch_size (int): Maximum number of items per batch.
+        max_wait_ms (float): Maximum time to wait for a batch to fill up.
+        name (str): Name used for the background thread and logging.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[T]], Sequence[Union[R, Exception]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher",
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("Batch size must be at least 1.")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self._queue: "queue.Queue[Tuple[T, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: T) -> "Future[R]":
+        """
+        Queue an item for the next batch.
+        Args:
+            item (T): Item to process.
+        Returns:
+            Future[R]: Future resolved with the result for this item.
+        """
+        self._ensure_started()
+        future: "Future[R]" = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: T) -> R:
+        """Submit an item and block until its result is available."""
+        return self.submit(item).result()
+
+    def _ensure_started(self) -> None:
+        # start the worker lazily so that it is created in the process that uses it
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name=self.name, daemon=True
+                    )
+                    self._thread.start()
+
+    def _collect(self) -> List[Tuple[T, Future]]:
+        # block until the first item arrives, then fill the batch until the deadline
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.process_batch(items)
+                if len(results) != len(items):
+                    raise ValueError(
+                        f"Expected {len(items)} results from batch but got {len(results)}."
+                    )
+            except Exception as e:
+                log.error(f"[{self.name}] Batch of {len(items)} failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            log.info(f"[{self.name}] Processed batch of {len(items)} items.")
+            for future, result in zip(futures, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -1,26 +1,37 @@
 """Functions to retrieve nutritional information from the Edamam API based on a search string."""
+import asyncio
 import logging
 import os
-from dataclasses import dataclass
-from typing import Any, Dict
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 import requests
 
-from app.estimator.constants import EDAMAM_URL
+from app.estimator.constants import (
+    EDAMAM_BACKOFF_FACTOR,
+    EDAMAM_BACKOFF_JITTER,
+    EDAMAM_CONNECT_TIMEOUT,
+    EDAMAM_MAX_RETRIES,
+    EDAMAM_POOL_SIZE,
+    EDAMAM_READ_TIMEOUT,
+    EDAMAM_URL,
+    NUTRITION_CACHE_PATH,
+    NUTRITION_CACHE_SIZE,
+)
+from app.estimator.http_client import ConnectionStats, create_session
+from app.estimator.labels import resolve_label
+from app.estimator.nutrition_cache import NutritionCache
+from app.estimator.nutrition_table import get_local_nutrition
+from app.metrics import count_failure, time_stage
+
+# the asynchronous HTTP client is only imported by the ASGI app
+if TYPE_CHECKING:
+    import httpx
 
 log = logging.getLogger("calories")
 
-try:
-    # load environment variables for using Edamam API
-    APP_KEY = os.environ["EDAMAM_KEY"]
-    APP_ID = os.environ["EDAMAM_ID"]
-except KeyError:
-    raise EnvironmentError(
-        "Not all environment variables seem to be set: "
-        + f"\n EDAMAM_KEY = {os.environ.get('EDAMAM_KEY', '<UNSET>')}"
-        + f"\n EDAMAM_ID = {os.environ.get('EDAMAM_ID', '<UNSET>')}"
-    )
-
 
 @dataclass
 class FoodDetails:
@@ -37,32 +48,194 @@ class FoodDetails:
     weight: float = 100.0
 
 
+# pooled session for Edamam API, created on first use
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+connection_stats = ConnectionStats("edamam")
+
+# asynchronous client of the ASGI app, bound to the event loop that created it
+_async_client: Optional[Tuple[asyncio.AbstractEventLoop, "httpx.AsyncClient"]] = None
+
+# per-100g nutrition shared by all requests for the same search term
+nutrition_cache = NutritionCache(
+    Path(NUTRITION_CACHE_PATH) if NUTRITION_CACHE_PATH else None, NUTRITION_CACHE_SIZE
+)
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared Edamam API session, which keeps connections alive
+    between requests and retries transient errors.
+    Returns:
+        requests.Session: Pooled session.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session(
+                    connection_stats,
+                    pool_size=EDAMAM_POOL_SIZE,
+                    retries=EDAMAM_MAX_RETRIES,
+                    backoff_factor=EDAMAM_BACKOFF_FACTOR,
+                    backoff_jitter=EDAMAM_BACKOFF_JITTER,
+                )
+    return _session
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """
+    Return the asynchronous Edamam API client of the running event loop,
+    with the same connection pool, timeouts and retries as the session.
+    Only called from the event loop, so no lock is needed.
+    Returns:
+        httpx.AsyncClient: Pooled client.
+    """
+    from app.estimator.async_http_client import create_async_client
+
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client[0] is not loop:
+        _async_client = (
+            loop,
+            create_async_client(
+                connection_stats,
+                pool_size=EDAMAM_POOL_SIZE,
+                retries=EDAMAM_MAX_RETRIES,
+                backoff_factor=EDAMAM_BACKOFF_FACTOR,
+                backoff_jitter=EDAMAM_BACKOFF_JITTER,
+            ),
+        )
+    return _async_client[1]
+
+
+async def close_async_client() -> None:
+    """Close the connections of the asynchronous client of the running event loop."""
+    global _async_client
+    if _async_client is not None and _async_client[0] is asyncio.get_running_loop():
+        await _async_client[1].aclose()
+        _async_client = None
+
+
+def get_credentials() -> Tuple[str, str]:
+    """
+    Read the Edamam API credentials from the environment when they are needed
+    rather than when the module is imported.
+    Returns:
+        Tuple[str, str]: Application ID and key.
+    """
+    try:
+        # load environment variables for using Edamam API
+        return os.environ["EDAMAM_ID"], os.environ["EDAMAM_KEY"]
+    except KeyError:
+        raise EnvironmentError(
+            "Not all environment variables seem to be set: "
+            + f"\n EDAMAM_KEY = {os.environ.get('EDAMAM_KEY', '<UNSET>')}"
+            + f"\n EDAMAM_ID = {os.environ.get('EDAMAM_ID', '<UNSET>')}"
+        )
+
+
 def get_food_details(search: str, weight: float = 100.0) -> FoodDetails:
     """
-    Entry point for generating nutritional information using the
-    Edamam API for an input food search term.
+    Entry point for generating nutritional information for an input food
+    search term, using the bundled nutrition table or the Edamam API.
     Args:
         search (str): Food item for request.
         weight (float): Estimated weight in grams.
     Returns:
         FoodDetails: Food label and nutrition details.
     """
-    # make Edamam API call
-    response = make_request(search)
-    data = check_response(response)
+    # get nutrition per 100g and scale nutrition by weight
+    return scale_nutrition(get_food_nutrition(search), weight)
 
-    # parse relevant data from API
-    details = parse_json(data)
 
-    # scale nutrition by weight
-    details = scale_nutrition(details, weight)
+def get_food_nutrition(search: str) -> FoodDetails:
+    """
+    Retrieve nutritional information per 100g for an input food search term,
+    using the bundled nutrition table or the Edamam API.
+    Args:
+        search (str): Food item for request.
+    Returns:
+        FoodDetails: Food label and nutrition details for 100g.
+    """
+    item = resolve_search(search)
+
+    # get nutrition per 100g from bundled table, or cache and Edamam API on a miss
+    record = get_local_nutrition(item)
+    if record is None:
+        record = nutrition_cache.get_or_fetch(item, fetch_nutrition)
+
+    return to_food_details(item, record)
+
+
+async def get_food_details_async(search: str, weight: float = 100.0) -> FoodDetails:
+    """
+    Asynchronous get_food_details, awaiting the Edamam API on a miss of the
+    nutrition table and cache.
+    Args:
+        search (str): Food item for request.
+        weight (float): Estimated weight in grams.
+    Returns:
+        FoodDetails: Food label and nutrition details.
+    """
+    item = resolve_search(search)
+
+    # concurrent misses for the same item are not coalesced, unlike get_or_fetch
+    record = get_local_nutrition(item) or nutrition_cache.get(item)
+    if record is None:
+        record = asdict(parse_json(check_response(await make_request_async(item))))
+        nutrition_cache.put(item, record)
+
+    return scale_nutrition(to_food_details(item, record), weight)
 
-    # use the original search term as the label
-    details.label = search.capitalize()
+
+def resolve_search(search: str) -> str:
+    """
+    Resolve a search term to a food item, avoiding requests for unknown labels.
+    Args:
+        search (str): Food item for request.
+    Returns:
+        str: Canonical food item.
+    """
+    item = resolve_label(search)
+    if item is None:
+        raise ValueError(f"Search term is not a known food item: {search}")
+    return item
+
+
+def to_food_details(item: str, record: Dict[str, Any]) -> FoodDetails:
+    """
+    Create food details from a nutrition record, labelled with the food item.
+    Args:
+        item (str): Canonical food item.
+        record (Dict[str, Any]): Fields of FoodDetails for 100g.
+    Returns:
+        FoodDetails: Food label and nutrition details for 100g.
+    """
+    details = FoodDetails(**record)
+
+    # use the resolved search term as the label
+    details.label = item.capitalize()
 
     return details
 
 
+def fetch_nutrition(search: str) -> Dict[str, Any]:
+    """
+    Retrieve nutritional information per 100g from the Edamam API.
+    Args:
+        search (str): Food item for request.
+    Returns:
+        dict[str, Any]: Fields of FoodDetails for 100g of the food item.
+    """
+    # make Edamam API call
+    response = make_request(search)
+    data = check_response(response)
+
+    # parse relevant data from API
+    return asdict(parse_json(data))
+
+
 def make_request(search: str) -> Any:
     """
     Request calorie information from Edamam API based on input
@@ -74,12 +247,62 @@ def make_request(search: str) -> Any:
     """
 
     # parameters required for API call
-    params = {"app_id": APP_ID, "app_key": APP_KEY, "ingr": search}
-
-    # make request
-    response = requests.get(url=EDAMAM_URL, params=params)
+    app_id, app_key = get_credentials()
+    params = {"app_id": app_id, "app_key": app_key, "ingr": search}
+
+    # make request on pooled connection, giving up after the timeouts and retries
+    try:
+        with time_stage("edamam"):
+            response = get_session().get(
+                url=EDAMAM_URL,
+                params=params,
+                timeout=(EDAMAM_CONNECT_TIMEOUT, EDAMAM_READ_TIMEOUT),
+            )
+    except requests.RequestException as e:
+        count_failure("edamam_api")
+        raise ValueError(
+            f"Edamam API could not return information for term: {search}"
+        ) from e
 
     if not response.ok:
+        count_failure("edamam_api")
+        raise ValueError(f"Edamam API could not return information for term: {search}")
+
+    log.debug(f"[Edamam API] Connection stats: {connection_stats}")
+
+    return response
+
+
+async def make_request_async(search: str) -> "httpx.Response":
+    """
+    Asynchronous make_request on the pooled client of the running event loop.
+    Args:
+        search (str): Food item for request.
+    Returns:
+        httpx.Response: Successful API response.
+    """
+    import httpx
+
+    app_id, app_key = get_credentials()
+    params = {"app_id": app_id, "app_key": app_key, "ingr": search}
+
+    try:
+        with time_stage("edamam"):
+            response = await get_async_client().get(
+                EDAMAM_URL,
+                params=params,
+                timeout=httpx.Timeout(
+                    EDAMAM_READ_TIMEOUT, connect=EDAMAM_CONNECT_TIMEOUT
+                ),
+            )
+    except httpx.HTTPError as e:
+        count_failure("edamam_api")
+        raise ValueError(
+            f"Edamam API could not return information for term: {search}"
+        ) from e
+
+    if not response.is_success:
+        count_failure("edamam_api")
         raise ValueError(f"Edamam API could not return information for term: {search}")
 
     return response
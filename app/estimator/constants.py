@@ -1,9 +1,35 @@
+import os
 from pathlib import Path
 
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment."""
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes")
+
+
 # ----- Edamam API -----
 # URL endpoint
 EDAMAM_URL = "https://api.edamam.com/api/food-database/v2/parser"
 
+# Connection pool, timeouts (in seconds) and retries of transient errors
+EDAMAM_POOL_SIZE = int(os.environ.get("EDAMAM_POOL_SIZE", 10))
+EDAMAM_CONNECT_TIMEOUT = float(os.environ.get("EDAMAM_CONNECT_TIMEOUT", 3.05))
+EDAMAM_READ_TIMEOUT = float(os.environ.get("EDAMAM_READ_TIMEOUT", 10.0))
+EDAMAM_MAX_RETRIES = int(os.environ.get("EDAMAM_MAX_RETRIES", 3))
+EDAMAM_BACKOFF_FACTOR = float(os.environ.get("EDAMAM_BACKOFF_FACTOR", 0.25))
+EDAMAM_BACKOFF_JITTER = float(os.environ.get("EDAMAM_BACKOFF_JITTER", 0.1))
+
+# Nutrition lookups cached in memory and on disk (empty path keeps them in memory only)
+NUTRITION_CACHE_PATH = os.environ.get("NUTRITION_CACHE_PATH", "nutrition_cache.sqlite3")
+NUTRITION_CACHE_SIZE = int(os.environ.get("NUTRITION_CACHE_SIZE", 512))
+# Bundled approximate nutrition per 100g of the YOLO classes and common Vision API
+# labels, used before the Edamam API (empty path disables it)
+NUTRITION_TABLE_PATH = os.environ.get(
+    "NUTRITION_TABLE_PATH", str(Path(__file__).parent / "data" / "nutrition.csv")
+)
+# Maximum number of nutrition lookups running at the same time
+NUTRITION_LOOKUP_WORKERS = int(os.environ.get("NUTRITION_LOOKUP_WORKERS", 8))
+
 # ----- Weight Estimation Constants -----
 # Image size for a camera distance of 20cm from the item
 IMAGE_HEIGHT = 30
@@ -36,7 +62,84 @@ DENSITY_DICT = {
 MODEL_VERSION = Path("model.pt")
 MODEL_THRESHOLD = 0.7
 
+# Runtime used for inference: torch, onnx, onnx_int8 or openvino (see app.estimator.backends)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+
+# Input resolution policy: fixed (always IMGSZ_FULL), adaptive (never upscale
+# small uploads) or progressive (IMGSZ_LOW first, IMGSZ_FULL only if needed)
+IMGSZ_POLICY = os.environ.get("IMGSZ_POLICY", "fixed")
+IMGSZ_FULL = int(os.environ.get("IMGSZ_FULL", 640))
+IMGSZ_LOW = int(os.environ.get("IMGSZ_LOW", 320))
+# Progressive mode re-runs at full resolution if any item is below this confidence
+PROGRESSIVE_MIN_CONFIDENCE = float(os.environ.get("PROGRESSIVE_MIN_CONFIDENCE", 0.85))
+# ... or if any mask covers less than this fraction of the image
+PROGRESSIVE_MIN_MASK_AREA = float(os.environ.get("PROGRESSIVE_MIN_MASK_AREA", 0.01))
+
+# Longest side JPEG uploads are reduced towards while decoding (0 decodes at full size)
+DECODE_MAX_SIZE = int(os.environ.get("DECODE_MAX_SIZE", IMGSZ_FULL))
+
+# Images used to calibrate and check the INT8 quantized model
+CALIBRATION_DIR = Path("calibration/")
+# Minimum fraction of images on which the quantized model must agree with the float model
+QUANTIZATION_MIN_AGREEMENT = 0.95
+# Maximum mean absolute difference in relative item area allowed after quantization
+QUANTIZATION_MAX_AREA_ERROR = 0.02
+
+# Micro-batching of concurrent predictions (a batch size of 1 disables batching).
+# Batches run on a scheduler thread, which request profiles do not cover.
+YOLO_BATCH_MAX_SIZE = int(os.environ.get("YOLO_BATCH_MAX_SIZE", 1))
+YOLO_BATCH_MAX_WAIT_MS = float(os.environ.get("YOLO_BATCH_MAX_WAIT_MS", 10.0))
+
+# ----- Uploads -----
+# Largest accepted request body in bytes, rejected before it is read
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+# Limits of the /batch endpoint on the number of images and the request body in bytes
+BATCH_MAX_IMAGES = int(os.environ.get("BATCH_MAX_IMAGES", 64))
+BATCH_MAX_UPLOAD_BYTES = int(
+    os.environ.get("BATCH_MAX_UPLOAD_BYTES", 128 * 1024 * 1024)
+)
+
+# ----- Start-up -----
+# Load the model and clients when a worker starts instead of on its first request
+WARMUP = _env_flag("WARMUP")
+# Load the model once in the gunicorn master, shared copy-on-write by the workers
+PRELOAD_MODEL = _env_flag("PRELOAD_MODEL")
+# Intra-op torch threads per worker (0 divides the CPU cores among the workers)
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", 0))
+
+# ----- Profiling -----
+# Fraction of requests profiled (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))
+# Also profile requests sent with an "X-Profile: 1" header
+PROFILE_HEADER = _env_flag("PROFILE_HEADER")
+# Directory the profile of each sampled request is written to
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", "profiles"))
+# Sampling interval of the statistical profiler in seconds
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.001))
+
+# ----- Result Cache -----
+# Number of cached calorie results for repeated photos (0 disables the cache)
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 1024))
+# Time in seconds before a cached result expires
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 3600))
+# Maximum number of differing perceptual hash bits for a near-duplicate photo
+RESULT_CACHE_MAX_DISTANCE = int(os.environ.get("RESULT_CACHE_MAX_DISTANCE", 4))
+
 # ----- Vision API -----
+# Number of labels requested per image
+VISION_MAX_RESULTS = 20
+# Merge concurrent fallback images into one call (a batch size of 1 disables batching)
+VISION_BATCH_MAX_SIZE = min(int(os.environ.get("VISION_BATCH_MAX_SIZE", 1)), 16)
+VISION_BATCH_MAX_WAIT_MS = float(os.environ.get("VISION_BATCH_MAX_WAIT_MS", 20.0))
+# Start the Vision API call alongside the YOLO model: off, auto (for photos that
+# look too dark, blurry or colourless for the YOLO model), miss_rate or always
+SPECULATIVE_VISION = os.environ.get("SPECULATIVE_VISION", "off")
+# In miss_rate mode, speculate for every request while the YOLO miss rate over recent
+# requests of the process is at least this value
+SPECULATIVE_VISION_MISS_RATE = float(
+    os.environ.get("SPECULATIVE_VISION_MISS_RATE", 0.5)
+)
+
 # Food items we are considering
 VALID_ITEMS = [
     "Burger",
@@ -1413,6 +1516,16 @@ VALID_ITEMS = [
     "Nutella",
 ]
 
+# alternative spellings and synonyms mapped to the name of a food item
+LABEL_ALIASES = {
+    "Hamburger": "Burger",
+    "Chesse burger": "Cheeseburger",
+    "Cheese Burger": "Cheeseburger",
+    "Pizza Margherita": "Margherita Pizza",
+    "French Fries": "Fries",
+    "Omelet": "Omelette",
+}
+
 # items for exclusion from Vision API classifications
 INVALID_ITEMS = [
     "Food",
@@ -0,0 +1,139 @@
+"""Pooled, retrying HTTP session shared by calls to external APIs."""
+
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from app.metrics import HTTP_CONNECTIONS, HTTP_REQUESTS
+
+# responses retried with backoff: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class ConnectionStats:
+    """
+    Count requests and newly opened connections of a session, to confirm
+    that connections are being reused. The counts are also exported as
+    metrics labelled with the API.
+    Attributes:
+        api (str): Name of the API called, e.g. edamam.
+        requests (int): Number of responses received.
+        new_connections (int): Number of TCP (and TLS) connections opened.
+    """
+
+    api: str = "external"
+    requests: int = 0
+    new_connections: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def reused(self) -> int:
+        """Number of requests served on an already open connection."""
+        return max(self.requests - self.new_connections, 0)
+
+    def add_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+        HTTP_REQUESTS.labels(api=self.api).inc()
+
+    def add_connection(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+        HTTP_CONNECTIONS.labels(api=self.api).inc()
+
+
+class JitteredRetry(Retry):
+    """Retry with exponential backoff plus a random delay of up to `jitter` seconds."""
+
+    def __init__(self, *args: Any, jitter: float = 0.0, **kwargs: Any) -> None:
+        self.jitter = jitter
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs: Any) -> "JitteredRetry":
+        # keep the jitter when urllib3 creates the retry state for the next attempt
+        retry = super().new(**kwargs)
+        retry.jitter = self.jitter
+        return retry
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, self.jitter)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTP adapter whose connection pools report new connections to stats."""
+
+    def __init__(self, stats: ConnectionStats, **kwargs: Any) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self) -> Any:
+                stats.add_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self) -> Any:
+                stats.add_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+def create_session(
+    stats: ConnectionStats,
+    pool_size: int = 10,
+    retries: int = 3,
+    backoff_factor: float = 0.25,
+    backoff_jitter: float = 0.1,
+) -> requests.Session:
+    """
+    Create a session with a keep-alive connection pool that retries
+    connection errors, rate limiting (429) and transient server errors
+    (5xx) with jittered exponential backoff.
+    Args:
+        stats (ConnectionStats): Counters updated by the session.
+        pool_size (int): Maximum number of connections kept per host.
+        retries (int): Maximum number of retries per request.
+        backoff_factor (float): Base of the exponential backoff in seconds.
+        backoff_jitter (float): Maximum random delay added to each backoff.
+    Returns:
+        requests.Session: Configured session.
+    """
+    retry = JitteredRetry(
+        total=retries,
+        jitter=backoff_jitter,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = PooledHTTPAdapter(
+        stats, pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(
+        lambda response, *args, **kwargs: stats.add_request()
+    )
+
+    return session
@@ -0,0 +1,72 @@
+"""Resolution of Vision API and YOLO labels to the food items we serve."""
+
+import re
+from typing import Dict, Optional
+
+from app.estimator.constants import (
+    DEPTH_DICT,
+    INVALID_ITEMS,
+    LABEL_ALIASES,
+    VALID_ITEMS,
+)
+
+
+def normalize_label(label: str) -> str:
+    """
+    Normalise a label for lookups, ignoring case, separators and whitespace.
+    Args:
+        label (str): Label from Vision API or YOLO model.
+    Returns:
+        str: Normalised label.
+    """
+    return " ".join(re.split(r"[\s_\-]+", label.casefold())).strip()
+
+
+def build_label_index() -> Dict[str, str]:
+    """
+    Build the index from normalised label to food item name, covering all
+    Vision API items, YOLO classes and their aliases.
+    Returns:
+        dict[str, str]: Food item name for each normalised label.
+    """
+    index: Dict[str, str] = {}
+
+    # keep the first spelling of each item
+    for item in VALID_ITEMS + [label.capitalize() for label in DEPTH_DICT]:
+        index.setdefault(normalize_label(item), item)
+
+    for alias, item in LABEL_ALIASES.items():
+        index[normalize_label(alias)] = index.get(normalize_label(item), item)
+
+    return index
+
+
+# precomputed lookups, labels in the deny set never resolve to a food item
+LABEL_INDEX = build_label_index()
+DENIED_LABELS = frozenset(normalize_label(item) for item in INVALID_ITEMS)
+
+
+def resolve_label(label: str) -> Optional[str]:
+    """
+    Map a Vision API or YOLO label to the name of a food item we serve.
+    Args:
+        label (str): Label to resolve.
+    Returns:
+        Optional[str]: Food item name, None if the label is not a served food.
+    """
+    key = normalize_label(label)
+    if key in DENIED_LABELS:
+        return None
+    return LABEL_INDEX.get(key)
+
+
+def food_key(label: str) -> Optional[str]:
+    """
+    Map a label to the key used for food item constants (e.g. DEPTH_DICT).
+    Args:
+        label (str): Label to resolve.
+    Returns:
+        Optional[str]: Normalised food item name, None if not a served food.
+    """
+    item = resolve_label(label)
+    return normalize_label(item) if item is not None else None
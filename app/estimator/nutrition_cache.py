@@ -0,0 +1,168 @@
+"""Two-tier (memory and SQLite) cache of per-100g nutrition lookups."""
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+log = logging.getLogger("nutrition_cache")
+
+Record = Dict[str, Any]
+
+
+class NutritionCache:
+    """
+    Cache nutrition records per search term in an in-memory LRU, backed by
+    a SQLite file that persists between processes. Concurrent misses for the
+    same term are coalesced so that only one caller fetches from upstream.
+    Attributes:
+        path (Optional[Path]): SQLite file location (None keeps the cache
+            in memory only).
+        max_size (int): Maximum number of records held in memory.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_size: int = 512) -> None:
+        self.path = path
+        self.max_size = max_size
+        self._memory: "OrderedDict[str, Record]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db_ready = False
+
+    def get_or_fetch(self, search: str, fetch: Callable[[str], Record]) -> Record:
+        """
+        Return the cached record for a search term, calling fetch on a miss.
+        Args:
+            search (str): Food search term.
+            fetch (Callable[[str], Record]): Function retrieving the record
+                from upstream.
+        Returns:
+            Record: Copy of the record for the search term.
+        """
+        key = search.strip().lower()
+
+        with self._lock:
+            record = self._get_memory(key)
+            if record is not None:
+                return _copy(record)
+
+            # another thread is already fetching this term - wait for its result
+            future = self._in_flight.get(key)
+            owner = future is None
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            return _copy(future.result())
+
+        try:
+            record = self._get_disk(key)
+            if record is None:
+                record = fetch(search)
+                self._put_disk(key, record)
+            with self._lock:
+                self._put_memory(key, record)
+            future.set_result(record)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        return _copy(record)
+
+    def get(self, search: str) -> Optional[Record]:
+        """
+        Return the cached record for a search term without fetching it, for
+        callers that fetch from upstream themselves.
+        Args:
+            search (str): Food search term.
+        Returns:
+            Optional[Record]: Copy of the record, None on a miss.
+        """
+        key = search.strip().lower()
+        with self._lock:
+            record = self._get_memory(key)
+        if record is None:
+            record = self._get_disk(key)
+            if record is None:
+                return None
+            with self._lock:
+                self._put_memory(key, record)
+        return _copy(record)
+
+    def put(self, search: str, record: Record) -> None:
+        """
+        Store the record fetched for a search term.
+        Args:
+            search (str): Food search term.
+            record (Record): Record retrieved from upstream.
+        """
+        key = search.strip().lower()
+        self._put_disk(key, record)
+        with self._lock:
+            self._put_memory(key, record)
+
+    def _get_memory(self, key: str) -> Optional[Record]:
+        record = self._memory.get(key)
+        if record is not None:
+            self._memory.move_to_end(key)
+        return record
+
+    def _put_memory(self, key: str, record: Record) -> None:
+        self._memory[key] = record
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(str(self.path), timeout=5.0)
+        try:
+            # commit on success and always close the connection
+            with connection:
+                if not self._db_ready:
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS nutrition "
+                        + "(term TEXT PRIMARY KEY, record TEXT)"
+                    )
+                    self._db_ready = True
+                yield connection
+        finally:
+            connection.close()
+
+    def _get_disk(self, key: str) -> Optional[Record]:
+        if self.path is None:
+            return None
+        try:
+            with self._connect() as connection:
+                row = connection.execute(
+                    "SELECT record FROM nutrition WHERE term = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            log.error(f"[Nutrition Cache] Unable to read {self.path}: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _put_disk(self, key: str, record: Record) -> None:
+        if self.path is None:
+            return
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO nutrition (term, record) VALUES (?, ?)",
+                    (key, json.dumps(record)),
+                )
+        except sqlite3.Error as e:
+            log.error(f"[Nutrition Cache] Unable to write {self.path}: {e}")
+
+
+def _copy(record: Record) -> Record:
+    # copy nested values so callers can scale nutrition without changing the cache
+    return json.loads(json.dumps(record))
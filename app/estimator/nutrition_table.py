@@ -0,0 +1,98 @@
+"""
+Bundled table of nutrition per 100g, used before calling the Edamam API.
+The table covers the YOLO classes and common Vision API labels, not every
+valid food item, with approximate generic values entered by hand rather
+than taken from a cited source.
+"""
+import csv
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.estimator.constants import NUTRITION_TABLE_PATH
+from app.estimator.labels import normalize_label
+
+log = logging.getLogger("nutrition_table")
+
+
+@dataclass
+class NutritionTable:
+    """
+    Nutrient vectors per 100g for the food items in the bundled table.
+    Attributes:
+        nutrients (tuple[str, ...]): Edamam nutrient codes (e.g. ENERC_KCAL).
+        items (tuple[str, ...]): Food item names, one per row of values.
+        values (NDArray): (N, len(nutrients)) nutrition per 100g.
+        index (dict[str, int]): Row of values for each normalised item name.
+    """
+
+    nutrients: Tuple[str, ...]
+    items: Tuple[str, ...]
+    values: NDArray
+    index: Dict[str, int]
+
+    def get(self, item: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the nutrition of a food item.
+        Args:
+            item (str): Food item name.
+        Returns:
+            Optional[dict[str, Any]]: Fields of FoodDetails for 100g of the
+                item, None if the item is not in the table.
+        """
+        row = self.index.get(normalize_label(item))
+        if row is None:
+            return None
+        nutrition = dict(zip(self.nutrients, self.values[row].tolist()))
+        return {"label": self.items[row], "nutrition": nutrition, "weight": 100.0}
+
+
+def load_nutrition_table(path: Path) -> NutritionTable:
+    """
+    Load the nutrition table from a CSV file with an item column followed
+    by one column per nutrient.
+    Args:
+        path (Path): Location of CSV file.
+    Returns:
+        NutritionTable: Loaded table.
+    """
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        rows = list(reader)
+
+    items = tuple(row[0] for row in rows)
+    values = np.array([row[1:] for row in rows], dtype=float).reshape(len(rows), -1)
+    index = {normalize_label(item): i for i, item in enumerate(items)}
+    log.info(f"[Nutrition Table] Loaded {len(items)} items from {path}.")
+
+    return NutritionTable(tuple(header[1:]), items, values, index)
+
+
+# table loaded on first lookup
+_table: Optional[NutritionTable] = None
+_table_lock = threading.Lock()
+
+
+def get_local_nutrition(item: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up the nutrition per 100g of a food item in the bundled table.
+    Args:
+        item (str): Food item name.
+    Returns:
+        Optional[dict[str, Any]]: Fields of FoodDetails for 100g of the item,
+            None if the item is not in the table or the table is disabled.
+    """
+    global _table
+    if not NUTRITION_TABLE_PATH:
+        return None
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = load_nutrition_table(Path(NUTRITION_TABLE_PATH))
+    return _table.get(item)
@@ -0,0 +1,192 @@
+"""Post-training INT8 quantization of the YOLO model for CPU inference."""
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+from app.estimator.backends import export_backend, get_backend
+from app.estimator.constants import (
+    CALIBRATION_DIR,
+    QUANTIZATION_MAX_AREA_ERROR,
+    QUANTIZATION_MIN_AGREEMENT,
+)
+from app.util import decode_image, load_image
+
+log = logging.getLogger("quantize")
+
+# image types used for calibration and accuracy checks
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def list_images(directory: Path) -> List[Path]:
+    """
+    List the images in a directory.
+    Args:
+        directory (Path): Directory containing images.
+    Returns:
+        List[Path]: Sorted image paths.
+    """
+    return sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def preprocess_image(image: NDArray, imgsz: int = 640) -> NDArray:
+    """
+    Prepare a BGR image as model input in the same way as ultralytics:
+    letterbox to a square, convert to RGB and scale to [0, 1].
+    Args:
+        image (NDArray): (H, W, 3) BGR image.
+        imgsz (int): Size of the model input.
+    Returns:
+        NDArray: (1, 3, imgsz, imgsz) float32 tensor.
+    """
+    height, width = image.shape[:2]
+    scale = imgsz / max(height, width)
+    new_height, new_width = round(height * scale), round(width * scale)
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    # pad to a square canvas using the ultralytics padding colour
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_height) // 2, (imgsz - new_width) // 2
+    canvas[top : top + new_height, left : left + new_width] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+def quantize_model(
+    calibration_dir: Optional[Path] = CALIBRATION_DIR, imgsz: int = 640
+) -> Path:
+    """
+    Produce the INT8 model served by the onnx_int8 backend. Uses static
+    quantization calibrated on the images in calibration_dir, or dynamic
+    (weight-only) quantization if no calibration images are given.
+    Args:
+        calibration_dir (Optional[Path]): Directory of calibration images.
+        imgsz (int): Size of the model input used for calibration.
+    Returns:
+        Path: Location of the quantized model.
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+
+    # quantize starting from the float ONNX export
+    float_backend = get_backend("onnx")
+    if not float_backend.artifact.exists():
+        export_backend(float_backend)
+    output = get_backend("onnx_int8").artifact
+
+    if calibration_dir is None or not calibration_dir.exists():
+        log.info("[Quantize] No calibration images, using dynamic quantization.")
+        quantize_dynamic(float_backend.artifact, output, weight_type=QuantType.QUInt8)
+        return output
+
+    images = list_images(calibration_dir)
+    if not images:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    class CalibrationReader(CalibrationDataReader):
+        def __init__(self) -> None:
+            self.inputs = iter(images)
+
+        def get_next(self) -> Optional[Dict[str, NDArray]]:
+            path = next(self.inputs, None)
+            if path is None:
+                return None
+            image = decode_image(load_image(path))
+            return {"images": preprocess_image(image, imgsz)}
+
+    log.info(f"[Quantize] Calibrating static quantization on {len(images)} images.")
+    quantize_static(
+        float_backend.artifact,
+        output,
+        CalibrationReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    return output
+
+
+def compare_predictions(
+    reference: List[Tuple[NDArray, NDArray, NDArray]],
+    candidate: List[Tuple[NDArray, NDArray, NDArray]],
+) -> Dict[str, float]:
+    """
+    Compare detections of a candidate model against a reference model
+    on the same images.
+    Args:
+        reference (List[Tuple]): labels, areas, dims per image from the
+            reference (float) model.
+        candidate (List[Tuple]): labels, areas, dims per image from the
+            candidate (quantized) model.
+    Returns:
+        dict[str, float]: Fraction of images with the same detected labels
+            ("label_agreement") and mean absolute difference in relative
+            area of matching items ("mean_area_error").
+    """
+    matches, area_errors = 0, []
+    for (ref_labels, ref_areas, _), (cand_labels, cand_areas, _) in zip(
+        reference, candidate
+    ):
+        # compare items in a fixed order independent of detection order
+        ref_order = np.lexsort((ref_areas, ref_labels))
+        cand_order = np.lexsort((cand_areas, cand_labels))
+        if list(ref_labels[ref_order]) == list(cand_labels[cand_order]):
+            matches += 1
+            area_errors.extend(np.abs(ref_areas[ref_order] - cand_areas[cand_order]))
+
+    return {
+        "label_agreement": matches / len(reference) if reference else 1.0,
+        "mean_area_error": float(np.mean(area_errors)) if area_errors else 0.0,
+    }
+
+
+def check_accuracy(images: List[Path]) -> Dict[str, float]:
+    """
+    Run the float and quantized models on the same images and compare them.
+    Args:
+        images (List[Path]): Images to evaluate.
+    Returns:
+        dict[str, float]: Metrics from compare_predictions.
+    """
+    from app.estimator.yolo import detect_food_items_batch, load_model
+
+    reference_model = load_model(get_backend("torch"))
+    candidate_model = load_model(get_backend("onnx_int8"))
+    reference, candidate = [], []
+    for image in images:
+        reference += detect_food_items_batch([image], model=reference_model)
+        candidate += detect_food_items_batch([image], model=candidate_model)
+
+    metrics = compare_predictions(reference, candidate)
+    log.info(f"[Quantize] Accuracy on {len(images)} images: {metrics}")
+
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize the YOLO model to INT8.")
+    parser.add_argument("--calibration-dir", type=Path, default=CALIBRATION_DIR)
+    parser.add_argument("--eval-dir", type=Path, default=CALIBRATION_DIR)
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+
+    quantize_model(args.calibration_dir, args.imgsz)
+    if args.eval_dir.exists():
+        metrics = check_accuracy(list_images(args.eval_dir))
+        if (
+            metrics["label_agreement"] < QUANTIZATION_MIN_AGREEMENT
+            or metrics["mean_area_error"] > QUANTIZATION_MAX_AREA_ERROR
+        ):
+            log.error("[Quantize] Quantized model is not accurate enough.")
+            sys.exit(1)
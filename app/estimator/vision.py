@@ -1,45 +1,208 @@
 """Usage of Google Vision API for food classification."""
 
+import asyncio
 import logging
-from pathlib import Path
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple, Union
 
-from google.cloud import vision
+from app.estimator.batching import MicroBatcher
+from app.estimator.constants import (
+    VISION_BATCH_MAX_SIZE,
+    VISION_BATCH_MAX_WAIT_MS,
+    VISION_MAX_RESULTS,
+)
+from app.estimator.labels import resolve_label
+from app.metrics import count_errors, count_failure, time_stage
+from app.util import ImageSource, image_to_bytes
 
-from app.estimator.constants import VALID_ITEMS
-from app.util import load_image
+# the Vision API client library is only imported on first use, keeping it
+# out of the start-up of the service
+if TYPE_CHECKING:
+    from google.cloud import vision
 
 log = logging.getLogger("vision")
 
+# process-wide client and batching scheduler, created on first use
+_client: Optional["vision.ImageAnnotatorClient"] = None
+_scheduler: Optional[MicroBatcher] = None
+_lock = threading.Lock()
 
-def get_food_classification(path: Path) -> Optional[str]:
+# asynchronous client of the ASGI app, bound to the event loop that created it
+_async_client: Optional[
+    Tuple[asyncio.AbstractEventLoop, "vision.ImageAnnotatorAsyncClient"]
+] = None
+
+
+def get_client() -> "vision.ImageAnnotatorClient":
+    """
+    Return the shared Vision API client, so that the gRPC channel and
+    credentials are only set up once per process.
+    Returns:
+        vision.ImageAnnotatorClient: Vision API client.
+    """
+    from google.cloud import vision
+
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = vision.ImageAnnotatorClient()
+    return _client
+
+
+def get_async_client() -> "vision.ImageAnnotatorAsyncClient":
+    """
+    Return the asynchronous Vision API client of the running event loop.
+    Only called from the event loop, so no lock is needed.
+    Returns:
+        vision.ImageAnnotatorAsyncClient: Vision API client.
+    """
+    from google.cloud import vision
+
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client[0] is not loop:
+        _async_client = (loop, vision.ImageAnnotatorAsyncClient())
+    return _async_client[1]
+
+
+def get_food_classification(input: ImageSource) -> Optional[str]:
     """
     Classify input image using Google Vision API.
     Args:
-        path (Path): Path to input image for classification.
+        input (ImageSource): Path, encoded bytes or decoded array of
+            input image for classification.
     Returns:
         Optional[str]: Filtered food classification.
     """
+    from google.cloud import vision
 
-    # call Google Vision API with input image
-    client = vision.ImageAnnotatorClient()
+    # get encoded image, reading from file only if a path is passed
+    content = image_to_bytes(input)
 
-    # read image from file
-    content = load_image(path)
-    image = vision.Image(content=content)
+    # call API to detect classes, batched with concurrent requests if enabled
+    if VISION_BATCH_MAX_SIZE > 1:
+        labels = get_scheduler()(content)
+    else:
+        image = vision.Image(content=content)
+        with time_stage("vision"), count_errors("vision_api"):
+            response = get_client().label_detection(
+                image=image, max_results=VISION_MAX_RESULTS
+            )
+        labels = response.label_annotations
+
+    return first_food_item(labels)
 
-    # call API to detect classes
-    response = client.label_detection(image=image, max_results=20)
 
-    # get the labels from response
-    labels = response.label_annotations
+async def get_food_classification_async(input: ImageSource) -> Optional[str]:
+    """
+    Classify input image using Google Vision API without blocking the event
+    loop. Calls are not merged by the batching scheduler.
+    Args:
+        input (ImageSource): Path, encoded bytes or decoded array of
+            input image for classification.
+    Returns:
+        Optional[str]: Filtered food classification.
+    """
+    request = label_request(image_to_bytes(input))
+    with time_stage("vision"), count_errors("vision_api"):
+        response = await get_async_client().batch_annotate_images(requests=[request])
 
-    # return first valid label from possible labels based on items in scope
+    labels = image_labels(response.responses[0])
+    if isinstance(labels, Exception):
+        raise labels
+
+    return first_food_item(labels)
+
+
+def first_food_item(labels: List[Any]) -> Optional[str]:
+    """
+    Pick the food item of the first label in scope.
+    Args:
+        labels (List[Any]): Label annotations, most likely first.
+    Returns:
+        Optional[str]: Food item, None if no label is a known food.
+    """
     for label in labels:
-        if label.description in VALID_ITEMS:
+        item = resolve_label(label.description)
+        if item is not None:
             log.info(
                 f"[Vision API] Item: {label.description} - Score: {round(label.score, 2)}"
             )
-            return label.description
+            return item
 
     return None
+
+
+def label_request(content: bytes) -> "vision.AnnotateImageRequest":
+    """
+    Create the label detection request for an image.
+    Args:
+        content (bytes): Encoded image.
+    Returns:
+        vision.AnnotateImageRequest: Request for a batch annotation call.
+    """
+    from google.cloud import vision
+
+    features = [
+        vision.Feature(
+            type_=vision.Feature.Type.LABEL_DETECTION, max_results=VISION_MAX_RESULTS
+        )
+    ]
+    return vision.AnnotateImageRequest(
+        image=vision.Image(content=content), features=features
+    )
+
+
+def image_labels(image_response: Any) -> Union[List[Any], Exception]:
+    """
+    Extract the labels of one image of a batch annotation response.
+    Args:
+        image_response (Any): Response for the image.
+    Returns:
+        Union[List[Any], Exception]: Label annotations, or the error if the
+            image could not be annotated.
+    """
+    if image_response.error.message:
+        count_failure("vision_api")
+        log.error(f"[Vision API] Unable to annotate image: {image_response.error}")
+        return ValueError(
+            f"Vision API could not annotate image: {image_response.error.message}"
+        )
+    return list(image_response.label_annotations)
+
+
+def annotate_batch(contents: List[bytes]) -> List[Union[List[Any], Exception]]:
+    """
+    Detect labels for several images with a single Vision API call.
+    Args:
+        contents (List[bytes]): Encoded images.
+    Returns:
+        List[Union[List[Any], Exception]]: Label annotations for each image,
+            in order, or the error of an image that could not be annotated.
+    """
+    requests = [label_request(content) for content in contents]
+    with time_stage("vision"), count_errors("vision_api"):
+        response = get_client().batch_annotate_images(requests=requests)
+
+    # fail only the images with an error, like a failed call without batching
+    return [image_labels(image_response) for image_response in response.responses]
+
+
+def get_scheduler() -> MicroBatcher:
+    """
+    Return the shared scheduler merging concurrent Vision API calls.
+    Returns:
+        MicroBatcher: Scheduler batching calls to annotate_batch.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _lock:
+            if _scheduler is None:
+                _scheduler = MicroBatcher(
+                    annotate_batch,
+                    max_batch_size=VISION_BATCH_MAX_SIZE,
+                    max_wait_ms=VISION_BATCH_MAX_WAIT_MS,
+                    name="vision",
+                )
+    return _scheduler
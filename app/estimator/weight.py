@@ -1,12 +1,24 @@
 """Functions to estimate the weight of a food item."""
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
 
 from app.estimator.constants import DENSITY_DICT, DEPTH_DICT, IMAGE_HEIGHT, IMAGE_WIDTH
+from app.estimator.labels import food_key
 
+# class-indexed weight parameters, so that all items are looked up at once
+FOOD_CLASSES = tuple(DEPTH_DICT)
+FOOD_CLASS_INDEX = {label: i for i, label in enumerate(FOOD_CLASSES)}
+DEPTHS = np.array([DEPTH_DICT[label] for label in FOOD_CLASSES])
+DENSITIES = np.array([DENSITY_DICT[label] for label in FOOD_CLASSES])
 
+# area of the image in scm, assuming the camera distance of calculate_food_weight
+AREA_IMAGE = IMAGE_HEIGHT * IMAGE_WIDTH
+
+
+# not used by the app, per-item reference for get_food_weights_batch in tests and benchmarks
 def get_food_weights(
     label_list: List,
     pixel_list: List,
@@ -48,6 +60,83 @@ def get_food_weights(
     return weights
 
 
+@lru_cache(maxsize=1024)
+def get_food_class_index(label: str) -> int:
+    """
+    Resolve the casing and aliases of a food label to its index into the
+    class-indexed weight parameters, caching the result for the label. Like
+    the dict lookups, labels without weight parameters raise a KeyError.
+    Args:
+        label (str): Food label.
+    Returns:
+        int: Class index.
+    """
+    return FOOD_CLASS_INDEX[food_key(label) or label.lower()]
+
+
+def get_food_class_indices(labels: NDArray) -> NDArray:
+    """
+    Map food labels to their index into the class-indexed weight parameters.
+    Args:
+        labels (NDArray): (N) 1D array of food labels.
+    Returns:
+        NDArray: (N) 1D array of class indices.
+    """
+    return np.fromiter(
+        (get_food_class_index(str(label)) for label in labels),
+        dtype=np.intp,
+        count=len(labels),
+    )
+
+
+def get_food_weights_batch(
+    labels: NDArray, areas: NDArray, counts: NDArray, plate_diameters: NDArray
+) -> Tuple[NDArray, NDArray, NDArray]:
+    """
+    Estimate the weights of the food items detected in several images at
+    once, given the detections of all images one image after another. Each
+    image is measured by its plate if exactly one plate was detected and by
+    the image size otherwise.
+    Args:
+        labels (NDArray): (N) 1D array of detected items of all images.
+        areas (NDArray): (N) 1D array of the area of each item relative to its image.
+        counts (NDArray): (B) 1D array of the number of items of each image.
+        plate_diameters (NDArray): (B) 1D array of the plate diameter of each image.
+    Returns:
+        Tuple[NDArray, NDArray, NDArray]: (N) mask of the food items, (N)
+            weights in g (0 for plates) and (B) whether the plate was used
+            for each image.
+    """
+    areas = np.asarray(areas, dtype=float)
+    is_food = np.asarray(labels) != "plate"
+    image = np.repeat(np.arange(len(counts)), counts)
+
+    # measure an image by its plate if it has exactly one, assuming all foods
+    # are on the plate so that the plate covers the area of all items
+    plates = np.bincount(image, weights=~is_food, minlength=len(counts))
+    use_plate = plates == 1
+    pixel_plate = np.bincount(image, weights=areas, minlength=len(counts))
+    if np.any(use_plate & (pixel_plate <= 0)):
+        raise ValueError("No plate pixel passed!")
+
+    # area in scm covered by the whole image, or the plate if used
+    plate_area = np.pi * (np.asarray(plate_diameters, dtype=float) / 2) ** 2
+    scale = np.where(
+        use_plate, plate_area / np.where(use_plate, pixel_plate, 1), AREA_IMAGE
+    )
+
+    classes = np.zeros(len(areas), dtype=np.intp)
+    classes[is_food] = get_food_class_indices(np.asarray(labels)[is_food])
+
+    # calculate weight assuming depth and density and converting into g
+    weights = np.where(
+        is_food, areas * scale[image] * DEPTHS[classes] * DENSITIES[classes], 0.0
+    )
+
+    return is_food, weights, use_plate
+
+
+# currently not used
 def calculate_pixel_plate(areas: NDArray) -> float:
     """
     Adds up all the relative pixel values of the food items and the plate,
@@ -85,8 +174,8 @@ def calculate_food_weight_plate(
     area_rel = pixel_food / pixel_plate
     area = area_rel * plate_area
 
-    # convert label to lowercase for dict values
-    label = label.lower()
+    # resolve casing and aliases of label for dict values
+    label = food_key(label) or label.lower()
 
     # calculate weight assuming depth and density and converting into g
     weight = area * DEPTH_DICT[label] * DENSITY_DICT[label]
@@ -94,6 +183,7 @@ def calculate_food_weight_plate(
     return weight
 
 
+# currently not used
 def get_params_weight(label_array: NDArray, pixel_array: NDArray) -> Tuple[List, List]:
     """
     Removes the plate from the numpy arrays and returns two lists with food
@@ -140,8 +230,8 @@ def calculate_food_weight(
     # calculate area of food in scm
     area_food = area_image * pixel_food
 
-    # convert label to lowercase for dict values
-    label = label.lower()
+    # resolve casing and aliases of label for dict values
+    label = food_key(label) or label.lower()
 
     # calculate weight assuming depth and density and converting into g
     weight = area_food * DEPTH_DICT[label] * DENSITY_DICT[label]
@@ -1,19 +1,86 @@
-from pathlib import Path
-from typing import Tuple
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
-from ultralytics import YOLO
 
-from app.estimator.constants import MODEL_THRESHOLD, MODEL_VERSION
+from app.estimator.backends import InferenceBackend, check_backend, get_backend
+from app.estimator.batching import MicroBatcher
+from app.estimator.constants import (
+    IMGSZ_FULL,
+    IMGSZ_LOW,
+    IMGSZ_POLICY,
+    MODEL_THRESHOLD,
+    PROGRESSIVE_MIN_CONFIDENCE,
+    PROGRESSIVE_MIN_MASK_AREA,
+    YOLO_BATCH_MAX_SIZE,
+    YOLO_BATCH_MAX_WAIT_MS,
+)
+from app.metrics import time_stage
+from app.util import ImageSource, image_to_array
 
+# torch and ultralytics are only imported when the model is loaded, keeping
+# them out of the start-up of the service
+if TYPE_CHECKING:
+    from torch import Tensor
+    from ultralytics import YOLO
 
-def detect_food_items(input: Path) -> Tuple[NDArray, NDArray, NDArray]:
+log = logging.getLogger("yolo")
+
+# process-wide model instance, loaded on first use
+_model: Optional["YOLO"] = None
+_model_lock = threading.Lock()
+
+# the model keeps per-call predictor state, so concurrent requests take turns
+_predict_lock = threading.Lock()
+
+# process-wide micro-batching scheduler, created on first use
+_scheduler: Optional[MicroBatcher] = None
+
+
+def get_model() -> "YOLO":
+    """
+    Return the shared YOLO model, loading it from disk on first use.
+    Safe to call from multiple threads - the model is only constructed once.
+    Returns:
+        YOLO: Pre-trained segmentation model.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            # check again in case another thread loaded the model first
+            if _model is None:
+                _model = load_model(get_backend())
+    return _model
+
+
+def load_model(backend: InferenceBackend) -> "YOLO":
+    """
+    Load the segmentation model for the given inference backend.
+    Args:
+        backend (InferenceBackend): Runtime to serve the model with.
+    Returns:
+        YOLO: Model wrapping the backend's runtime.
+    """
+    from ultralytics import YOLO
+
+    # the default torch backend loads the weights directly
+    if backend.export_format is None:
+        return YOLO(backend.artifact)
+
+    check_backend(backend)
+    log.info(f"[YOLO] Loading {backend.artifact} with '{backend.name}' backend.")
+    return YOLO(str(backend.artifact), task="segment")
+
+
+def detect_food_items(input: ImageSource) -> Tuple[NDArray, NDArray, NDArray]:
     """
     Generate food class prediction and item area
     using YOLO model.
     Args:
-        input (Path): Path to image for classification.
+        input (ImageSource): Path, encoded bytes or decoded array of
+            image for classification.
     Returns:
         labels (NDArray): (N) 1D array containing food items.
         area (NDArray): (N) 1D array containing the area of the
@@ -21,36 +88,185 @@ def detect_food_items(input: Path) -> Tuple[NDArray, NDArray, NDArray]:
         dims (NDArray): (N, 2) array containing normalised
             height and width values.
     """
-    # load pre-trained model
-    model = YOLO(MODEL_VERSION)
+    return detect_food_items_batch([input])[0]
+
+
+def detect_food_items_batch(
+    inputs: List[ImageSource], model: Optional["YOLO"] = None
+) -> List[Tuple[NDArray, NDArray, NDArray]]:
+    """
+    Generate food class predictions and item areas for several images
+    with a single batched call to the YOLO model.
+    Args:
+        inputs (List[ImageSource]): Images for classification.
+        model (Optional[YOLO]): Model to use instead of the shared model.
+    Returns:
+        List[Tuple[NDArray, NDArray, NDArray]]: labels, areas and dims
+            (see detect_food_items) for each input image, in order.
+    """
+    # get shared pre-trained model unless a specific model is requested
+    if model is None:
+        model = get_model()
+
+    # decode in-memory images and generate predictions
+    sources = [image_to_array(image) for image in inputs]
+    if IMGSZ_POLICY == "progressive":
+        results = predict_progressive(model, sources)
+    else:
+        results = predict(model, sources, select_imgsz(sources, IMGSZ_POLICY))
+
+    with time_stage("mask_processing"):
+        return [parse_result(result, model.names) for result in results]
+
+
+def predict(model: "YOLO", sources: List[Any], imgsz: int) -> List[Any]:
+    """
+    Run the YOLO model on a batch of images at the given input size.
+    Safe to call from multiple threads - calls on the model are serialised.
+    Args:
+        model (YOLO): Model used for prediction.
+        sources (List[Any]): Paths or decoded images.
+        imgsz (int): Input size of the model.
+    Returns:
+        List[Any]: Prediction result for each image.
+    """
+    with _predict_lock, time_stage("yolo_predict"):
+        results = model.predict(
+            source=sources, conf=MODEL_THRESHOLD, imgsz=imgsz, save=False
+        )
+        return list(results)
+
+
+def predict_progressive(model: "YOLO", sources: List[Any]) -> List[Any]:
+    """
+    Run a fast low resolution pass over all images and only re-run the images
+    with uncertain predictions at full resolution.
+    Args:
+        model (YOLO): Model used for prediction.
+        sources (List[Any]): Paths or decoded images.
+    Returns:
+        List[Any]: Prediction result for each image.
+    """
+    results = predict(model, sources, IMGSZ_LOW)
+
+    retry = [i for i, result in enumerate(results) if needs_full_resolution(result)]
+    if retry:
+        log.info(f"[YOLO] Re-running {len(retry)} image(s) at full resolution.")
+        full_results = predict(model, [sources[i] for i in retry], IMGSZ_FULL)
+        for i, result in zip(retry, full_results):
+            results[i] = result
+
+    return results
+
+
+def needs_full_resolution(result: Any) -> bool:
+    """
+    Decide whether a low resolution prediction is good enough to be used.
+    Args:
+        result (Any): Prediction result for one image.
+    Returns:
+        bool: True if the image should be predicted again at full resolution.
+    """
+    # nothing found - small items may have been missed at low resolution
+    if result.masks is None or len(result.boxes.conf) == 0:
+        return True
 
-    # generate prediction based on input image
-    results = model.predict(source=input, conf=MODEL_THRESHOLD, save=False)
+    if result.boxes.conf.min() < PROGRESSIVE_MIN_CONFIDENCE:
+        return True
+
+    areas = compute_mask_areas(result.masks.data, result.orig_shape)
+    return bool(areas.min() < PROGRESSIVE_MIN_MASK_AREA)
+
+
+def select_imgsz(sources: List[Any], policy: str = IMGSZ_POLICY) -> int:
+    """
+    Select the model input size for a batch of images.
+    Args:
+        sources (List[Any]): Paths or decoded images.
+        policy (str): Resolution policy - fixed, adaptive or progressive.
+    Returns:
+        int: Model input size (a multiple of the model stride of 32).
+    """
+    if policy == "progressive":
+        return IMGSZ_LOW
+
+    # only decoded images have a known size
+    if policy != "adaptive" or not all(isinstance(s, np.ndarray) for s in sources):
+        return IMGSZ_FULL
+
+    # avoid upscaling images smaller than the full input size
+    max_side = max(max(source.shape[:2]) for source in sources)
+    return min(IMGSZ_FULL, int(np.ceil(max_side / 32)) * 32)
+
+
+def detect_food_items_scheduled(
+    input: ImageSource,
+) -> Tuple[NDArray, NDArray, NDArray]:
+    """
+    Run detect_food_items through the shared micro-batching scheduler, so
+    that images arriving at the same time are predicted in one batch.
+    Args:
+        input (ImageSource): Image for classification.
+    Returns:
+        Tuple[NDArray, NDArray, NDArray]: labels, areas and dims
+            (see detect_food_items).
+    """
+    # batching disabled - predict directly
+    if YOLO_BATCH_MAX_SIZE <= 1:
+        return detect_food_items(input)
+
+    return get_scheduler()(input)
+
+
+def get_scheduler() -> MicroBatcher:
+    """
+    Return the shared micro-batching scheduler for YOLO predictions.
+    Returns:
+        MicroBatcher: Scheduler batching calls to detect_food_items_batch.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _model_lock:
+            if _scheduler is None:
+                _scheduler = MicroBatcher(
+                    detect_food_items_batch,
+                    max_batch_size=YOLO_BATCH_MAX_SIZE,
+                    max_wait_ms=YOLO_BATCH_MAX_WAIT_MS,
+                    name="yolo",
+                )
+    return _scheduler
+
+
+def parse_result(
+    result: Any, names: Dict[int, str]
+) -> Tuple[NDArray, NDArray, NDArray]:
+    """
+    Extract labels, relative mask areas and box dimensions from a single
+    YOLO result.
+    Args:
+        result (Any): Prediction result for one image.
+        names (Dict[int, str]): Mapping of class index to class name.
+    Returns:
+        Tuple[NDArray, NDArray, NDArray]: labels, areas and dims
+            (see detect_food_items).
+    """
+    # nothing detected in image
+    if result.masks is None:
+        return np.empty(0, dtype=str), np.empty(0, dtype=float), np.empty((0, 2))
 
     # get identified classes
-    cls_tensor = results[0].boxes.cls
+    cls_tensor = result.boxes.cls
 
     # create numpy label array
     cls_np = np.expand_dims(cls_tensor.detach().numpy(), axis=0)
-    names_dict = model.names
-    to_np = np.vectorize(lambda i: names_dict[i])
+    to_np = np.vectorize(lambda i: names[i])
     labels = (np.asarray(to_np(cls_np))).flatten()
 
-    # extract mask element
-    mask_data = results[0].masks.data  # raw masks tensor (N, H, W)
-
-    # create empty np array for object areas
-    areas = np.empty(shape=labels.size, dtype=float)
-
-    # iterate through elements in tensor and extract mask size
-    for i in range(mask_data.shape[0]):
-        mask_zero = (mask_data[i] == 0).sum()
-        mask_one = (mask_data[i] == 1).sum()
-        area_tensor = mask_one / (mask_zero + mask_one)
-        areas[i] = area_tensor.detach().numpy()
+    # compute relative area of all masks at once, within the image itself
+    areas = compute_mask_areas(result.masks.data, result.orig_shape)
 
     # get normalized width and height
-    pos_tensor = results[0].boxes.xywhn
+    pos_tensor = result.boxes.xywhn
 
     # convert to numpy array and delete coordinates of box
     pos_np = pos_tensor.detach().numpy()
@@ -59,6 +275,57 @@ def detect_food_items(input: Path) -> Tuple[NDArray, NDArray, NDArray]:
     return labels, areas, dims
 
 
+def compute_mask_areas(
+    mask_data: "Tensor", orig_shape: Optional[Tuple[int, int]] = None
+) -> NDArray:
+    """
+    Compute the area of each mask relative to the image with a single
+    reduction over the mask tensor.
+    Args:
+        mask_data (Tensor): (N, H, W) binary masks.
+        orig_shape (Optional[Tuple[int, int]]): Height and width of the
+            original image, to exclude the letterbox padding of the masks.
+            None measures against the whole mask frame.
+    Returns:
+        areas (NDArray): (N) 1D array with the fraction of pixels covered
+            by each mask.
+    """
+    if orig_shape is not None:
+        rows, cols = letterbox_region(tuple(mask_data.shape[1:]), orig_shape)
+        mask_data = mask_data[:, rows, cols]
+
+    # masks are binary, so the mean is the number of mask pixels over all pixels
+    areas = mask_data.float().mean(dim=(1, 2))
+
+    return areas.detach().cpu().numpy().astype(float)
+
+
+def letterbox_region(
+    mask_shape: Tuple[int, ...], orig_shape: Tuple[int, int]
+) -> Tuple[slice, slice]:
+    """
+    Locate the image within masks letterboxed by the model. Images of a
+    batch are padded to a common input shape, so the padding of an image
+    depends on the other images it is predicted with.
+    Args:
+        mask_shape (Tuple[int, ...]): Height and width of the masks.
+        orig_shape (Tuple[int, int]): Height and width of the original image.
+    Returns:
+        Tuple[slice, slice]: Rows and columns of the masks covering the image.
+    """
+    height, width = mask_shape
+    gain = min(height / orig_shape[0], width / orig_shape[1])
+
+    # padding is split evenly between both sides, as done by ultralytics
+    pad_h = (height - round(orig_shape[0] * gain)) / 2
+    pad_w = (width - round(orig_shape[1] * gain)) / 2
+    top, bottom = round(pad_h - 0.1), round(pad_h + 0.1)
+    left, right = round(pad_w - 0.1), round(pad_w + 0.1)
+
+    return slice(top, height - bottom), slice(left, width - right)
+
+
+# currently not used
 def get_num_plate_food(labels: NDArray) -> Tuple[int, int]:
     """
     Count number of plates and foods recognised by YOLO model.
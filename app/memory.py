@@ -0,0 +1,145 @@
+"""
+Memory of the gunicorn master and its workers, split into pages unique to
+each process and pages shared with the others (Linux only).
+
+    python -m app.memory <gunicorn master pid>
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+PROC = Path("/proc")
+
+
+@dataclass
+class ProcessMemory:
+    """
+    Resident memory of a process in bytes.
+    Attributes:
+        pid (int): Process ID.
+        rss (int): Resident pages, shared ones counted in full.
+        pss (int): Resident pages, shared ones divided among their processes.
+        shared (int): Resident pages also mapped by other processes.
+        unique (int): Resident pages only mapped by this process (USS), the
+            memory freed if the process exits.
+    """
+
+    pid: int
+    rss: int
+    pss: int
+    shared: int
+    unique: int
+
+
+def parse_smaps_rollup(text: str) -> Dict[str, int]:
+    """
+    Parse the sizes of /proc/<pid>/smaps_rollup.
+    Args:
+        text (str): Contents of the file.
+    Returns:
+        Dict[str, int]: Size in bytes by field, e.g. Rss or Private_Dirty.
+    """
+    sizes = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(":")
+        fields = value.split()
+        if len(fields) == 2 and fields[1] == "kB":
+            sizes[name] = int(fields[0]) * 1024
+    return sizes
+
+
+def read_memory(pid: int, proc: Path = PROC) -> ProcessMemory:
+    """
+    Read the resident memory of a process.
+    Args:
+        pid (int): Process ID.
+        proc (Path): Mount point of procfs.
+    Returns:
+        ProcessMemory: Unique and shared memory of the process.
+    """
+    sizes = parse_smaps_rollup((proc / str(pid) / "smaps_rollup").read_text())
+    return ProcessMemory(
+        pid=pid,
+        rss=sizes["Rss"],
+        pss=sizes["Pss"],
+        shared=sizes["Shared_Clean"] + sizes["Shared_Dirty"],
+        unique=sizes["Private_Clean"] + sizes["Private_Dirty"],
+    )
+
+
+def child_pids(pid: int, proc: Path = PROC) -> List[int]:
+    """
+    List the child processes of a process, e.g. the workers of gunicorn.
+    Args:
+        pid (int): Process ID of the parent.
+        proc (Path): Mount point of procfs.
+    Returns:
+        List[int]: Process IDs of the children.
+    """
+    children = []
+    for task in sorted((proc / str(pid) / "task").iterdir()):
+        children += [int(child) for child in (task / "children").read_text().split()]
+    return children
+
+
+def memory_report(master_pid: int, proc: Path = PROC) -> List[ProcessMemory]:
+    """
+    Read the memory of a master process and its workers.
+    Args:
+        master_pid (int): Process ID of the gunicorn master.
+        proc (Path): Mount point of procfs.
+    Returns:
+        List[ProcessMemory]: Memory of the master followed by each worker.
+    """
+    pids = [master_pid] + child_pids(master_pid, proc)
+    return [read_memory(pid, proc) for pid in pids]
+
+
+def format_report(report: List[ProcessMemory]) -> str:
+    """
+    Format a memory report as a table in MiB. The RSS total is the memory
+    the processes would need without sharing, the PSS total what they use.
+    Args:
+        report (List[ProcessMemory]): Memory of the master and its workers.
+    Returns:
+        str: One row per process followed by the totals.
+    """
+
+    def mib(size: int) -> str:
+        return f"{size / 2**20:>10.1f}"
+
+    lines = [f"{'process':<16}{'rss':>10}{'pss':>10}{'shared':>10}{'unique':>10}"]
+    for i, memory in enumerate(report):
+        name = f"{'master' if i == 0 else 'worker'} {memory.pid}"
+        lines.append(
+            f"{name:<16}{mib(memory.rss)}{mib(memory.pss)}"
+            f"{mib(memory.shared)}{mib(memory.unique)}"
+        )
+    lines.append(
+        f"{'total':<16}{mib(sum(m.rss for m in report))}"
+        f"{mib(sum(m.pss for m in report))}{'':>10}"
+        f"{mib(sum(m.unique for m in report))}"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("pid", type=int, help="process ID of the gunicorn master")
+    parser.add_argument("--json", action="store_true", help="print JSON in bytes")
+    args = parser.parse_args(argv)
+
+    report = memory_report(args.pid)
+    if args.json:
+        print(json.dumps([asdict(memory) for memory in report], indent=2))
+    else:
+        print(format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Prometheus metrics of the pipeline, a no-op if prometheus_client is not installed."""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None  # type: ignore[assignment]
+
+# latency buckets in seconds, from mask processing (ms) to slow upstream calls (s)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _NoOpMetric:
+    """Stand-in accepting the metric calls used here when Prometheus is missing."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoOpMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+if prometheus_client is not None:
+    STAGE_LATENCY: Any = prometheus_client.Histogram(
+        "foodsnap_stage_seconds",
+        "Time spent in each stage of the pipeline.",
+        ["stage"],
+        buckets=LATENCY_BUCKETS,
+    )
+    RESPONSES: Any = prometheus_client.Counter(
+        "foodsnap_responses",
+        "Responses for an image by model code.",
+        ["model_code"],
+    )
+    FAILURES: Any = prometheus_client.Counter(
+        "foodsnap_failures",
+        "Failures by type.",
+        ["type"],
+    )
+    HTTP_REQUESTS: Any = prometheus_client.Counter(
+        "foodsnap_http_requests",
+        "Responses received from external APIs.",
+        ["api"],
+    )
+    HTTP_CONNECTIONS: Any = prometheus_client.Counter(
+        "foodsnap_http_connections",
+        "Connections opened to external APIs.",
+        ["api"],
+    )
+    SPECULATIONS: Any = prometheus_client.Counter(
+        "foodsnap_vision_speculations",
+        "Speculative Vision API calls by outcome.",
+        ["outcome"],
+    )
+    SPECULATION_WASTED: Any = prometheus_client.Histogram(
+        "foodsnap_vision_speculation_wasted_seconds",
+        "Time spent in speculative Vision API calls whose result was discarded.",
+        buckets=LATENCY_BUCKETS,
+    )
+else:
+    STAGE_LATENCY = RESPONSES = FAILURES = _NoOpMetric()
+    HTTP_REQUESTS = HTTP_CONNECTIONS = _NoOpMetric()
+    SPECULATIONS = SPECULATION_WASTED = _NoOpMetric()
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """
+    Record the duration of a pipeline stage, also when it fails. Can be used
+    as a context manager or as a function decorator.
+    Args:
+        stage (str): Name of the stage, e.g. decode or yolo_predict.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def count_failure(failure_type: str) -> None:
+    """
+    Count a failure of the given type.
+    Args:
+        failure_type (str): Type of failure, e.g. edamam_api or vision_api.
+    """
+    FAILURES.labels(type=failure_type).inc()
+
+
+def count_speculation(outcome: str, wasted_seconds: Optional[float] = None) -> None:
+    """
+    Count a speculative Vision API call by outcome.
+    Args:
+        outcome (str): started, used, cancelled or wasted.
+        wasted_seconds (Optional[float]): Time spent in a wasted call.
+    """
+    SPECULATIONS.labels(outcome=outcome).inc()
+    if wasted_seconds is not None:
+        SPECULATION_WASTED.observe(wasted_seconds)
+
+
+@contextmanager
+def count_errors(failure_type: str) -> Iterator[None]:
+    """
+    Count exceptions raised in a block as failures of the given type.
+    Args:
+        failure_type (str): Type of failure, e.g. vision_api.
+    """
+    try:
+        yield
+    except Exception:
+        count_failure(failure_type)
+        raise
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format. When
+    PROMETHEUS_MULTIPROC_DIR is set, the metrics of all worker processes
+    sharing the directory are aggregated.
+    Returns:
+        Tuple[bytes, str]: Metrics and their content type.
+    """
+    if prometheus_client is None:
+        raise ImportError(
+            "Metrics need prometheus_client: pip install prometheus-client"
+        )
+
+    registry = prometheus_client.REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    return (
+        prometheus_client.generate_latest(registry),
+        prometheus_client.CONTENT_TYPE_LATEST,
+    )
@@ -1,15 +1,31 @@
+from io import BytesIO
 from pathlib import Path
+from typing import Optional, Union
 
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+from PIL import Image
 
-def save_image(image: bytes, path: Path) -> None:
-    """
-    Save an image at specific path based on input image bytes.
-    Args:
-        image (bytes): Image represented as bytes.
-        path (Path): Location to save image.
-    """
-    with open(path, "wb") as file:
-        file.write(image)
+from app.metrics import time_stage
+
+# image passed through the pipeline: file location, encoded bytes or decoded BGR array
+ImageSource = Union[Path, bytes, NDArray]
+
+# leading bytes identifying the encoded image formats accepted for upload
+IMAGE_SIGNATURES = {
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "webp": (b"RIFF",),
+    "bmp": (b"BM",),
+}
+
+# JPEG scale factors applied by libjpeg while decoding, largest first
+JPEG_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
 
 
 def load_image(path: Path) -> bytes:
@@ -25,11 +41,108 @@ def load_image(path: Path) -> bytes:
     return content
 
 
-def delete_file(path: Path) -> None:
+def sniff_image_format(content: bytes) -> Optional[str]:
+    """
+    Identify the format of encoded image bytes from their leading bytes.
+    Args:
+        content (bytes): Encoded image.
+    Returns:
+        Optional[str]: Image format, None if the format is not supported.
+    """
+    for image_format, signatures in IMAGE_SIGNATURES.items():
+        if content.startswith(signatures):
+            if image_format == "webp" and content[8:12] != b"WEBP":
+                continue
+            return image_format
+    return None
+
+
+def reduced_decode_flag(content: bytes, max_size: int) -> int:
+    """
+    Choose the largest JPEG scale factor that keeps the longest side of the
+    decoded image at or above max_size. Only the image header is parsed.
+    Args:
+        content (bytes): Encoded JPEG image.
+        max_size (int): Smallest acceptable longest side in pixels.
+    Returns:
+        int: OpenCV decode flag.
+    """
+    try:
+        longest_side = max(Image.open(BytesIO(content)).size)
+    except Exception:
+        return cv2.IMREAD_COLOR
+
+    for factor, flag in JPEG_REDUCED_FLAGS:
+        if longest_side // factor >= max_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_image(content: bytes, max_size: Optional[int] = None) -> NDArray:
     """
-    Removes a file at specified path if file exists.
+    Decode encoded image bytes (e.g. JPEG or PNG) in memory. Large JPEG
+    images are scaled down by libjpeg while decoding, so the full resolution
+    image is never materialised.
     Args:
-        path (Path): Path to location of file.
+        content (bytes): Encoded image.
+        max_size (Optional[int]): Longest side the decoded image is reduced
+            towards without going below it, None to decode at full resolution.
+    Returns:
+        image (NDArray): (H, W, 3) BGR image array.
+    """
+    flag = cv2.IMREAD_COLOR
+    if max_size and sniff_image_format(content) == "jpeg":
+        flag = reduced_decode_flag(content, max_size)
+
+    with time_stage("decode"):
+        image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), flag)
+    if image is None:
+        raise ValueError("Unable to decode image.")
+    return image
+
+
+def encode_image(image: NDArray) -> bytes:
+    """
+    Encode a BGR image array as JPEG bytes.
+    Args:
+        image (NDArray): (H, W, 3) BGR image array.
+    Returns:
+        content (bytes): JPEG encoded image.
+    """
+    success, buffer = cv2.imencode(".jpg", image)
+    if not success:
+        raise ValueError("Unable to encode image.")
+    return buffer.tobytes()
+
+
+def image_to_bytes(image: ImageSource) -> bytes:
+    """
+    Get the encoded bytes of an image, reading from disk only if a path is passed.
+    Args:
+        image (ImageSource): Path, encoded bytes or decoded array.
+    Returns:
+        bytes: Encoded image.
+    """
+    if isinstance(image, Path):
+        return load_image(image)
+    if isinstance(image, bytes):
+        return image
+    return encode_image(image)
+
+
+def image_to_array(
+    image: ImageSource, max_size: Optional[int] = None
+) -> Union[Path, NDArray]:
+    """
+    Prepare an image for the YOLO model, decoding bytes in memory.
+    Paths and arrays are passed through unchanged.
+    Args:
+        image (ImageSource): Path, encoded bytes or decoded array.
+        max_size (Optional[int]): Longest side JPEG bytes are reduced towards
+            while decoding, None to decode at full resolution.
+    Returns:
+        Union[Path, NDArray]: Source accepted by the YOLO model.
     """
-    if path.exists():
-        Path.unlink(path)
+    if isinstance(image, bytes):
+        return decode_image(image, max_size)
+    return image
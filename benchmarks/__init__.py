@@ -0,0 +1,7 @@
+"""Offline benchmarks of the calorie estimation pipeline (see benchmarks.run)."""
+
+import os
+
+# the Edamam API is replaced by a local stand-in, so any credentials will do
+os.environ.setdefault("EDAMAM_KEY", "benchmark")
+os.environ.setdefault("EDAMAM_ID", "benchmark")
@@ -0,0 +1,291 @@
+"""
+Time each stage of the calorie estimation pipeline and full requests against
+local stand-ins, reporting throughput and latency percentiles.
+
+    python -m benchmarks.run --iterations 50 --json before.json
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+from app.api import endpoint
+from app.api.endpoint import ModelCodeEnum, build_response
+from app.estimator import calories, yolo
+from app.estimator.constants import MODEL_VERSION
+from app.estimator.weight import get_food_weights, get_food_weights_batch
+from app.util import encode_image
+from benchmarks.standins import (
+    SCENARIOS,
+    Scenario,
+    VisionStandIn,
+    load_stand_in_model,
+    make_image,
+    make_masks,
+    stand_ins,
+    use_scenario,
+)
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Latencies of all timed calls of one benchmark.
+    Attributes:
+        name (str): Benchmark name.
+        latencies (List[float]): Duration of each call in seconds.
+        wall_time (float): Duration of all calls in seconds.
+    """
+
+    name: str
+    latencies: List[float]
+    wall_time: float
+
+    def summary(self) -> Dict[str, float]:
+        """Throughput in calls per second and latency percentiles in ms."""
+        p50, p95, p99 = np.percentile(np.array(self.latencies) * 1000, [50, 95, 99])
+        return {
+            "iterations": len(self.latencies),
+            "throughput": len(self.latencies) / self.wall_time,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        }
+
+
+@dataclass
+class Benchmark:
+    """
+    A call to time, with the scenario the stand-ins answer it with.
+    Attributes:
+        name (str): Benchmark name.
+        func (Callable[[], Any]): Call to time.
+        scenario (Scenario): Detections and labels returned by the stand-ins.
+    """
+
+    name: str
+    func: Callable[[], Any]
+    scenario: Scenario = SCENARIOS[ModelCodeEnum.YOLO_USE_PLATE_SIZE]
+
+
+def run_benchmark(
+    func: Callable[[], Any], name: str, iterations: int, warmup: int, concurrency: int
+) -> BenchmarkResult:
+    """
+    Call a function repeatedly and record the latency of each call.
+    Args:
+        func (Callable[[], Any]): Function to time.
+        name (str): Benchmark name.
+        iterations (int): Number of timed calls.
+        warmup (int): Number of untimed calls made first.
+        concurrency (int): Number of threads making the calls.
+    Returns:
+        BenchmarkResult: Latencies of the timed calls.
+    """
+    for _ in range(warmup):
+        func()
+
+    def timed(_: int) -> float:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed, range(iterations)))
+    else:
+        latencies = [timed(i) for i in range(iterations)]
+
+    return BenchmarkResult(name, latencies, time.perf_counter() - start)
+
+
+def check_model_code(results: List, model_code: ModelCodeEnum, expected: str) -> None:
+    """Ensure that a call took the path it is reported under."""
+    actual = build_response(results, model_code)["model_code"]
+    if actual != expected:
+        raise RuntimeError(f"Expected {expected} path but got {actual}.")
+
+
+def build_benchmarks(content: bytes) -> List[Benchmark]:
+    """
+    Create the stage and end-to-end benchmarks for an encoded image.
+    Args:
+        content (bytes): Encoded image sent through the pipeline.
+    Returns:
+        List[Benchmark]: Benchmarks in the order they are run.
+    """
+    decoded = endpoint.image_to_array(content, endpoint.DECODE_MAX_SIZE)
+    masks = make_masks((0.2, 0.1, 0.5))
+
+    # detections of a batch of 32 images with a plate, two foods each
+    batch_labels = np.tile(["pizza", "fries", "plate"], 32)
+    batch_areas = np.tile([0.2, 0.1, 0.5], 32)
+    batch_counts = np.full(32, 3)
+    batch_diameters = np.full(32, 25.0)
+
+    benchmarks = [
+        Benchmark("detect_food_items", lambda: yolo.detect_food_items(decoded)),
+        Benchmark("mask_areas", lambda: yolo.compute_mask_areas(masks)),
+        Benchmark(
+            "get_food_weights",
+            lambda: get_food_weights(
+                ["pizza", "fries"], [0.2, 0.1], 0.8, 25.0, plate=True
+            ),
+        ),
+        Benchmark(
+            "get_food_weights_batch[32]",
+            lambda: get_food_weights_batch(
+                batch_labels, batch_areas, batch_counts, batch_diameters
+            ),
+        ),
+        Benchmark(
+            "estimate_weights",
+            lambda: endpoint.estimate_weights(batch_labels[:3], batch_areas[:3], 25.0),
+        ),
+        Benchmark("get_food_details", lambda: calories.get_food_details("pizza", 150)),
+    ]
+
+    for code, scenario in SCENARIOS.items():
+
+        def get_calories(expected: str = code.value) -> None:
+            check_model_code(*endpoint.get_calories(content, 25.0), expected)
+
+        def post(expected: str = code.value) -> None:
+            response = endpoint.app.test_client().post(
+                "/",
+                data={"file": (BytesIO(content), "benchmark.jpg"), "plateValue": "25"},
+            )
+            actual = response.get_json()["model_code"]
+            if response.status_code != 200 or actual != expected:
+                raise RuntimeError(f"Expected {expected} response but got {actual}.")
+
+        benchmarks.append(
+            Benchmark(f"get_calories[{code.value}]", get_calories, scenario)
+        )
+        benchmarks.append(Benchmark(f"request[{code.value}]", post, scenario))
+
+    return benchmarks
+
+
+def run_benchmarks(
+    client: VisionStandIn,
+    content: bytes,
+    iterations: int,
+    warmup: int,
+    concurrency: int = 1,
+    stages: Optional[Sequence[str]] = None,
+) -> List[BenchmarkResult]:
+    """
+    Run the benchmarks whose names contain one of the given stages.
+    Args:
+        client (VisionStandIn): Vision client installed by stand_ins.
+        content (bytes): Encoded image sent through the pipeline.
+        iterations (int): Number of timed calls per benchmark.
+        warmup (int): Number of untimed calls per benchmark.
+        concurrency (int): Number of threads making the calls.
+        stages (Optional[Sequence[str]]): Filters on the benchmark names,
+            None to run all benchmarks.
+    Returns:
+        List[BenchmarkResult]: Result of each benchmark run.
+    """
+    results = []
+    for benchmark in build_benchmarks(content):
+        if stages and not any(stage in benchmark.name for stage in stages):
+            continue
+        with use_scenario(client, benchmark.scenario):
+            results.append(
+                run_benchmark(
+                    benchmark.func, benchmark.name, iterations, warmup, concurrency
+                )
+            )
+    return results
+
+
+def format_report(results: List[BenchmarkResult]) -> str:
+    """
+    Format benchmark results as a table.
+    Args:
+        results (List[BenchmarkResult]): Benchmark results.
+    Returns:
+        str: One row per benchmark with throughput and latency percentiles.
+    """
+    width = max([len(result.name) for result in results] + [5])
+    lines = [
+        f"{'stage':<{width}} {'iters':>6} {'ops/s':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    ]
+    for result in results:
+        s = result.summary()
+        lines.append(
+            f"{result.name:<{width}} {s['iterations']:>6} {s['throughput']:>9.1f} "
+            f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--stages", help="comma-separated filters on the benchmark names"
+    )
+    parser.add_argument(
+        "--model",
+        type=Path,
+        default=MODEL_VERSION,
+        help="trained weights, an untrained network is used if missing",
+    )
+    parser.add_argument(
+        "--nutrition", choices=["table", "cached", "edamam"], default="table"
+    )
+    parser.add_argument("--edamam-latency", type=float, default=0.05)
+    parser.add_argument("--vision-latency", type=float, default=0.15)
+    parser.add_argument("--image-size", type=int, nargs=2, default=[1280, 960])
+    parser.add_argument("--threads", type=int, help="number of torch CPU threads")
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline logs")
+    args = parser.parse_args(argv)
+
+    # keep per-request logs out of the timings and the report
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("ultralytics").setLevel(logging.WARNING)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    content = encode_image(make_image(*args.image_size))
+    stages = args.stages.split(",") if args.stages else None
+
+    with stand_ins(
+        load_stand_in_model(args.model),
+        args.nutrition,
+        args.edamam_latency,
+        args.vision_latency,
+    ) as client:
+        results = run_benchmarks(
+            client, content, args.iterations, args.warmup, args.concurrency, stages
+        )
+
+    print(format_report(results))
+    if args.json:
+        report = {result.name: result.summary() for result in results}
+        args.json.write_text(json.dumps(report, indent=2))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""Local stand-ins for the YOLO model, Vision API and Edamam API."""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.api import endpoint
+from app.api.cache import ResultCache
+from app.api.endpoint import ModelCodeEnum
+from app.estimator import calories
+from app.estimator import vision as vision_api
+from app.estimator import yolo
+from app.estimator.nutrition_cache import NutritionCache
+from app.estimator.yolo import compute_mask_areas
+
+# imported on use like in the app, so that start-up can be measured with stand-ins
+if TYPE_CHECKING:
+    import torch
+    from google.cloud import vision
+    from ultralytics import YOLO
+
+# randomly initialised network with the architecture of the production model
+STAND_IN_MODEL = "yolov8n-seg.yaml"
+
+# nutrition per 100g returned by the Edamam stand-in for every search term
+STAND_IN_NUTRIENTS = {
+    "ENERC_KCAL": 250.0,
+    "PROCNT": 10.0,
+    "FAT": 10.0,
+    "CHOCDF": 30.0,
+    "FIBTG": 2.0,
+}
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    Detections of the YOLO model and labels of the Vision API for an image,
+    chosen so that the image takes one ModelCodeEnum path.
+    Attributes:
+        labels (Tuple[str, ...]): Items detected by the YOLO model.
+        areas (Tuple[float, ...]): Relative mask area of each detected item.
+        vision_labels (Tuple[str, ...]): Labels returned by the Vision API.
+    """
+
+    labels: Tuple[str, ...] = ()
+    areas: Tuple[float, ...] = ()
+    vision_labels: Tuple[str, ...] = ()
+
+
+SCENARIOS = {
+    ModelCodeEnum.YOLO_USE_PLATE_SIZE: Scenario(
+        ("pizza", "fries", "plate"), (0.2, 0.1, 0.5)
+    ),
+    ModelCodeEnum.YOLO_USE_IMAGE_SIZE: Scenario(("pizza", "fries"), (0.3, 0.1)),
+    ModelCodeEnum.VISION_DEFAULT: Scenario(vision_labels=("Food", "Pizza")),
+    ModelCodeEnum.NO_FOOD_DETECTED: Scenario(vision_labels=("Tableware",)),
+}
+
+
+def make_masks(areas: Tuple[float, ...], size: int = 640) -> "torch.Tensor":
+    """
+    Create binary masks covering the given fractions of a square frame.
+    Args:
+        areas (Tuple[float, ...]): Fraction of the frame covered by each mask.
+        size (int): Height and width of the masks.
+    Returns:
+        torch.Tensor: (N, size, size) binary masks.
+    """
+    import torch
+
+    masks = torch.zeros((len(areas), size, size))
+    for i, area in enumerate(areas):
+        masks[i, : round(area * size)] = 1
+    return masks
+
+
+def scenario_parser(scenario: Scenario) -> Callable[[Any, Dict], Tuple]:
+    """
+    Create a replacement for yolo.parse_result returning the detections of a
+    scenario. The mask areas are still computed from full size masks.
+    Args:
+        scenario (Scenario): Detections to return.
+    Returns:
+        Callable[[Any, Dict], Tuple]: Function with the signature of parse_result.
+    """
+    masks = make_masks(scenario.areas)
+    labels = np.array(scenario.labels, dtype=str)
+    dims = np.full((len(labels), 2), 0.5)
+
+    def parse_result(result: Any, names: Dict[int, str]) -> Tuple:
+        return labels, compute_mask_areas(masks), dims
+
+    return parse_result
+
+
+class VisionStandIn:
+    """
+    Vision API client answering label detection requests after a fixed latency.
+    Attributes:
+        latency (float): Seconds spent on each call.
+        labels (Tuple[str, ...]): Labels returned for every image.
+    """
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.labels: Tuple[str, ...] = ()
+
+    def _response(self) -> "vision.AnnotateImageResponse":
+        from google.cloud import vision
+
+        annotations = [
+            vision.EntityAnnotation(description=label, score=0.9)
+            for label in self.labels
+        ]
+        return vision.AnnotateImageResponse(label_annotations=annotations)
+
+    def label_detection(
+        self, image: "vision.Image", max_results: Optional[int] = None
+    ) -> "vision.AnnotateImageResponse":
+        time.sleep(self.latency)
+        return self._response()
+
+    def batch_annotate_images(
+        self, requests: List["vision.AnnotateImageRequest"]
+    ) -> "vision.BatchAnnotateImagesResponse":
+        from google.cloud import vision
+
+        time.sleep(self.latency)
+        return vision.BatchAnnotateImagesResponse(
+            responses=[self._response() for _ in requests]
+        )
+
+
+class EdamamHandler(BaseHTTPRequestHandler):
+    """Local Edamam API answering every search term after a fixed latency."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency)
+        search = parse_qs(urlparse(self.path).query).get("ingr", ["food"])[0]
+        food = {"label": search.capitalize(), "nutrients": STAND_IN_NUTRIENTS}
+        body = json.dumps({"parsed": [{"food": food}], "hints": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@contextmanager
+def edamam_server(latency: float) -> Iterator[str]:
+    """
+    Serve the Edamam stand-in on a free local port.
+    Args:
+        latency (float): Seconds spent on each request.
+    Yields:
+        str: URL of the stand-in endpoint.
+    """
+    handler = type("Handler", (EdamamHandler,), {"latency": latency})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/parser"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def load_stand_in_model(model_path: Optional[Path] = None) -> "YOLO":
+    """
+    Load the model used for benchmarking: the given weights if present,
+    otherwise an untrained network built from the production architecture.
+    Args:
+        model_path (Optional[Path]): Trained weights, e.g. model.pt.
+    Returns:
+        YOLO: Segmentation model.
+    """
+    from ultralytics import YOLO
+
+    if model_path is not None and model_path.exists():
+        return YOLO(str(model_path))
+    return YOLO(STAND_IN_MODEL)
+
+
+def make_image(width: int = 1280, height: int = 960, seed: int = 0) -> NDArray:
+    """
+    Create a photo-sized BGR test image with some structure for the encoder.
+    Args:
+        width (int): Image width.
+        height (int): Image height.
+        seed (int): Seed of the random noise.
+    Returns:
+        NDArray: (height, width, 3) BGR image.
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 20, (height, width, 3)).astype(np.float32)
+    return np.clip(gradient + noise, 0, 255).astype(np.uint8)
+
+
+@contextmanager
+def stand_ins(
+    model: Optional["YOLO"],
+    nutrition: str = "table",
+    edamam_latency: float = 0.05,
+    vision_latency: float = 0.15,
+) -> Iterator[VisionStandIn]:
+    """
+    Replace the external services and the model of the pipeline with local
+    stand-ins. The result cache is disabled so that every call does the work.
+    Args:
+        model (Optional[YOLO]): Model served by yolo.get_model, None to
+            load it on first use.
+        nutrition (str): Nutrition source - table (bundled table first),
+            cached (Edamam stand-in behind the cache) or edamam (every lookup
+            goes to the Edamam stand-in).
+        edamam_latency (float): Seconds spent on each Edamam request.
+        vision_latency (float): Seconds spent on each Vision API call.
+    Yields:
+        VisionStandIn: Vision client, whose labels are set by use_scenario.
+    """
+    client = VisionStandIn(vision_latency)
+    cache_size = 0 if nutrition == "edamam" else 512
+
+    with edamam_server(edamam_latency) as url, mock.patch.multiple(
+        calories,
+        EDAMAM_URL=url,
+        nutrition_cache=NutritionCache(None, cache_size),
+    ), mock.patch.object(yolo, "_model", model), mock.patch.object(
+        vision_api, "_client", client
+    ), mock.patch.object(
+        endpoint, "result_cache", ResultCache(max_size=0)
+    ):
+        if nutrition == "table":
+            yield client
+        else:
+            with mock.patch.object(calories, "get_local_nutrition", lambda item: None):
+                yield client
+
+
+@contextmanager
+def use_scenario(client: VisionStandIn, scenario: Scenario) -> Iterator[None]:
+    """
+    Make the YOLO model and Vision API stand-ins return a scenario's results.
+    Args:
+        client (VisionStandIn): Vision client installed by stand_ins.
+        scenario (Scenario): Detections and labels to return.
+    """
+    client.labels = scenario.vision_labels
+    with mock.patch.object(yolo, "parse_result", scenario_parser(scenario)):
+        yield
@@ -0,0 +1,179 @@
+"""
+Measure the cold start of a worker in fresh processes: importing the app,
+warming it up and serving the first request against local stand-ins.
+
+    python -m benchmarks.startup --runs 5 --budget 1.0
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# seconds allowed for importing app.api.endpoint, which is all a worker does
+# before it can accept requests when warmup is off
+IMPORT_BUDGET = 1.0
+
+# modules loaded on first use or during warmup rather than on import
+DEFERRED_MODULES = ("torch", "ultralytics", "google.cloud.vision", "pyinstrument")
+
+
+def measure(warmup: bool, model_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Time the start-up phases in the current process, which must not have
+    imported the app yet.
+    Args:
+        warmup (bool): Whether to warm up before the first request.
+        model_path (Optional[Path]): Trained weights, an untrained network is
+            used if missing. Defaults to the production weights.
+    Returns:
+        Dict[str, Any]: Duration in seconds of each phase, the warmup steps
+            and the deferred modules loaded by the import.
+    """
+    start = time.perf_counter()
+    from app.api import endpoint
+
+    import_time = time.perf_counter() - start
+    loaded = [module for module in DEFERRED_MODULES if module in sys.modules]
+
+    from unittest import mock
+
+    from app.api.warmup import warmup as warm_up
+    from app.estimator import yolo
+    from app.estimator.constants import MODEL_VERSION
+    from app.util import encode_image
+    from benchmarks.standins import (
+        SCENARIOS,
+        load_stand_in_model,
+        make_image,
+        stand_ins,
+        use_scenario,
+    )
+
+    steps: Dict[str, float] = {}
+    model_path = model_path or MODEL_VERSION
+    with mock.patch.object(
+        yolo, "load_model", lambda backend: load_stand_in_model(model_path)
+    ):
+        if warmup:
+            steps = warm_up()
+
+        # stand-ins replace the services and the model, if already loaded
+        content = encode_image(make_image())
+        scenario = SCENARIOS[endpoint.ModelCodeEnum.YOLO_USE_PLATE_SIZE]
+        with stand_ins(yolo._model) as client, use_scenario(client, scenario):
+            start = time.perf_counter()
+            response = endpoint.app.test_client().post(
+                "/",
+                data={"file": (BytesIO(content), "startup.jpg"), "plateValue": "25"},
+            )
+            first_request = time.perf_counter() - start
+
+    if response.status_code != 200:
+        raise RuntimeError(f"First request failed with {response.status_code}.")
+
+    return {
+        "import": import_time,
+        "warmup": sum(steps.values()),
+        "first_request": first_request,
+        "steps": steps,
+        "loaded_on_import": loaded,
+    }
+
+
+def run_fresh(warmup: bool, model_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Measure the start-up in a new interpreter, so that no module is cached.
+    Args:
+        warmup (bool): Whether to warm up before the first request.
+        model_path (Optional[Path]): Trained weights (see measure).
+    Returns:
+        Dict[str, Any]: Measurement of the child process (see measure).
+    """
+    command = [sys.executable, "-m", "benchmarks.startup", "--child"]
+    if model_path is not None:
+        command += ["--model", str(model_path)]
+    if not warmup:
+        command.append("--no-warmup")
+    output = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Take the median of each phase and warmup step over several runs.
+    Args:
+        runs (List[Dict[str, Any]]): Measurements (see measure).
+    Returns:
+        Dict[str, float]: Median duration in seconds by phase and step.
+    """
+    summary = {
+        phase: statistics.median(run[phase] for run in runs)
+        for phase in ("import", "warmup", "first_request")
+    }
+    summary["ready"] = summary["import"] + summary["warmup"]
+    for step in runs[0]["steps"]:
+        summary[f"warmup.{step}"] = statistics.median(
+            run["steps"].get(step, 0.0) for run in runs
+        )
+    return summary
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-warmup", action="store_true")
+    parser.add_argument(
+        "--model",
+        type=Path,
+        help="trained weights, defaults to model.pt and an untrained network if missing",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=IMPORT_BUDGET,
+        help="fail if importing the app takes longer (seconds)",
+    )
+    parser.add_argument(
+        "--ready-budget",
+        type=float,
+        help="fail if importing and warming up takes longer (seconds)",
+    )
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        print(json.dumps(measure(not args.no_warmup, args.model)))
+        return 0
+
+    runs = [run_fresh(not args.no_warmup, args.model) for _ in range(args.runs)]
+    summary = summarize(runs)
+    for name, seconds in summary.items():
+        print(f"{name:<28} {seconds:>8.3f}s")
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+
+    failures = []
+    loaded = sorted({module for run in runs for module in run["loaded_on_import"]})
+    if loaded:
+        failures.append(f"importing the app loaded {', '.join(loaded)}")
+    if summary["import"] > args.budget:
+        failures.append(f"import took {summary['import']:.3f}s > {args.budget}s")
+    if args.ready_budget is not None and summary["ready"] > args.ready_budget:
+        failures.append(f"ready after {summary['ready']:.3f}s > {args.ready_budget}s")
+    for failure in failures:
+        print(f"Start-up budget exceeded: {failure}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Gunicorn configuration: each worker serves several requests at once from a
+pool of threads, with its own copy of the model or, with PRELOAD_MODEL=1, a
+copy loaded once by the master and shared by all workers."""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+bind = f":{os.environ.get('PORT', '5000')}"
+
+# processes, each with its own copy of the model unless it is preloaded
+workers = int(os.environ.get("GUNICORN_WORKERS", 1))
+
+# request threads per process sharing the model, Vision client and Edamam session
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# allows for workers loading the model on their first request if warmup is off
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# workers load the model and clients before accepting requests (see app.api.warmup)
+os.environ.setdefault("WARMUP", "1")
+
+# workers write their metrics to this directory, so that /metrics reports the
+# totals of all workers (see app.metrics)
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", str(Path(tempfile.gettempdir()) / "foodsnap-metrics")
+)
+
+
+def on_starting(server):
+    # start from empty metrics rather than those of a previous run
+    path = Path(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+
+    from app.estimator.constants import PRELOAD_MODEL
+
+    if PRELOAD_MODEL:
+        from app.api.warmup import preload
+
+        preload()
+
+
+def post_fork(server, worker):
+    from app.api.warmup import init_worker
+
+    init_worker(server.cfg.workers)
+
+
+def post_worker_init(worker):
+    from app.estimator.constants import WARMUP
+
+    if WARMUP:
+        from app.api.warmup import warmup
+
+        warmup()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -11,6 +11,14 @@ mp.setenv("EDAMAM_KEY", "FAKE_EDAMAM_KEY")
 mp.setenv("EDAMAM_ID", "FAKE_EDAMAM_ID")
 
 
+@pytest.fixture(autouse=True)
+def reset_vision_client(monkeypatch):
+    # the Vision client is shared per process, so create a new one for each test
+    from app.estimator import vision as vision_api
+
+    monkeypatch.setattr(vision_api, "_client", None)
+
+
 @pytest.fixture
 def mock_vision(monkeypatch):
     mock_vision = MagicMock()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import numpy as np
+import pytest
+from starlette.testclient import TestClient
+
+from app.api import asgi, endpoint
+from app.api.cache import ResultCache
+from app.estimator import vision
+from app.estimator.calories import FoodDetails
+from app.util import encode_image
+
+
+async def fake_food_details(item, weight):
+    await asyncio.sleep(0.2)
+    return FoodDetails(item.capitalize(), {"ENERC_KCAL": 399.0}, weight)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(endpoint, "result_cache", ResultCache(max_size=0))
+    return TestClient(asgi.app)
+
+
+def test_asgi_endpoint_returns_calories(client, monkeypatch):
+    """Tests that the ASGI endpoint returns the same response as the Flask endpoint"""
+    monkeypatch.setattr(
+        endpoint,
+        "get_model_predictions",
+        lambda image, plate_diameter: (["pizza"], [150.0], True, True),
+    )
+    monkeypatch.setattr(endpoint, "get_food_details_async", fake_food_details)
+    image = encode_image(np.zeros((32, 32, 3), dtype=np.uint8))
+
+    response = client.post(
+        "/", files={"file": ("pizza.jpg", image)}, data={"plateValue": "27"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "success",
+        "model_code": "YOLO_USE_PLATE_SIZE",
+        "results": [
+            {"label": "Pizza", "nutrition": {"ENERC_KCAL": 399.0}, "weight": 150.0}
+        ],
+    }
+
+
+def test_asgi_endpoint_awaits_lookups_concurrently(monkeypatch):
+    """Tests that requests waiting for lookups do not hold a thread each"""
+    monkeypatch.setattr(endpoint, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(
+        endpoint,
+        "get_model_predictions",
+        lambda image, plate_diameter: (["pizza"], [150.0], True, True),
+    )
+    monkeypatch.setattr(endpoint, "get_food_details_async", fake_food_details)
+    image = encode_image(np.zeros((32, 32, 3), dtype=np.uint8))
+
+    async def post_all(count):
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await asyncio.gather(
+                *[
+                    c.post("/", files={"file": ("pizza.jpg", image)})
+                    for _ in range(count)
+                ]
+            )
+
+    start = time.monotonic()
+    responses = asyncio.run(post_all(32))
+    elapsed = time.monotonic() - start
+
+    assert [response.status_code for response in responses] == [200] * 32
+    # the lookups of all requests overlap, with a single inference thread
+    assert elapsed < 32 * 0.2 / 4
+
+
+def test_asgi_endpoint_awaits_vision_fallback(client, monkeypatch):
+    """Tests that images without food detected are classified by the async Vision client"""
+    vision_client = MagicMock()
+    vision_client.batch_annotate_images = AsyncMock(
+        return_value=MagicMock(
+            responses=[
+                MagicMock(
+                    label_annotations=[MagicMock(description="Pizza", score=0.9)],
+                    error=MagicMock(message=""),
+                )
+            ]
+        )
+    )
+    monkeypatch.setattr(vision, "get_async_client", lambda: vision_client)
+    monkeypatch.setattr(
+        endpoint,
+        "get_model_predictions",
+        lambda image, plate_diameter: ([], [], False, False),
+    )
+    monkeypatch.setattr(endpoint, "get_food_details_async", fake_food_details)
+    image = encode_image(np.zeros((32, 32, 3), dtype=np.uint8))
+
+    response = client.post("/", files={"file": ("pizza.jpg", image)})
+
+    assert response.json()["model_code"] == "VISION_DEFAULT"
+    assert response.json()["results"][0]["weight"] == 100.0
+    vision_client.batch_annotate_images.assert_awaited_once()
+
+
+def test_asgi_endpoint_requires_file(client):
+    """Tests that requests without an image are rejected"""
+    response = client.post("/", data={"plateValue": "27"})
+
+    assert response.status_code == 400
+
+
+def test_asgi_endpoint_rejects_oversize_upload():
+    """Tests that declared and streamed bodies above the size limit are rejected"""
+    client = TestClient(asgi.UploadLimitMiddleware(asgi.app, max_size=1024))
+    image = encode_image(np.random.randint(0, 255, (128, 128, 3), dtype=np.uint8))
+
+    response = client.post("/", files={"file": ("pizza.jpg", image)})
+    assert response.status_code == 413
+
+    def chunks():
+        yield image[:512]
+        yield image[512:]
+
+    response = client.post(
+        "/",
+        content=chunks(),
+        headers={"content-type": "multipart/form-data; boundary=x"},
+    )
+    assert response.status_code == 413
+
+
+def test_asgi_endpoint_rejects_non_image_upload(client):
+    """Tests that uploads which are not images are rejected"""
+    response = client.post("/", files={"file": ("pizza.jpg", b"not an image")})
+
+    assert response.status_code == 415
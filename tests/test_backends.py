@@ -0,0 +1,39 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.estimator import yolo
+from app.estimator.backends import InferenceBackend, check_backend, get_backend
+
+
+def test_get_backend():
+    """Tests that backends are selected by name"""
+    assert get_backend("torch").export_format is None
+    assert get_backend("onnx").artifact.suffix == ".onnx"
+
+    with pytest.raises(ValueError):
+        get_backend("tensorrt")
+
+
+def test_check_backend_requires_artifact(tmp_path):
+    """Tests that a backend without an exported model cannot be loaded"""
+    backend = InferenceBackend("test", tmp_path / "model.onnx", "json", "onnx")
+
+    with pytest.raises(FileNotFoundError):
+        check_backend(backend)
+
+    backend.requirement = "not_an_installed_runtime"
+    with pytest.raises(ImportError):
+        check_backend(backend)
+
+
+def test_load_model_with_exported_backend(tmp_path, monkeypatch):
+    """Tests that exported models are loaded as segmentation models"""
+    mock_yolo = MagicMock()
+    monkeypatch.setattr("ultralytics.YOLO", mock_yolo)
+    artifact = tmp_path / "model.onnx"
+    artifact.touch()
+
+    yolo.load_model(InferenceBackend("test", artifact, "json", "onnx"))
+
+    mock_yolo.assert_called_once_with(str(artifact), task="segment")
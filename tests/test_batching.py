@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from app.estimator.batching import MicroBatcher
+
+
+def test_micro_batcher_groups_concurrent_items():
+    """Tests that items submitted together are processed as one batch"""
+    batches = []
+    release = threading.Event()
+
+    def process(items):
+        # hold the first batch so that the remaining items queue up behind it
+        release.wait(timeout=5)
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(5)]
+    release.set()
+
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+    assert sum(len(batch) for batch in batches) == 5
+    assert all(len(batch) <= 4 for batch in batches)
+    assert len(batches) < 5
+
+
+def test_micro_batcher_propagates_errors():
+    """Tests that a failing batch raises for every waiting caller"""
+
+    def process(items):
+        raise RuntimeError("model failure")
+
+    batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=1)
+
+    with pytest.raises(RuntimeError, match="model failure"):
+        batcher(1)
+
+
+def test_micro_batcher_fails_single_items():
+    """Tests that an exception returned for one item is raised for it only"""
+
+    def process(items):
+        return [ValueError("bad item") if item < 0 else item for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=50)
+    failed, succeeded = batcher.submit(-1), batcher.submit(1)
+
+    assert succeeded.result(timeout=5) == 1
+    with pytest.raises(ValueError, match="bad item"):
+        failed.result(timeout=5)
+
+
+def test_micro_batcher_rejects_invalid_size():
+    """Tests that the batch size must be positive"""
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda items: items, max_batch_size=0)
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from benchmarks import startup
+from benchmarks.run import BenchmarkResult, main, run_benchmark
+
+
+def test_benchmark_result_summary():
+    """Tests throughput and latency percentiles of a benchmark"""
+    result = BenchmarkResult("stage", [i / 1000 for i in range(1, 101)], 2.0)
+
+    summary = result.summary()
+
+    assert summary["iterations"] == 100
+    assert summary["throughput"] == 50.0
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+
+
+def test_run_benchmark_concurrent():
+    """Tests that concurrent benchmarks time every call"""
+    calls = []
+
+    result = run_benchmark(lambda: calls.append(1), "stage", 20, 2, concurrency=4)
+
+    assert len(calls) == 22
+    assert len(result.latencies) == 20
+
+
+def test_benchmarks_run_offline(tmp_path, capsys):
+    """Tests that every pipeline path runs against the local stand-ins"""
+    report = tmp_path / "report.json"
+
+    main(
+        [
+            "--iterations=1",
+            "--warmup=0",
+            "--model=missing.pt",
+            "--nutrition=edamam",
+            "--edamam-latency=0",
+            "--vision-latency=0",
+            "--image-size",
+            "320",
+            "240",
+            f"--json={report}",
+        ]
+    )
+
+    results = json.loads(report.read_text())
+    assert "detect_food_items" in results
+    assert "request[NO_FOOD_DETECTED]" in results
+    assert len(results) == 14
+    assert "get_food_details" in capsys.readouterr().out
+
+
+def test_startup_defers_heavy_modules(tmp_path, monkeypatch):
+    """Tests that a cold start is measured in a fresh process and checked"""
+    report = tmp_path / "startup.json"
+    args = ["--runs=1", "--no-warmup", "--model=missing.pt", f"--json={report}"]
+
+    # the import time is checked against the budget by the startup CI job
+    assert startup.main([*args, "--budget=inf"]) == 0
+    run = json.loads(report.read_text())
+    assert run["import"] > 0
+
+    # a slow import fails the default budget
+    slow = {"import": 2 * startup.IMPORT_BUDGET, "warmup": 0.0, "first_request": 0.1}
+    monkeypatch.setattr(
+        startup,
+        "run_fresh",
+        lambda warmup, model_path: {**slow, "steps": {}, "loaded_on_import": []},
+    )
+    assert startup.main(args) == 1
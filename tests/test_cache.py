@@ -0,0 +1,72 @@
+import numpy as np
+
+from app.api import cache, endpoint
+from app.api.cache import ResultCache, hamming_distance, perceptual_hash
+from app.util import decode_image, encode_image
+
+
+def make_image():
+    """Create a simple test image with some structure."""
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    image[40:200, 60:260] = (40, 120, 200)
+    image[100:140, 100:220] = 255
+    return image
+
+
+def test_perceptual_hash_matches_recompressed_image():
+    """Tests that a recompressed copy of a photo has a near-identical hash"""
+    image = make_image()
+    recompressed = decode_image(encode_image(image))
+    different = np.zeros_like(image)
+    different[:, :160] = 255
+
+    assert hamming_distance(perceptual_hash(image), perceptual_hash(recompressed)) <= 4
+    assert hamming_distance(perceptual_hash(image), perceptual_hash(different)) > 4
+
+
+def test_result_cache_near_duplicates_and_plate():
+    """Tests that near-duplicate hashes hit only for the same plate diameter"""
+    result_cache = ResultCache(max_size=4, ttl=60, max_distance=2)
+    result_cache.put(0b1010, 25.0, ["pizza"])
+
+    assert result_cache.get(0b1010, 25.0) == ["pizza"]
+    assert result_cache.get(0b1011, 25.0) == ["pizza"]
+    assert result_cache.get(0b0101, 25.0) is None
+    assert result_cache.get(0b1010, 30.0) is None
+
+
+def test_result_cache_eviction(monkeypatch):
+    """Tests least recently used and expired results are evicted"""
+    now = [0.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    result_cache = ResultCache(max_size=2, ttl=10, max_distance=0)
+    result_cache.put(1, 25.0, "a")
+    result_cache.put(2, 25.0, "b")
+    result_cache.get(1, 25.0)
+    result_cache.put(4, 25.0, "c")
+
+    assert result_cache.get(2, 25.0) is None
+    assert result_cache.get(1, 25.0) == "a"
+
+    now[0] = 11.0
+    assert result_cache.get(1, 25.0) is None
+
+
+def test_get_calories_uses_cache(monkeypatch):
+    """Tests that repeated photos skip the model and nutrition lookups"""
+    calls = []
+
+    def fake_predictions(image, plate_diameter):
+        calls.append(image)
+        return [], [], False, False
+
+    monkeypatch.setattr(endpoint, "result_cache", ResultCache())
+    monkeypatch.setattr(endpoint, "get_model_predictions", fake_predictions)
+    monkeypatch.setattr(endpoint, "get_food_classification", lambda image: None)
+    content = encode_image(make_image())
+
+    first = endpoint.get_calories(content)
+    second = endpoint.get_calories(content)
+
+    assert first == second == ([], endpoint.ModelCodeEnum.VISION_DEFAULT)
+    assert len(calls) == 1
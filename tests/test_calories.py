@@ -1,8 +1,15 @@
 from unittest.mock import MagicMock
 
+import pytest
 import requests_mock
 
-from app.estimator.calories import FoodDetails, check_response, make_request, parse_json
+from app.estimator.calories import (
+    FoodDetails,
+    check_response,
+    get_credentials,
+    make_request,
+    parse_json,
+)
 from app.estimator.constants import EDAMAM_URL
 
 
@@ -100,3 +107,13 @@ def test_json_is_parsed():
     assert isinstance(result, FoodDetails)
     assert result.label == "Test Food"
     assert result.nutrition == {"KCal": 100}
+
+
+def test_credentials_are_read_on_use(monkeypatch):
+    """Tests that missing Edamam credentials only fail the API call"""
+    monkeypatch.delenv("EDAMAM_KEY")
+
+    with pytest.raises(EnvironmentError):
+        get_credentials()
+    with pytest.raises(EnvironmentError):
+        make_request("pizza")
@@ -0,0 +1,399 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import torch
+
+from app.api import endpoint
+from app.estimator import vision, yolo
+from app.estimator.calories import FoodDetails
+from app.estimator.weight import get_food_weights
+from app.util import encode_image
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    def fake_calories(image, plate_diameter):
+        calls.append((image, plate_diameter))
+        return [], endpoint.ModelCodeEnum.NO_FOOD_DETECTED
+
+    monkeypatch.setattr(endpoint, "get_calories", fake_calories)
+    client = endpoint.app.test_client()
+    client.calls = calls
+    return client
+
+
+def test_get_nutrition_details_concurrent(monkeypatch):
+    """Tests that lookups run concurrently, keep their order and isolate errors"""
+    delays = {"pizza": 0.3, "burger": 0.2, "salad": 0.1}
+
+    def fake_details(search, weight):
+        if search == "bread":
+            raise ValueError("Edamam API could not return information")
+        time.sleep(delays[search])
+        return FoodDetails(search.capitalize(), {"ENERC_KCAL": weight}, weight)
+
+    monkeypatch.setattr(endpoint, "get_food_details", fake_details)
+
+    start = time.monotonic()
+    details, failed = endpoint.get_nutrition_details(
+        ["pizza", "bread", "burger", "salad"], [100.0, 50.0, 200.0, 80.0]
+    )
+    elapsed = time.monotonic() - start
+
+    assert [item["label"] for item in details] == ["Pizza", "Burger", "Salad"]
+    assert failed == ["bread"]
+    assert [item["weight"] for item in details] == [100.0, 200.0, 80.0]
+    assert elapsed < sum(delays.values())
+
+
+def test_failed_lookups_are_not_cached(monkeypatch):
+    """Tests that results missing a food item are retried instead of cached"""
+    calls = []
+
+    def fake_details(search, weight):
+        calls.append(search)
+        if len(calls) == 1:
+            raise ValueError("Edamam API could not return information")
+        return FoodDetails(search.capitalize(), {"ENERC_KCAL": weight}, weight)
+
+    monkeypatch.setattr(endpoint, "result_cache", endpoint.ResultCache(max_size=8))
+    monkeypatch.setattr(endpoint, "get_food_details", fake_details)
+    monkeypatch.setattr(
+        endpoint,
+        "get_model_predictions",
+        lambda image, plate_diameter: (["pizza"], [150.0], True, True),
+    )
+    image = encode_image(np.full((32, 32, 3), 200, dtype=np.uint8))
+
+    assert endpoint.get_calories(image)[0] == []
+    assert [item["label"] for item in endpoint.get_calories(image)[0]] == ["Pizza"]
+    assert [item["label"] for item in endpoint.get_calories(image)[0]] == ["Pizza"]
+    assert calls == ["pizza", "pizza"]
+
+
+def test_batch_failed_lookups_are_not_cached(monkeypatch):
+    """Tests that batch results missing a food item are retried instead of cached"""
+    calls = []
+
+    def fake_detect(images):
+        calls.append(len(images))
+        return [(np.array(["pizza"]), np.array([0.2]), None) for _ in images]
+
+    def fake_nutrition(search):
+        raise ValueError("Edamam API could not return information")
+
+    monkeypatch.setattr(endpoint, "result_cache", endpoint.ResultCache(max_size=8))
+    monkeypatch.setattr(endpoint, "detect_food_items_batch", fake_detect)
+    monkeypatch.setattr(endpoint, "get_food_nutrition", fake_nutrition)
+    image = encode_image(np.full((32, 32, 3), 200, dtype=np.uint8))
+
+    for _ in range(2):
+        results = endpoint.get_calories_batch([image], [25.0])
+        assert results == [([], endpoint.ModelCodeEnum.YOLO_USE_IMAGE_SIZE)]
+    assert calls == [1, 1]
+
+
+def test_endpoint_reads_upload_once(client):
+    """Tests that the uploaded bytes and plate size reach the model unchanged"""
+    image = encode_image(np.zeros((32, 32, 3), dtype=np.uint8))
+
+    response = client.post(
+        "/", data={"file": (BytesIO(image), "pizza.jpg"), "plateValue": "27"}
+    )
+
+    assert response.status_code == 200
+    assert client.calls == [(image, 27.0)]
+
+
+def test_endpoint_rejects_oversize_upload(client, monkeypatch):
+    """Tests that bodies above the size limit are rejected before processing"""
+    monkeypatch.setitem(endpoint.app.config, "MAX_CONTENT_LENGTH", 1024)
+    image = encode_image(np.random.randint(0, 255, (128, 128, 3), dtype=np.uint8))
+
+    response = client.post("/", data={"file": (BytesIO(image), "pizza.jpg")})
+
+    assert response.status_code == 413
+    assert client.calls == []
+
+
+@pytest.mark.parametrize(
+    "content, filename",
+    [(b"%PDF-1.7 not an image", "menu.pdf"), (b"not an image", "pizza.jpg")],
+)
+def test_endpoint_rejects_non_image_upload(client, content, filename):
+    """Tests that uploads which are not images are rejected"""
+    response = client.post("/", data={"file": (BytesIO(content), filename)})
+
+    assert response.status_code == 415
+    assert client.calls == []
+
+
+def test_endpoint_requires_file(client):
+    """Tests that requests without an image are rejected"""
+    assert client.post("/", data={"plateValue": "27"}).status_code == 400
+    assert client.post("/", json={"plateValue": "27"}).status_code == 400
+
+
+def test_endpoint_isolates_concurrent_requests(monkeypatch):
+    """Tests that concurrent requests in one process each get their own result"""
+
+    def fake_predictions(image, plate_diameter):
+        # label each image by its brightness so responses can be matched
+        time.sleep(0.01)
+        return [f"item{int(image.mean())}"], [plate_diameter], True, True
+
+    monkeypatch.setattr(endpoint, "result_cache", endpoint.ResultCache(max_size=0))
+    monkeypatch.setattr(endpoint, "get_model_predictions", fake_predictions)
+    monkeypatch.setattr(
+        endpoint,
+        "get_food_details",
+        lambda item, weight: FoodDetails(item, {}, weight),
+    )
+
+    def post(i):
+        image = encode_image(np.full((32, 32, 3), i * 10, dtype=np.uint8))
+        response = endpoint.app.test_client().post(
+            "/", data={"file": (BytesIO(image), "same.jpg"), "plateValue": str(i + 20)}
+        )
+        return response.get_json()["results"]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(post, range(16)))
+
+    assert results == [
+        [{"label": f"item{i * 10}", "nutrition": {}, "weight": float(i + 20)}]
+        for i in range(16)
+    ]
+
+
+class LetterboxModel:
+    """
+    Stand-in for the YOLO model finding pizza on the bright pixels of each
+    image. Like ultralytics, it pads a single image
+    to a multiple of the stride and images of mixed shapes to a square.
+    """
+
+    names = {0: "pizza"}
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, source, imgsz, **kwargs):
+        from tests.test_yolo import letterbox_masks, make_result
+
+        self.calls.append(len(source))
+        shapes = {image.shape[:2] for image in source}
+        results = []
+        for image in source:
+            height, width = image.shape[:2]
+            shape = (imgsz, imgsz)
+            if len(shapes) == 1:
+                gain = imgsz / max(height, width)
+                shape = tuple(
+                    int(np.ceil(round(side * gain) / 32)) * 32
+                    for side in (height, width)
+                )
+            food = torch.tensor(image.mean(axis=2) > 127, dtype=torch.uint8)
+            if not food.any():
+                results.append(make_result([]))
+                continue
+            result = make_result([0.9], letterbox_masks(food[None], shape))
+            result.orig_shape = (height, width)
+            results.append(result)
+        return results
+
+
+def make_plate_image(height, width):
+    """Create an image with a bright food region in the middle."""
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[height // 4 : height // 2, width // 4 : 3 * width // 4] = 255
+    return image
+
+
+def test_batch_endpoint_shares_model_and_lookups(monkeypatch):
+    """
+    Tests that a batch runs one YOLO call and one lookup per distinct item,
+    and that images of mixed shapes get the same weights as when sent alone
+    """
+    pytest.importorskip("ultralytics")
+    calls = {"nutrition": [], "vision": []}
+
+    def fake_nutrition(search):
+        calls["nutrition"].append(search)
+        return FoodDetails(search.capitalize(), {"ENERC_KCAL": 200.0})
+
+    def fake_vision(image):
+        calls["vision"].append(image)
+        return ["Pizza"], [100.0]
+
+    model = LetterboxModel()
+    monkeypatch.setattr(yolo, "_model", model)
+    monkeypatch.setattr(endpoint, "result_cache", endpoint.ResultCache(max_size=0))
+    monkeypatch.setattr(endpoint, "get_food_nutrition", fake_nutrition)
+    monkeypatch.setattr(
+        endpoint,
+        "get_food_details",
+        lambda item, weight: FoodDetails(item.capitalize(), {}, weight),
+    )
+    monkeypatch.setattr(endpoint, "get_vision_predictions", fake_vision)
+    landscape = encode_image(make_plate_image(480, 640))
+    empty = encode_image(np.zeros((32, 32, 3), dtype=np.uint8))
+    portrait = encode_image(make_plate_image(640, 480))
+
+    response = endpoint.app.test_client().post(
+        "/batch",
+        data={
+            "file": [
+                (BytesIO(landscape), "a.jpg"),
+                (BytesIO(empty), "b.jpg"),
+                (BytesIO(portrait), "c.jpg"),
+            ],
+            "plateValue": ["20", "", "30"],
+        },
+    )
+
+    assert response.status_code == 200
+    responses = response.get_json()
+    assert [r["model_code"] for r in responses] == [
+        "YOLO_USE_IMAGE_SIZE",
+        "VISION_DEFAULT",
+        "YOLO_USE_IMAGE_SIZE",
+    ]
+    assert [r["results"][0]["label"] for r in responses] == ["Pizza"] * 3
+    assert responses[1]["results"][0]["nutrition"] == {"ENERC_KCAL": 200.0}
+    assert model.calls == [3]
+    assert calls["vision"] == [empty]
+    assert calls["nutrition"] == ["pizza"]
+
+    # each image is padded differently alone than in the mixed batch
+    for image, batched in [(landscape, responses[0]), (portrait, responses[2])]:
+        results, _ = endpoint.get_calories(image)
+        assert batched["results"][0]["weight"] == pytest.approx(
+            results[0]["weight"], rel=1e-2
+        )
+
+
+def test_batch_reports_vision_failures(monkeypatch):
+    """Tests that images whose Vision fallback failed get an uncached error"""
+    calls = []
+
+    def fake_detect(images):
+        calls.append(len(images))
+        return [(np.empty(0, dtype=str), np.empty(0), None) for _ in images]
+
+    def fail(image):
+        raise RuntimeError("Vision API unavailable")
+
+    monkeypatch.setattr(endpoint, "result_cache", endpoint.ResultCache(max_size=8))
+    monkeypatch.setattr(endpoint, "detect_food_items_batch", fake_detect)
+    monkeypatch.setattr(endpoint, "get_vision_predictions", fail)
+    image = encode_image(np.full((32, 32, 3), 200, dtype=np.uint8))
+
+    for _ in range(2):
+        response = endpoint.app.test_client().post(
+            "/batch", data={"file": (BytesIO(image), "a.jpg")}
+        )
+        assert response.status_code == 200
+        assert response.get_json() == [
+            {"status": "error", "model_code": "VISION_FAILED", "results": []}
+        ]
+    assert calls == [1, 1]
+
+
+def test_batched_vision_errors_are_not_cached(monkeypatch, mock_vision):
+    """Tests that an image failed in a batched Vision call is not a cached miss"""
+    client = mock_vision.return_value
+    client.batch_annotate_images.return_value = MagicMock(
+        responses=[
+            MagicMock(
+                label_annotations=[], error=MagicMock(message="DEADLINE_EXCEEDED")
+            )
+        ]
+    )
+    monkeypatch.setattr(vision, "VISION_BATCH_MAX_SIZE", 4)
+    monkeypatch.setattr(vision, "_scheduler", None)
+    monkeypatch.setattr(endpoint, "result_cache", endpoint.ResultCache(max_size=8))
+    monkeypatch.setattr(
+        endpoint, "get_model_predictions", lambda image, plate: ([], [], False, False)
+    )
+    monkeypatch.setattr(
+        endpoint,
+        "detect_food_items_batch",
+        lambda images: [(np.empty(0, dtype=str), np.empty(0), None) for _ in images],
+    )
+    image = encode_image(np.full((32, 32, 3), 200, dtype=np.uint8))
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="DEADLINE_EXCEEDED"):
+            endpoint.get_calories(image)
+    response = endpoint.app.test_client().post(
+        "/batch", data={"file": (BytesIO(image), "a.jpg")}
+    )
+
+    assert response.get_json()[0]["model_code"] == "VISION_FAILED"
+    assert client.batch_annotate_images.call_count == 3
+
+
+def test_batch_endpoint_rejects_invalid_batches(monkeypatch):
+    """Tests that batches which are too large or contain non-images are rejected"""
+    monkeypatch.setattr(endpoint, "BATCH_MAX_IMAGES", 2)
+    image = encode_image(np.zeros((32, 32, 3), dtype=np.uint8))
+    client = endpoint.app.test_client()
+
+    def post(*contents):
+        files = [(BytesIO(content), f"{i}.jpg") for i, content in enumerate(contents)]
+        return client.post("/batch", data={"file": files}).status_code
+
+    assert post() == 400
+    assert post(image, image, image) == 400
+    assert post(image, b"not an image") == 415
+
+
+def test_batch_endpoint_has_own_size_limit(client, monkeypatch):
+    """Tests that the batch endpoint accepts bodies above the single image limit"""
+    monkeypatch.setitem(endpoint.app.config, "MAX_CONTENT_LENGTH", 1024)
+    monkeypatch.setattr(endpoint, "BATCH_MAX_UPLOAD_BYTES", 1024 * 1024)
+    monkeypatch.setattr(
+        endpoint,
+        "get_calories_batch",
+        lambda images, plates: [([], endpoint.ModelCodeEnum.NO_FOOD_DETECTED)],
+    )
+    image = encode_image(np.random.randint(0, 255, (128, 128, 3), dtype=np.uint8))
+
+    assert client.post("/", data={"file": (BytesIO(image), "a.jpg")}).status_code == 413
+    response = client.post("/batch", data={"file": (BytesIO(image), "a.jpg")})
+    assert response.status_code == 200
+    assert response.get_json()[0]["status"] == "failure"
+
+
+def test_estimate_weights_batch_matches_single_images():
+    """Tests that batched weight estimation equals estimation image by image"""
+    detections = [
+        (np.array(["pizza", "plate", "fries"]), np.array([0.2, 0.5, 0.1])),
+        (np.empty(0, dtype=str), np.empty(0)),
+        (np.array(["burger"]), np.array([0.3])),
+        (np.array(["plate"]), np.array([0.6])),
+    ]
+    plate_diameters = [50.0, 25.0, 25.0, 25.0]
+
+    batch = endpoint.estimate_weights_batch(detections, plate_diameters)
+
+    assert batch == [
+        endpoint.estimate_weights(labels, areas, diameter)
+        for (labels, areas), diameter in zip(detections, plate_diameters)
+    ]
+    # an implausible plate size is replaced by the default of 25cm
+    assert batch[0][1] == pytest.approx(
+        get_food_weights(["pizza", "fries"], [0.2, 0.1], 0.8, 25.0, plate=True)
+    )
+    assert batch[0][2:] == (True, True)
+    assert batch[1] == ([], [], False, False)
+    assert batch[2][0] == ["burger"] and batch[2][2:] == (False, True)
+    assert batch[3] == ([], [], False, False)
+    assert endpoint.estimate_weights_batch([], []) == []
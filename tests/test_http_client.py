@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.estimator.async_http_client import create_async_client
+from app.estimator.http_client import ConnectionStats, create_session
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Local server responding with a queue of status codes."""
+
+    protocol_version = "HTTP/1.1"
+    statuses: list = []
+
+    def do_GET(self):
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+
+
+def test_session_reuses_connections(server):
+    """Tests that consecutive requests share one keep-alive connection"""
+    stats = ConnectionStats()
+    session = create_session(stats)
+
+    for _ in range(3):
+        assert session.get(server, timeout=5).ok
+
+    assert stats.requests == 3
+    assert stats.new_connections == 1
+    assert stats.reused == 2
+
+
+def test_session_retries_transient_errors(server):
+    """Tests that 429 and 5xx responses are retried until success"""
+    Handler.statuses = [503, 429]
+    session = create_session(ConnectionStats(), backoff_factor=0.01)
+
+    response = session.get(server, timeout=5)
+
+    assert response.status_code == 200
+    assert Handler.statuses == []
+
+
+def test_session_gives_up_after_retries(server):
+    """Tests that the last error response is returned once retries run out"""
+    Handler.statuses = [500, 500, 500]
+    session = create_session(ConnectionStats(), retries=2, backoff_factor=0.01)
+
+    assert session.get(server, timeout=5).status_code == 500
+
+
+def test_async_client_reuses_connections(server):
+    """Tests that the asynchronous client shares one keep-alive connection"""
+    stats = ConnectionStats()
+
+    async def get_all():
+        async with create_async_client(stats) as client:
+            return [(await client.get(server)).status_code for _ in range(3)]
+
+    assert asyncio.run(get_all()) == [200] * 3
+    assert stats.requests == 3
+    assert stats.new_connections == 1
+
+
+def test_async_client_retries_transient_errors(server):
+    """Tests that the asynchronous client retries 429 and 5xx until it gives up"""
+
+    async def get():
+        client = create_async_client(ConnectionStats(), retries=2, backoff_factor=0.01)
+        async with client:
+            return (await client.get(server)).status_code
+
+    Handler.statuses = [503, 429]
+    assert asyncio.run(get()) == 200
+    Handler.statuses = [500, 500, 500]
+    assert asyncio.run(get()) == 500
+    assert Handler.statuses == []
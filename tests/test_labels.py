@@ -0,0 +1,46 @@
+import pytest
+
+from app.estimator import calories
+from app.estimator.labels import food_key, normalize_label, resolve_label
+
+
+def test_normalize_label():
+    """Tests that casing, separators and whitespace are ignored"""
+    assert normalize_label("  French_Fries ") == "french fries"
+    assert normalize_label("Pizza-Margherita") == "pizza margherita"
+
+
+def test_resolve_label():
+    """Tests resolution of Vision and YOLO labels to served food items"""
+    assert resolve_label("Pizza") == "Pizza"
+    assert resolve_label("PIZZA") == "Pizza"
+    assert resolve_label("Hamburger") == "Burger"
+    assert resolve_label("Chesse burger") == "Cheeseburger"
+    assert resolve_label("fries") == "Fries"
+    assert resolve_label("Unknown dish") is None
+
+
+def test_denied_labels_do_not_resolve():
+    """Tests that the deny list takes precedence over served food items"""
+    assert resolve_label("Food") is None
+    assert resolve_label("plate") is None
+    assert resolve_label("Red Cabbage") is None
+
+
+def test_food_key():
+    """Tests that aliases map to the keys of the depth and density constants"""
+    assert food_key("Hamburger") == "burger"
+    assert food_key("French Fries") == "fries"
+    assert food_key("Omelette") == "omelette"
+
+
+def test_get_food_details_skips_unknown_labels(monkeypatch):
+    """Tests that unknown labels are rejected without calling the Edamam API"""
+
+    def fail(search):
+        raise AssertionError("Edamam API should not be called")
+
+    monkeypatch.setattr(calories, "fetch_nutrition", fail)
+
+    with pytest.raises(ValueError):
+        calories.get_food_details("Tableware")
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.memory import (
+    ProcessMemory,
+    child_pids,
+    format_report,
+    memory_report,
+    parse_smaps_rollup,
+)
+
+SMAPS_ROLLUP = """\
+00400000-7ffd1b9fe000 ---p 00000000 00:00 0                              [rollup]
+Rss:              102400 kB
+Pss:               61440 kB
+Shared_Clean:      81920 kB
+Shared_Dirty:          0 kB
+Private_Clean:      4096 kB
+Private_Dirty:     16384 kB
+Swap:                  0 kB
+"""
+
+linux_only = pytest.mark.skipif(
+    not Path(f"/proc/{os.getpid()}/smaps_rollup").exists(),
+    reason="needs /proc/<pid>/smaps_rollup",
+)
+
+
+def test_parse_smaps_rollup():
+    """Tests that sizes are parsed in bytes"""
+    sizes = parse_smaps_rollup(SMAPS_ROLLUP)
+
+    assert sizes["Rss"] == 100 * 2**20
+    assert sizes["Private_Dirty"] == 16 * 2**20
+
+
+def test_format_report_totals():
+    """Tests that the report sums the memory of all processes"""
+    report = [
+        ProcessMemory(1, rss=2**30, pss=2**29, shared=2**29, unique=2**29),
+        ProcessMemory(2, rss=2**30, pss=2**29, shared=2**29, unique=2**29),
+    ]
+
+    lines = format_report(report).splitlines()
+
+    assert lines[1].startswith("master 1")
+    assert lines[2].startswith("worker 2")
+    assert lines[-1].split() == ["total", "2048.0", "1024.0", "1024.0"]
+
+
+@linux_only
+def test_memory_report_of_forked_children():
+    """Tests that the children of a process are found and share its pages"""
+    child = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import os, time\n"
+            "if os.fork() == 0:\n    time.sleep(30)\n"
+            "else:\n    print(flush=True); time.sleep(30)",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert child.stdout is not None
+        child.stdout.readline()
+
+        report = memory_report(child.pid)
+
+        assert len(child_pids(child.pid)) == 1
+        assert [memory.pid for memory in report][0] == child.pid
+        assert all(memory.shared > 0 for memory in report)
+        assert all(memory.unique + memory.shared == memory.rss for memory in report)
+    finally:
+        child.kill()
+        child.wait()
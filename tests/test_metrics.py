@@ -0,0 +1,122 @@
+import os
+import subprocess
+import sys
+from io import BytesIO
+
+import pytest
+
+from app.api import endpoint
+from app.api.speculation import SpeculationStats
+from app.estimator.http_client import ConnectionStats
+from app.metrics import count_errors, time_stage
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_time_stage_records_failed_calls():
+    """Tests that stage durations and errors are recorded, also on failure"""
+    before = sample("foodsnap_stage_seconds_count", stage="test")
+    failures = sample("foodsnap_failures_total", type="test")
+
+    @time_stage("test")
+    def stage():
+        pass
+
+    stage()
+    with pytest.raises(ValueError):
+        with time_stage("test"), count_errors("test"):
+            raise ValueError()
+
+    assert sample("foodsnap_stage_seconds_count", stage="test") == before + 2
+    assert sample("foodsnap_failures_total", type="test") == failures + 1
+
+
+def test_connection_stats_are_exported():
+    """Tests that requests and new connections to external APIs are counted"""
+    stats = ConnectionStats("test")
+    requests = sample("foodsnap_http_requests_total", api="test")
+    connections = sample("foodsnap_http_connections_total", api="test")
+
+    stats.add_connection()
+    stats.add_request()
+    stats.add_request()
+
+    assert stats.reused == 1
+    assert sample("foodsnap_http_requests_total", api="test") == requests + 2
+    assert sample("foodsnap_http_connections_total", api="test") == connections + 1
+
+
+def test_speculation_stats_are_exported():
+    """Tests that speculative Vision API calls are counted by outcome"""
+    stats = SpeculationStats()
+    started = sample("foodsnap_vision_speculations_total", outcome="started")
+    wasted = sample("foodsnap_vision_speculations_total", outcome="wasted")
+    wasted_count = sample("foodsnap_vision_speculation_wasted_seconds_count")
+    wasted_sum = sample("foodsnap_vision_speculation_wasted_seconds_sum")
+
+    stats.record("started")
+    stats.record("started")
+    stats.record("wasted", 0.5)
+
+    assert (stats.started, stats.wasted, stats.wasted_seconds) == (2, 1, 0.5)
+    assert (
+        sample("foodsnap_vision_speculations_total", outcome="started") == started + 2
+    )
+    assert sample("foodsnap_vision_speculations_total", outcome="wasted") == wasted + 1
+    assert (
+        sample("foodsnap_vision_speculation_wasted_seconds_count") == wasted_count + 1
+    )
+    assert sample("foodsnap_vision_speculation_wasted_seconds_sum") == pytest.approx(
+        wasted_sum + 0.5
+    )
+
+
+def test_metrics_endpoint_counts_responses(monkeypatch):
+    """Tests that responses and rejected requests are exposed on /metrics"""
+    monkeypatch.setattr(
+        endpoint,
+        "get_calories",
+        lambda image, plate: ([], endpoint.ModelCodeEnum.VISION_DEFAULT),
+    )
+    client = endpoint.app.test_client()
+    no_food = sample("foodsnap_responses_total", model_code="NO_FOOD_DETECTED")
+    rejected = sample("foodsnap_failures_total", type="http_415")
+
+    client.post("/", data={"file": (BytesIO(b"not an image"), "a.jpg")})
+    client.post("/", data={"file": (BytesIO(b"\xff\xd8\xff\xe0"), "a.jpg")})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert b"foodsnap_stage_seconds_bucket" in response.data
+    assert sample("foodsnap_failures_total", type="http_415") == rejected + 1
+    assert (
+        sample("foodsnap_responses_total", model_code="NO_FOOD_DETECTED") == no_food + 1
+    )
+
+
+def test_metrics_aggregate_across_processes(tmp_path):
+    """Tests that /metrics reports the totals of all worker processes"""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def run(code):
+        return subprocess.run(
+            [sys.executable, "-c", code], env=env, check=True, capture_output=True
+        ).stdout.decode()
+
+    for _ in range(2):
+        run(
+            "from app.metrics import RESPONSES, time_stage\n"
+            "RESPONSES.labels(model_code='YOLO_USE_PLATE_SIZE').inc()\n"
+            "with time_stage('decode'): pass"
+        )
+    metrics = run(
+        "import sys; from app.metrics import render_metrics\n"
+        "sys.stdout.write(render_metrics()[0].decode())"
+    )
+
+    assert 'foodsnap_responses_total{model_code="YOLO_USE_PLATE_SIZE"} 2.0' in metrics
+    assert 'foodsnap_stage_seconds_count{stage="decode"} 2.0' in metrics
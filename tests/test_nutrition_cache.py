@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.estimator import calories
+from app.estimator.nutrition_cache import NutritionCache
+
+RECORD = {"label": "Pizza", "nutrition": {"ENERC_KCAL": 266.0}, "weight": 100.0}
+
+
+def test_nutrition_cache_persists_to_disk(tmp_path):
+    """Tests that records are reused from memory and from the SQLite store"""
+    calls = []
+
+    def fetch(search):
+        calls.append(search)
+        return RECORD
+
+    path = tmp_path / "nutrition.sqlite3"
+    cache = NutritionCache(path)
+    assert cache.get_or_fetch("Pizza", fetch) == RECORD
+    assert cache.get_or_fetch(" pizza", fetch) == RECORD
+
+    # a new process only has the records on disk
+    assert NutritionCache(path).get_or_fetch("pizza", fetch) == RECORD
+    assert calls == ["Pizza"]
+
+
+def test_nutrition_cache_coalesces_concurrent_misses():
+    """Tests that concurrent misses for the same term make one upstream call"""
+    calls = []
+
+    def fetch(search):
+        calls.append(search)
+        time.sleep(0.1)
+        return RECORD
+
+    cache = NutritionCache()
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_fetch("pizza", fetch))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [RECORD] * 5
+    assert len(calls) == 1
+
+
+def test_nutrition_cache_does_not_store_failures():
+    """Tests that failed lookups are retried on the next request"""
+
+    def fail(search):
+        raise ValueError("upstream error")
+
+    cache = NutritionCache()
+    with pytest.raises(ValueError):
+        cache.get_or_fetch("pizza", fail)
+
+    assert cache.get_or_fetch("pizza", lambda search: RECORD) == RECORD
+
+
+def test_get_food_details_scales_cached_nutrition(monkeypatch):
+    """Tests that scaling nutrition does not modify the cached values"""
+    monkeypatch.setattr(calories, "nutrition_cache", NutritionCache())
+    monkeypatch.setattr(calories, "get_local_nutrition", lambda item: None)
+    monkeypatch.setattr(calories, "fetch_nutrition", lambda search: RECORD)
+
+    first = calories.get_food_details("pizza", 200.0)
+    second = calories.get_food_details("pizza", 50.0)
+
+    assert first.nutrition == {"ENERC_KCAL": 532.0}
+    assert second.nutrition == {"ENERC_KCAL": 133.0}
+    assert RECORD["nutrition"] == {"ENERC_KCAL": 266.0}
+
+
+def test_get_food_details_async_caches_edamam_records(monkeypatch):
+    """Tests that the asynchronous lookup awaits Edamam only on a cache miss"""
+    calls = []
+
+    async def fake_request(search):
+        calls.append(search)
+        response = MagicMock()
+        response.json.return_value = {
+            "parsed": [{"food": {"label": "Pizza", "nutrients": RECORD["nutrition"]}}]
+        }
+        return response
+
+    monkeypatch.setattr(calories, "nutrition_cache", NutritionCache())
+    monkeypatch.setattr(calories, "get_local_nutrition", lambda item: None)
+    monkeypatch.setattr(calories, "make_request_async", fake_request)
+
+    first = asyncio.run(calories.get_food_details_async("pizza", 200.0))
+    second = asyncio.run(calories.get_food_details_async("Pizza", 50.0))
+
+    assert first.nutrition == {"ENERC_KCAL": 532.0}
+    assert second.nutrition == {"ENERC_KCAL": 133.0}
+    assert len(calls) == 1
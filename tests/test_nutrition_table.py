@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from app.estimator import calories, nutrition_table
+from app.estimator.constants import DEPTH_DICT, NUTRITION_TABLE_PATH
+from app.estimator.labels import resolve_label
+from app.estimator.nutrition_table import get_local_nutrition, load_nutrition_table
+
+
+def test_nutrition_table_covers_served_items():
+    """Tests that all table items are served foods"""
+    table = load_nutrition_table(Path(NUTRITION_TABLE_PATH))
+
+    assert table.values.shape == (len(table.items), len(table.nutrients))
+    assert all(resolve_label(item) == item for item in table.items)
+
+
+def test_nutrition_table_has_row_per_yolo_class():
+    """Tests that the bundled table has a row for every YOLO class"""
+    path = Path(nutrition_table.__file__).parent / "data" / "nutrition.csv"
+    table = load_nutrition_table(path)
+
+    missing = [label for label in DEPTH_DICT if table.get(label) is None]
+    assert missing == []
+
+
+def test_get_local_nutrition():
+    """Tests that local records have the same fields as Edamam records"""
+    record = get_local_nutrition("pizza")
+
+    assert record["label"] == "Pizza"
+    assert record["weight"] == 100.0
+    assert record["nutrition"]["ENERC_KCAL"] == 266.0
+    assert get_local_nutrition("Acai") is None
+
+
+def test_get_food_details_uses_local_table(monkeypatch):
+    """Tests that items in the local table do not call the Edamam API"""
+
+    def fail(search):
+        raise AssertionError("Edamam API should not be called")
+
+    monkeypatch.setattr(calories, "fetch_nutrition", fail)
+
+    details = calories.get_food_details("Hamburger", 200.0)
+
+    assert details.label == "Burger"
+    assert details.weight == 200.0
+    assert details.nutrition["ENERC_KCAL"] == 590.0
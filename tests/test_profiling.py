@@ -0,0 +1,67 @@
+import pstats
+import sys
+import threading
+from io import BytesIO
+
+from app.api import endpoint, profiling
+from app.api.profiling import profile, should_profile
+
+
+def test_should_profile():
+    """Tests sampling of requests and the opt-in profiling header"""
+    assert not should_profile("", sample_rate=0.0, allow_header=True)
+    assert should_profile("", sample_rate=1.0, allow_header=False)
+    assert should_profile("1", sample_rate=0.0, allow_header=True)
+    assert not should_profile("1", sample_rate=0.0, allow_header=False)
+
+
+def test_profile_falls_back_to_cprofile(tmp_path, monkeypatch):
+    """Tests that cProfile stats are written if pyinstrument is not installed"""
+    monkeypatch.setitem(sys.modules, "pyinstrument", None)
+
+    with profile("test", tmp_path):
+        sum(range(1000))
+
+    (path,) = tmp_path.glob("*-test-*.prof")
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_profile_skips_overlapping_requests(tmp_path, monkeypatch):
+    """Tests that only one request is profiled at a time"""
+    monkeypatch.setitem(sys.modules, "pyinstrument", None)
+    inside, release = threading.Event(), threading.Event()
+
+    def first():
+        with profile("first", tmp_path):
+            inside.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    inside.wait(5)
+    with profile("second", tmp_path):
+        pass
+    release.set()
+    thread.join()
+
+    assert [path.name.split("-")[1] for path in tmp_path.iterdir()] == ["first"]
+
+
+def test_endpoint_writes_profile_per_sampled_request(tmp_path, monkeypatch):
+    """Tests that requests are only profiled when sampled or requested"""
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(profiling, "PROFILE_HEADER", True)
+    client = endpoint.app.test_client()
+
+    client.post("/", data={"file": (BytesIO(b"not an image"), "a.jpg")})
+    assert list(tmp_path.iterdir()) == []
+
+    response = client.post(
+        "/",
+        data={"file": (BytesIO(b"not an image"), "a.jpg")},
+        headers={"X-Profile": "1"},
+    )
+
+    assert response.status_code == 415
+    assert len(list(tmp_path.glob("*-get_calorie_estimation-*"))) == 1
@@ -0,0 +1,35 @@
+import numpy as np
+
+from app.estimator.quantize import compare_predictions, preprocess_image
+
+
+def test_preprocess_image():
+    """Tests that calibration images are letterboxed into a model input"""
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    tensor = preprocess_image(image, imgsz=320)
+
+    assert tensor.shape == (1, 3, 320, 320)
+    assert tensor.dtype == np.float32
+    # padding above the resized image uses the ultralytics grey
+    assert np.isclose(tensor[0, 0, 0, 0], 114 / 255.0)
+    assert tensor[0, 0, 160, 160] == 0.0
+
+
+def test_compare_predictions():
+    """Tests accuracy metrics between float and quantized predictions"""
+    dims = np.zeros((2, 2))
+    reference = [
+        (np.array(["pizza", "plate"]), np.array([0.2, 0.6]), dims),
+        (np.array(["burger", "plate"]), np.array([0.3, 0.5]), dims),
+    ]
+    candidate = [
+        # same items detected in a different order
+        (np.array(["plate", "pizza"]), np.array([0.62, 0.2]), dims),
+        (np.array(["plate"]), np.array([0.5]), dims[:1]),
+    ]
+
+    metrics = compare_predictions(reference, candidate)
+
+    assert metrics["label_agreement"] == 0.5
+    assert np.isclose(metrics["mean_area_error"], 0.01)
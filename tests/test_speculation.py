@@ -0,0 +1,188 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.api import endpoint
+from app.api.cache import ResultCache
+from app.api.speculation import MissRateTracker, VisionSpeculator, predict_miss
+from app.util import encode_image
+
+empty = np.zeros((32, 32, 3), dtype=np.uint8)
+
+
+def textured_image(left, right):
+    rng = np.random.default_rng(0)
+    image = np.zeros((128, 128, 3), dtype=np.uint8)
+    image[:, :64] = left
+    image[:, 64:] = right
+    noise = rng.integers(-30, 30, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def food_image():
+    # orange and green patches, like a plate of food
+    return textured_image((40, 120, 220), (50, 160, 60))
+
+
+def test_miss_rate_tracker():
+    """Tests the moving average of YOLO misses"""
+    tracker = MissRateTracker(alpha=0.5)
+    tracker.update(missed=True)
+    tracker.update(missed=True)
+    tracker.update(missed=False)
+
+    assert tracker.rate == pytest.approx(0.375)
+
+
+def test_predict_miss():
+    """Tests that dark, blurry and colourless photos are predicted as YOLO misses"""
+    grey = np.full((128, 128, 3), 128, dtype=np.uint8)
+    blue = textured_image((220, 120, 40), (200, 60, 120))
+    blurry = cv2.GaussianBlur(food_image(), (0, 0), 8)
+
+    assert not predict_miss(food_image())
+    assert predict_miss(empty)
+    assert predict_miss(grey)
+    assert predict_miss(blue)
+    assert predict_miss(blurry)
+    assert not predict_miss(Path("pizza.jpg"))
+
+
+def test_should_speculate():
+    """Tests when each mode starts a speculative Vision API call"""
+    auto = VisionSpeculator("auto")
+    miss_rate = VisionSpeculator("miss_rate", miss_rate=0.5)
+
+    assert not VisionSpeculator("off").should_speculate(empty)
+    assert VisionSpeculator("always").should_speculate(food_image())
+    assert auto.should_speculate(empty)
+    assert not auto.should_speculate(food_image())
+    assert not miss_rate.should_speculate(empty)
+    miss_rate.tracker.rate = 0.6
+    assert miss_rate.should_speculate(food_image())
+
+    with pytest.raises(ValueError):
+        VisionSpeculator("sometimes")
+
+
+def test_speculative_call_accounting():
+    """Tests that used and discarded speculative calls are counted"""
+    speculator = VisionSpeculator("always", workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def vision_call():
+        started.set()
+        release.wait(timeout=5)
+
+    running = speculator.start(empty, vision_call)
+    started.wait(timeout=5)
+    queued = speculator.start(empty, lambda: "vision")
+    queued.discard()
+    running.discard()
+    release.set()
+    speculator._executor.shutdown(wait=True)
+
+    assert speculator.stats.started == 2
+    assert speculator.stats.cancelled == 1
+    assert speculator.stats.wasted == 1
+    assert speculator.stats.wasted_seconds > 0
+
+
+def test_get_calories_uses_speculative_vision(monkeypatch):
+    """Tests that a YOLO miss uses the Vision result started in parallel"""
+    speculator = VisionSpeculator("always")
+    calls = []
+
+    def fake_vision(image):
+        calls.append(image)
+        return ["Pizza"], [100.0]
+
+    monkeypatch.setattr(endpoint, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(endpoint, "vision_speculator", speculator)
+    monkeypatch.setattr(endpoint, "get_vision_predictions", fake_vision)
+    monkeypatch.setattr(
+        endpoint, "get_model_predictions", lambda image, plate: ([], [], False, False)
+    )
+    monkeypatch.setattr(
+        endpoint, "get_nutrition_details", lambda items, weights: (items, [])
+    )
+
+    image = encode_image(np.zeros((32, 32, 3), dtype=np.uint8))
+    results, model_code = endpoint.get_calories(image)
+
+    assert results == ["Pizza"]
+    assert model_code == endpoint.ModelCodeEnum.VISION_DEFAULT
+    assert calls == [image]
+    assert speculator.stats.used == 1
+
+
+def test_speculation_uses_global_miss_rate():
+    """Tests that miss_rate mode decides from previous requests, whatever the image"""
+    speculator = VisionSpeculator("miss_rate", miss_rate=0.5)
+
+    assert speculator.start(empty, lambda: None) is None
+    speculator.tracker.rate = 0.6
+    speculation = speculator.start(food_image(), lambda: None)
+    assert speculation is not None
+    speculation.discard()
+
+
+def test_get_calories_speculates_per_image(monkeypatch):
+    """Tests that auto mode only speculates for photos the YOLO model is likely to miss"""
+    speculator = VisionSpeculator("auto")
+    monkeypatch.setattr(endpoint, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(endpoint, "vision_speculator", speculator)
+    monkeypatch.setattr(endpoint, "get_vision_predictions", lambda image: ([], []))
+    monkeypatch.setattr(
+        endpoint, "get_model_predictions", lambda image, plate: ([], [], False, False)
+    )
+
+    endpoint.get_calories(encode_image(food_image()))
+    assert speculator.stats.started == 0
+    endpoint.get_calories(encode_image(empty))
+    assert speculator.stats.started == 1
+
+
+def test_get_calories_discards_speculation_on_error(monkeypatch):
+    """Tests that a failing YOLO model discards the speculative Vision API call"""
+    speculator = VisionSpeculator("always")
+    speculator.tracker.rate = 1.0
+
+    def fail(image, plate):
+        raise RuntimeError("model failed")
+
+    monkeypatch.setattr(endpoint, "result_cache", ResultCache(max_size=0))
+    monkeypatch.setattr(endpoint, "vision_speculator", speculator)
+    monkeypatch.setattr(endpoint, "get_vision_predictions", lambda image: ([], []))
+    monkeypatch.setattr(endpoint, "get_model_predictions", fail)
+
+    with pytest.raises(RuntimeError):
+        endpoint.get_calories(encode_image(np.zeros((32, 32, 3), dtype=np.uint8)))
+    speculator._executor.shutdown(wait=True)
+
+    assert speculator.stats.started == 1
+    assert speculator.stats.used == 0
+    assert speculator.stats.cancelled + speculator.stats.wasted == 1
+    assert speculator.tracker.rate == pytest.approx(0.9)
+
+
+def test_async_speculation_cancels_task():
+    """Tests that discarding an asynchronous speculative call cancels its task"""
+    speculator = VisionSpeculator("always")
+
+    async def vision_call():
+        await asyncio.sleep(5)
+
+    async def speculate():
+        speculation = speculator.start_async(empty, vision_call)
+        await asyncio.sleep(0)
+        speculation.discard()
+        await asyncio.sleep(0)
+        return speculation.future.cancelled()
+
+    assert asyncio.run(speculate())
+    assert speculator.stats.cancelled == 1
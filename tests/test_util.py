@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.util import (
+    decode_image,
+    encode_image,
+    image_to_array,
+    image_to_bytes,
+    sniff_image_format,
+)
+
+
+def test_image_round_trip_in_memory():
+    """Tests that images are encoded and decoded without touching disk"""
+    image = np.zeros((32, 48, 3), dtype=np.uint8)
+    image[:, :24] = 255
+
+    content = encode_image(image)
+    decoded = decode_image(content)
+
+    assert isinstance(content, bytes)
+    assert decoded.shape == image.shape
+    assert image_to_bytes(content) is content
+    assert image_to_array(decoded) is decoded
+
+
+def test_decode_image_rejects_invalid_bytes():
+    """Tests that undecodable uploads raise an error"""
+    with pytest.raises(ValueError):
+        decode_image(b"not an image")
+
+
+def test_sniff_image_format():
+    """Tests that uploads are identified by their leading bytes"""
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    assert sniff_image_format(encode_image(image)) == "jpeg"
+    assert sniff_image_format(cv2.imencode(".png", image)[1].tobytes()) == "png"
+    assert sniff_image_format(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+    assert sniff_image_format(b"RIFF\x00\x00\x00\x00WAVEfmt ") is None
+    assert sniff_image_format(b"%PDF-1.7") is None
+
+
+def test_decode_image_reduces_large_jpeg():
+    """Tests that large JPEG images are scaled down while decoding"""
+    image = np.zeros((1500, 2000, 3), dtype=np.uint8)
+    image[:, :1000] = 255
+    content = encode_image(image)
+
+    assert decode_image(content).shape == (1500, 2000, 3)
+    # halving keeps the longest side above 640, quartering would not
+    assert decode_image(content, max_size=640).shape == (750, 1000, 3)
+    assert decode_image(content, max_size=2000).shape == (1500, 2000, 3)
+    assert image_to_array(content, max_size=200).shape == (188, 250, 3)
+
+
+def test_decode_image_keeps_png_resolution():
+    """Tests that formats without reduced decoding are decoded at full size"""
+    content = cv2.imencode(".png", np.zeros((1500, 2000, 3), dtype=np.uint8))[1]
+
+    assert decode_image(content.tobytes(), max_size=640).shape == (1500, 2000, 3)
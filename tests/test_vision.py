@@ -1,7 +1,7 @@
 from pathlib import Path
 from unittest.mock import MagicMock, mock_open, patch
 
-from app.estimator.vision import get_food_classification
+from app.estimator.vision import annotate_batch, get_food_classification
 
 VALID_ITEMS = ["pizza", "omelette", "burger"]
 
@@ -33,9 +33,9 @@ def test_get_food_classification_none(mock_file, mock_vision):
     """Tests response from Google vision request with a mock object"""
     mock_response = MagicMock()
     mock_labels = [
-        MagicMock(description="apple", score=0.9),
-        MagicMock(description="banana", score=0.8),
-        MagicMock(description="orange", score=0.7),
+        MagicMock(description="Food", score=0.9),
+        MagicMock(description="Tableware", score=0.8),
+        MagicMock(description="Dishware", score=0.7),
     ]
     mock_response.label_annotations = mock_labels
     mock_vision().label_detection.return_value = mock_response
@@ -46,3 +46,50 @@ def test_get_food_classification_none(mock_file, mock_vision):
 
     # assert the result is as expected
     assert result is None
+
+
+@patch("google.cloud.vision.ImageAnnotatorClient")
+def test_get_food_classification_from_bytes(mock_vision):
+    """Tests that in-memory image bytes are sent without reading from disk"""
+    mock_response = MagicMock()
+    mock_response.label_annotations = [MagicMock(description="Pizza", score=0.9)]
+    mock_vision().label_detection.return_value = mock_response
+
+    result = get_food_classification(b"data")
+
+    assert "Pizza" == result
+    sent_image = mock_vision().label_detection.call_args.kwargs["image"]
+    assert sent_image.content == b"data"
+
+
+@patch("google.cloud.vision.ImageAnnotatorClient")
+def test_vision_client_is_reused(mock_vision):
+    """Tests that the Vision client is created once and shared between calls"""
+    mock_vision.return_value.label_detection.return_value = MagicMock(
+        label_annotations=[]
+    )
+
+    get_food_classification(b"first")
+    get_food_classification(b"second")
+
+    mock_vision.assert_called_once()
+
+
+@patch("google.cloud.vision.ImageAnnotatorClient")
+def test_annotate_batch(mock_vision):
+    """Tests that several images are annotated with a single API call"""
+    pizza = MagicMock(description="Pizza", score=0.9)
+    responses = [
+        MagicMock(label_annotations=[pizza], error=MagicMock(message="")),
+        MagicMock(label_annotations=[], error=MagicMock(message="bad image")),
+    ]
+    client = mock_vision.return_value
+    client.batch_annotate_images.return_value = MagicMock(responses=responses)
+
+    labels = annotate_batch([b"first", b"second"])
+
+    assert labels[0] == [pizza]
+    assert isinstance(labels[1], ValueError)
+    client.batch_annotate_images.assert_called_once()
+    requests = client.batch_annotate_images.call_args.kwargs["requests"]
+    assert [request.image.content for request in requests] == [b"first", b"second"]
@@ -0,0 +1,96 @@
+import gc
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.api import warmup
+from app.estimator import yolo
+from benchmarks.startup import DEFERRED_MODULES
+
+
+def test_import_defers_heavy_modules():
+    """Tests that importing the app loads neither the model runtime nor the clients"""
+    code = (
+        "import json, sys; import app.api.endpoint, app.api.asgi; "
+        f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    )
+    env = {k: v for k, v in os.environ.items() if not k.startswith("EDAMAM_")}
+
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+    assert json.loads(output.stdout.strip().splitlines()[-1]) == []
+
+
+def test_warmup_runs_steps(monkeypatch):
+    """Tests that every step is timed and an optional failing step is skipped"""
+    calls = []
+
+    def fail():
+        raise RuntimeError("no credentials")
+
+    monkeypatch.setattr(
+        warmup,
+        "WARMUP_STEPS",
+        [
+            ("first", lambda: calls.append("first"), True),
+            ("optional", fail, False),
+            ("last", lambda: calls.append("last"), True),
+        ],
+    )
+
+    timings = warmup.warmup()
+
+    assert calls == ["first", "last"]
+    assert list(timings) == ["first", "last"]
+
+
+def test_warmup_fails_on_required_step(monkeypatch):
+    """Tests that a failing required step stops the warmup"""
+    monkeypatch.delenv("EDAMAM_ID")
+
+    with pytest.raises(EnvironmentError):
+        warmup.warmup()
+
+
+def test_preload_fuses_model_and_freezes_objects(monkeypatch):
+    """Tests that the preloaded model is fused and the master's objects frozen"""
+    torch = pytest.importorskip("torch")
+    model = MagicMock()
+    monkeypatch.setattr(yolo, "_model", model)
+    threads = torch.get_num_threads()
+
+    try:
+        warmup.preload()
+        assert gc.get_freeze_count() > 0
+        assert torch.get_num_threads() == 1
+    finally:
+        gc.unfreeze()
+        torch.set_num_threads(threads)
+
+    model.fuse.assert_called_once()
+
+
+def test_init_worker_divides_cores(monkeypatch):
+    """Tests that workers share the CPU cores unless TORCH_THREADS is set"""
+    torch = pytest.importorskip("torch")
+    threads = torch.get_num_threads()
+    monkeypatch.setattr(warmup.os, "cpu_count", lambda: 8)
+
+    try:
+        warmup.init_worker(workers=4)
+        assert torch.get_num_threads() == 2
+        monkeypatch.setattr(warmup, "TORCH_THREADS", 3)
+        warmup.init_worker(workers=4)
+        assert torch.get_num_threads() == 3
+    finally:
+        torch.set_num_threads(threads)
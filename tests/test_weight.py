@@ -1,7 +1,13 @@
 import numpy as np
+import pytest
 
 from app.estimator.constants import DENSITY_DICT, DEPTH_DICT, IMAGE_HEIGHT, IMAGE_WIDTH
-from app.estimator.weight import get_food_weights, get_label_weights, get_params_weight
+from app.estimator.weight import (
+    get_food_weights,
+    get_food_weights_batch,
+    get_label_weights,
+    get_params_weight,
+)
 
 
 def test_get_food_weights():
@@ -105,3 +111,57 @@ def test_get_label_weights():
     for i, label in enumerate(expected_labels):
         assert result[i, 0] == label
         assert isinstance(result[i, 1], float)
+
+
+def test_get_food_weights_batch_matches_scalar():
+    """Tests that the vectorized weights equal the per-item calculation"""
+    labels = np.array(["plate", "Pizza", "fries", "omelette"])
+    areas = np.array([0.4, 0.2, 0.1, 0.05])
+
+    is_food, weights, use_plate = get_food_weights_batch(
+        labels, areas, np.array([4]), np.array([30.0])
+    )
+
+    expected = get_food_weights(
+        ["Pizza", "fries", "omelette"], [0.2, 0.1, 0.05], 0.75, 30.0, plate=True
+    )
+    assert use_plate.tolist() == [True]
+    assert is_food.tolist() == [False, True, True, True]
+    assert weights[is_food] == pytest.approx(expected)
+
+    is_food, weights, use_plate = get_food_weights_batch(
+        labels[1:], areas[1:], np.array([3]), np.array([25.0])
+    )
+
+    assert use_plate.tolist() == [False]
+    assert weights == pytest.approx(
+        get_food_weights(["Pizza", "fries", "omelette"], [0.2, 0.1, 0.05])
+    )
+
+
+def test_get_food_weights_batch():
+    """Tests weights of several images, with and without plate or detections"""
+    labels = np.array(["pizza", "plate", "burger", "plate", "plate", "salad"])
+    areas = np.array([0.2, 0.5, 0.3, 0.1, 0.1, 0.2])
+    counts = np.array([2, 0, 1, 3])
+
+    is_food, weights, use_plate = get_food_weights_batch(
+        labels, areas, counts, np.array([20.0, 25.0, 25.0, 25.0])
+    )
+
+    # only the first image has exactly one plate
+    assert use_plate.tolist() == [True, False, False, False]
+    assert weights[0] == pytest.approx(
+        get_food_weights(["pizza"], [0.2], 0.7, 20.0, plate=True)[0]
+    )
+    assert weights[2] == pytest.approx(get_food_weights(["burger"], [0.3])[0])
+    assert weights[5] == pytest.approx(get_food_weights(["salad"], [0.2])[0])
+    assert weights[~is_food].tolist() == [0.0, 0.0, 0.0]
+
+
+def test_get_food_weights_batch_unknown_label():
+    """Tests that items without depth and density are rejected"""
+    with pytest.raises(KeyError):
+        get_food_weights_batch(
+            np.array(["apple"]), np.array([0.1]), np.array([1]), np.array([25.0])
+        )
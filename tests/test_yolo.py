@@ -1,6 +1,19 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
 import numpy as np
+import torch
 
-from app.estimator.yolo import get_num_plate_food
+from app.estimator import yolo
+from app.estimator.constants import MODEL_VERSION
+from app.estimator.yolo import (
+    compute_mask_areas,
+    get_model,
+    get_num_plate_food,
+    needs_full_resolution,
+    select_imgsz,
+)
 
 
 def test_get_num_plate_food():
@@ -13,3 +26,144 @@ def test_get_num_plate_food():
 
     assert plate_counter == 1
     assert food_counter == 3
+
+
+def test_get_model_loads_once(monkeypatch):
+    """Tests that the YOLO model is only constructed once per process"""
+    mock_yolo = MagicMock()
+    monkeypatch.setattr("ultralytics.YOLO", mock_yolo)
+    monkeypatch.setattr(yolo, "_model", None)
+
+    # call from several threads at once
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        models = list(executor.map(lambda _: get_model(), range(8)))
+
+    mock_yolo.assert_called_once_with(MODEL_VERSION)
+    assert all(model is mock_yolo.return_value for model in models)
+
+
+def test_compute_mask_areas():
+    """Tests that mask areas match the per-mask pixel count ratio"""
+    masks = torch.zeros((3, 8, 8))
+    masks[0, :4, :] = 1
+    masks[1, :2, :2] = 1
+
+    areas = compute_mask_areas(masks)
+
+    np.testing.assert_allclose(areas, [0.5, 4 / 64, 0.0])
+    assert compute_mask_areas(torch.zeros((0, 8, 8))).shape == (0,)
+
+
+def make_result(conf, masks=None):
+    """Create a fake YOLO result with the given confidences and masks."""
+    result = MagicMock()
+    result.boxes.conf = torch.tensor(conf)
+    result.boxes.cls = torch.zeros(len(conf))
+    result.boxes.xywhn = torch.full((len(conf), 4), 0.5)
+    result.masks = None if masks is None else MagicMock(data=masks)
+    result.orig_shape = None if masks is None else tuple(masks.shape[1:])
+    return result
+
+
+def letterbox_masks(masks, shape):
+    """Pad full resolution masks to a model input shape like ultralytics does."""
+    try:
+        from ultralytics.data.augment import LetterBox
+    except ImportError:
+        from ultralytics.yolo.data.augment import LetterBox
+
+    # masks are drawn at 255, as the image is padded with grey
+    images = [mask.numpy()[..., None].repeat(3, 2) * 255 for mask in masks]
+    padded = [LetterBox(shape, auto=False)(image=image) for image in images]
+    return torch.tensor(np.stack(padded)[..., 0] == 255, dtype=torch.float32)
+
+
+def test_mask_areas_independent_of_batch_shapes():
+    """
+    Tests that an image gets the same areas when predicted alone and padded
+    to a common square input shape in a batch with images of other shapes
+    """
+    masks = torch.zeros((2, 481, 640), dtype=torch.uint8)
+    masks[0, 100:300, 200:500] = 1
+    masks[1, :, :320] = 1
+    names = {0: "pizza"}
+
+    # alone, the 481x640 image is only padded to a multiple of the stride
+    single = make_result([0.9, 0.9], letterbox_masks(masks, (512, 640)))
+    # in a batch with a portrait image, it is padded to 640x640
+    batched = make_result([0.9, 0.9], letterbox_masks(masks, (640, 640)))
+    single.orig_shape = batched.orig_shape = (481, 640)
+
+    _, single_areas, _ = yolo.parse_result(single, names)
+    _, batched_areas, _ = yolo.parse_result(batched, names)
+
+    expected = masks.float().mean(dim=(1, 2)).numpy()
+    np.testing.assert_allclose(single_areas, expected, atol=1e-3)
+    np.testing.assert_allclose(batched_areas, expected, atol=1e-3)
+    # measured against the padded frame, the batched areas would be 25% smaller
+    assert compute_mask_areas(batched.masks.data)[1] < 0.8 * expected[1]
+
+
+def test_select_imgsz():
+    """Tests input size selection for each resolution policy"""
+    small = np.zeros((200, 300, 3), dtype=np.uint8)
+    large = np.zeros((3000, 4000, 3), dtype=np.uint8)
+
+    assert select_imgsz([small], "fixed") == 640
+    assert select_imgsz([small], "adaptive") == 320
+    assert select_imgsz([small, large], "adaptive") == 640
+    assert select_imgsz([small], "progressive") == 320
+
+
+def test_needs_full_resolution():
+    """Tests when a low resolution prediction is re-run at full resolution"""
+    masks = torch.ones((1, 8, 8))
+
+    assert needs_full_resolution(make_result([], None))
+    assert needs_full_resolution(make_result([0.75], masks))
+    assert not needs_full_resolution(make_result([0.95], masks))
+    assert needs_full_resolution(make_result([0.95], torch.zeros((1, 8, 8))))
+
+
+def test_progressive_prediction(monkeypatch):
+    """Tests that only uncertain images are predicted again at full resolution"""
+    confident = make_result([0.95], torch.ones((1, 8, 8)))
+    missed = make_result([], None)
+    model = MagicMock(names={0: "pizza"})
+    model.predict.side_effect = [[confident, missed], [confident]]
+    monkeypatch.setattr(yolo, "IMGSZ_POLICY", "progressive")
+    images = [np.zeros((64, 64, 3), dtype=np.uint8) for _ in range(2)]
+
+    detections = yolo.detect_food_items_batch(images, model=model)
+
+    assert [list(labels) for labels, _, _ in detections] == [["pizza"], ["pizza"]]
+    first_call, second_call = model.predict.call_args_list
+    assert first_call.kwargs["imgsz"] == 320
+    assert second_call.kwargs["imgsz"] == 640
+    assert second_call.kwargs["source"][0] is images[1]
+
+
+def test_detect_food_items_concurrent(monkeypatch):
+    """Tests that concurrent requests share the model without overlapping calls"""
+    active, overlaps = [0], []
+
+    def fake_predict(source, **kwargs):
+        active[0] += 1
+        overlaps.append(active[0] > 1)
+        time.sleep(0.01)
+        active[0] -= 1
+        # one item per image, sized by the image's own content
+        return [
+            make_result([0.9], torch.full((1, 4, 4), float(s[0, 0, 0]))) for s in source
+        ]
+
+    model = MagicMock(names={0: "pizza"})
+    model.predict.side_effect = fake_predict
+    monkeypatch.setattr(yolo, "_model", model)
+    images = [np.full((8, 8, 3), i % 2, dtype=np.uint8) for i in range(16)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(yolo.detect_food_items, images))
+
+    assert not any(overlaps)
+    assert [areas[0] for _, areas, _ in results] == [i % 2 for i in range(16)]